@@ -0,0 +1,155 @@
+"""Benchmarks de las operaciones principales sobre árboles sintéticos.
+
+Para cada tamaño y forma de árbol genera un mobs.csv sintético en una carpeta
+temporal y mide generar_jerarquia, buscar_mob, buscar_en_arbol,
+estadisticas_mobs, ordenar_mobs, agregar_recursivo (x100), actualizar_recursivo
+y eliminar_recursivo.
+Los resultados se guardan en JSON para comparar entre versiones.
+
+Uso:
+    python benchmarks/bench_mobs.py --tamanos 1000 10000 100000 --salida bench.json
+    python benchmarks/bench_mobs.py --comparar bench_anterior.json
+    python benchmarks/bench_mobs.py --almacenamiento binario
+    python benchmarks/bench_mobs.py --motor sqlite
+    python benchmarks/bench_mobs.py --intervalo-commit 0.5
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from generador import FORMAS, escribir_sintetico  # noqa: E402
+from mod.almacenamiento import ALMACENAMIENTOS, configurar_almacenamiento  # noqa: E402
+from mod.catalogo import MOTORES, configurar_motor, confirmar_cambios, invalidar_catalogo  # noqa: E402
+from mod.crud import actualizar_recursivo, agregar_recursivo, buscar_mob, eliminar_recursivo  # noqa: E402
+from mod.diario import VARIABLE_INTERVALO  # noqa: E402
+from mod.etl import buscar_en_arbol, generar_jerarquia  # noqa: E402
+from mod.utils import estadisticas_mobs, ordenar_mobs, recolectar_mobs  # noqa: E402
+
+
+def _medir(funcion, *args, **kwargs):
+    """Ejecuta `funcion` silenciando su salida y devuelve los segundos que tardó."""
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        funcion(*args, **kwargs)
+    return time.perf_counter() - inicio
+
+
+def _version():
+    try:
+        return subprocess.run(["git", "-C", RAIZ, "describe", "--always", "--dirty"],
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconocida"
+
+
+def medir_tamano(cantidad, forma, repeticiones=3):
+    """Mide todas las operaciones para un árbol de `cantidad` filas. Retorna {operacion: segundos}."""
+    resultados = {}
+    anterior = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="bench_mobs_") as carpeta:
+        os.chdir(carpeta)
+        try:
+            escribir_sintetico("mobs.csv", cantidad, forma)
+            invalidar_catalogo()
+            resultados["generar_jerarquia"] = _medir(generar_jerarquia, "mobs.csv", forzar=True)
+            resultados["generar_jerarquia_sin_cambios"] = _medir(generar_jerarquia, "mobs.csv")
+
+            # Primera consulta: incluye la carga del árbol en memoria
+            invalidar_catalogo()
+            resultados["carga_y_buscar_mob"] = _medir(buscar_mob, "zombie")
+
+            operaciones = {
+                "buscar_mob": lambda: buscar_mob(str(cantidad // 2)),
+                "buscar_en_arbol": lambda: buscar_en_arbol("", "name", "skeleton"),
+                "estadisticas_mobs": lambda: estadisticas_mobs("minecraft"),
+                "ordenar_mobs": lambda: ordenar_mobs("minecraft", key="name"),
+                "ordenar_mobs_top20": lambda: ordenar_mobs("minecraft", key="-width", limit=20),
+            }
+            for nombre, operacion in operaciones.items():
+                resultados[nombre] = min(_medir(operacion) for _ in range(repeticiones))
+
+            # Un mob que seguro pasó los filtros de la ETL (el último del catálogo)
+            fila, ruta_csv = recolectar_mobs("minecraft")[-1]
+            objetivo = fila["name"]
+            destino = os.path.relpath(os.path.dirname(ruta_csv), "minecraft")
+
+            def agregar_100():
+                # Con intervalo de commit > 0 las 100 altas se confirman en pocos grupos
+                for i in range(100):
+                    agregar_recursivo("minecraft", dict(fila, id=str(10 ** 9 + i), name=f"bench_{i}"), destino)
+                confirmar_cambios("minecraft")
+            resultados["agregar_recursivo_x100"] = _medir(agregar_100)
+            resultados["actualizar_recursivo"] = _medir(actualizar_recursivo, "minecraft", objetivo, {"width": "9.99"})
+            resultados["eliminar_recursivo"] = _medir(eliminar_recursivo, "minecraft", objetivo)
+        finally:
+            invalidar_catalogo()
+            os.chdir(anterior)
+    return resultados
+
+
+def comparar(actual, previo):
+    """Imprime la relación actual/previo para cada medición en común."""
+    previos = {(r["filas"], r["forma"], r["operacion"]): r["segundos"] for r in previo["resultados"]}
+    print(f"\nComparación contra {previo.get('version', '?')}:")
+    for r in actual["resultados"]:
+        clave = (r["filas"], r["forma"], r["operacion"])
+        if clave in previos and previos[clave] > 0:
+            print(f" {r['filas']:>9} {r['forma']:<6} {r['operacion']:<30} x{r['segundos'] / previos[clave]:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks del gestor de mobs.")
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="cantidades de filas (ej: 1000 10000 ... 10000000)")
+    parser.add_argument("--formas", nargs="+", choices=sorted(FORMAS), default=["real"])
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--almacenamiento", choices=sorted(ALMACENAMIENTOS), default="csv",
+                        help="formato de las hojas del árbol")
+    parser.add_argument("--motor", choices=MOTORES, default="arbol")
+    parser.add_argument("--intervalo-commit", type=float, default=None,
+                        help=f"segundos entre confirmaciones del diario (como {VARIABLE_INTERVALO})")
+    parser.add_argument("--salida", default="bench_resultados.json")
+    parser.add_argument("--comparar", help="JSON de una ejecución anterior")
+    args = parser.parse_args()
+    configurar_almacenamiento(args.almacenamiento)
+    configurar_motor(args.motor)
+    if args.intervalo_commit is not None:
+        os.environ[VARIABLE_INTERVALO] = str(args.intervalo_commit)
+
+    informe = {
+        "version": _version(),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "almacenamiento": args.almacenamiento,
+        "motor": args.motor,
+        "intervalo_commit": float(os.environ.get(VARIABLE_INTERVALO) or 0),
+        "resultados": [],
+    }
+    for forma in args.formas:
+        for cantidad in args.tamanos:
+            for operacion, segundos in medir_tamano(cantidad, forma, args.repeticiones).items():
+                informe["resultados"].append({"filas": cantidad, "forma": forma, "operacion": operacion, "segundos": segundos})
+                print(f"{cantidad:>9} {forma:<6} {operacion:<30} {segundos * 1000:10.2f} ms")
+
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(informe, f, indent=1)
+    print(f"\nResultados guardados en {args.salida}")
+
+    if args.comparar:
+        with open(args.comparar, "r", encoding="utf-8") as f:
+            comparar(informe, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
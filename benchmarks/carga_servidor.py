@@ -0,0 +1,101 @@
+"""Generador de carga para `mod.servidor`: mide peticiones por segundo y latencias.
+
+Abre `--conexiones` conexiones HTTP/1.1 persistentes y, durante `--segundos`,
+cada una envía peticiones en serie elegidas de la mezcla de consultas. Al
+final informa req/s y los percentiles de latencia (p50, p90, p99, máximo).
+
+Uso:
+    python -m mod.servidor --puerto 8080 &
+    python benchmarks/carga_servidor.py --puerto 8080 --conexiones 32 --segundos 10
+    python benchmarks/carga_servidor.py --consultas buscar id --salida carga.json
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+# Peticiones de cada tipo de consulta (se elige una al azar en cada envío)
+CONSULTAS = {
+    "buscar": lambda rnd: f"/mobs?q={rnd.choice(['zombie', 'skeleton', 'creeper', 'pig', 'bat'])}",
+    "id": lambda rnd: f"/mobs/{rnd.randint(1, 150)}",
+    "estadisticas": lambda rnd: "/estadisticas",
+    "ordenados": lambda rnd: f"/ordenados?key={rnd.choice(['name', '-width', 'category,-height'])}&limit=20",
+}
+
+
+def percentil(valores, p):
+    """Percentil `p` (0-100) por rango más cercano sobre `valores` ya ordenados."""
+    if not valores:
+        return 0.0
+    indice = max(0, min(len(valores) - 1, int(round(p / 100 * len(valores))) - 1))
+    return valores[indice]
+
+
+async def _cliente(host, puerto, consultas, fin, latencias, errores, semilla):
+    rnd = random.Random(semilla)
+    lector, escritor = await asyncio.open_connection(host, puerto)
+    try:
+        while time.perf_counter() < fin:
+            ruta = CONSULTAS[rnd.choice(consultas)](rnd)
+            inicio = time.perf_counter()
+            escritor.write(f"GET {ruta} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode("latin-1"))
+            await escritor.drain()
+            estado = int((await lector.readline()).split()[1])
+            largo = 0
+            while True:
+                linea = await lector.readline()
+                if linea in (b"\r\n", b""):
+                    break
+                nombre, _, valor = linea.decode("latin-1").partition(":")
+                if nombre.strip().lower() == "content-length":
+                    largo = int(valor)
+            await lector.readexactly(largo)
+            latencias.append(time.perf_counter() - inicio)
+            if estado >= 500 or (estado >= 400 and estado != 404):
+                errores.append(estado)
+    finally:
+        escritor.close()
+
+
+async def generar_carga(host, puerto, conexiones, segundos, consultas):
+    latencias, errores = [], []
+    inicio = time.perf_counter()
+    fin = inicio + segundos
+    await asyncio.gather(*(_cliente(host, puerto, consultas, fin, latencias, errores, n) for n in range(conexiones)))
+    total = time.perf_counter() - inicio
+    latencias.sort()
+    return {
+        "conexiones": conexiones,
+        "consultas": consultas,
+        "peticiones": len(latencias),
+        "errores": len(errores),
+        "segundos": total,
+        "req_s": len(latencias) / total if total else 0.0,
+        "latencia_ms": {nombre: percentil(latencias, p) * 1000
+                        for nombre, p in (("p50", 50), ("p90", 90), ("p99", 99), ("max", 100))},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carga sobre el servicio HTTP de mobs.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8080)
+    parser.add_argument("--conexiones", type=int, default=16)
+    parser.add_argument("--segundos", type=float, default=5.0)
+    parser.add_argument("--consultas", nargs="+", choices=sorted(CONSULTAS), default=sorted(CONSULTAS))
+    parser.add_argument("--salida", help="guardar el informe en JSON")
+    args = parser.parse_args()
+
+    informe = asyncio.run(generar_carga(args.host, args.puerto, args.conexiones, args.segundos, args.consultas))
+    lat = informe["latencia_ms"]
+    print(f"{informe['peticiones']} peticiones en {informe['segundos']:.2f} s: {informe['req_s']:.0f} req/s "
+          f"({informe['errores']} errores)")
+    print(f"Latencia (ms): p50 {lat['p50']:.2f} | p90 {lat['p90']:.2f} | p99 {lat['p99']:.2f} | max {lat['max']:.2f}")
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(informe, f, indent=1)
+
+
+if __name__ == "__main__":
+    main()
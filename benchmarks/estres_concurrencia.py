@@ -0,0 +1,116 @@
+"""Prueba de estrés: varios procesos modificando el mismo árbol a la vez.
+
+Cada proceso trabajador abre su propio catálogo y, con los bloqueos por hoja:
+- incrementa `--incrementos` veces el ancho de un mob compartido (leer,
+  sumar 1 y escribir: sin bloqueos, dos procesos pisan sus cambios);
+- agrega `--altas` mobs nuevos a la misma hoja que los demás procesos;
+- agrega otros tantos a una hoja propia (escritores en hojas distintas).
+Al final se verifica desde disco que no se perdió ninguna actualización.
+
+Uso:
+    python benchmarks/estres_concurrencia.py --procesos 8 --incrementos 200 --altas 100
+    python benchmarks/estres_concurrencia.py --procesos 4 --intervalo-commit 0.05
+"""
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from generador import escribir_sintetico  # noqa: E402
+from mod.catalogo import BASE_DIR, confirmar_cambios, invalidar_catalogo, obtener_catalogo  # noqa: E402
+from mod.diario import VARIABLE_INTERVALO  # noqa: E402
+from mod.etl import ENCABEZADOS, generar_jerarquia  # noqa: E402
+from mod.utils import leer_csv  # noqa: E402
+
+# Mob cuyo ancho incrementan todos los procesos
+OBJETIVO = "zombie"
+
+
+def _trabajador(numero, incrementos, altas, ruta_compartida, carpeta):
+    os.chdir(carpeta)
+    catalogo = obtener_catalogo(BASE_DIR)
+    fila_base = catalogo.ubicar(OBJETIVO)[0]
+    for i in range(max(incrementos, altas)):
+        if i < incrementos:
+            # Leer-modificar-escribir con la hoja bloqueada (y releída si otro la cambió)
+            fila, ruta_csv = catalogo.ubicar_bloqueado(OBJETIVO)
+            catalogo.modificar_en_memoria(fila, {"width": str(int(float(fila["width"])) + 1)})
+            catalogo.persistir_hoja(ruta_csv)
+            catalogo.confirmar()
+        if i < altas:
+            nueva = dict(fila_base, id=f"{numero}-{i}", name=f"estres_{numero}_{i}", displayName="")
+            catalogo.agregar(nueva, ruta_compartida, ENCABEZADOS)
+            propia = os.path.join(BASE_DIR, "estres", f"proceso_{numero}", "mobs.csv")
+            catalogo.agregar(dict(nueva, id=f"{numero}-{i}-p", name=f"estres_{numero}_{i}_p"), propia, ENCABEZADOS)
+    confirmar_cambios(BASE_DIR)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Estrés de CRUD concurrente entre procesos.")
+    parser.add_argument("--procesos", type=int, default=4)
+    parser.add_argument("--incrementos", type=int, default=100)
+    parser.add_argument("--altas", type=int, default=50)
+    parser.add_argument("--filas", type=int, default=1000, help="tamaño del árbol sintético")
+    parser.add_argument("--intervalo-commit", type=float, default=None,
+                        help=f"segundos entre confirmaciones del diario (como {VARIABLE_INTERVALO})")
+    args = parser.parse_args()
+    if args.intervalo_commit is not None:
+        os.environ[VARIABLE_INTERVALO] = str(args.intervalo_commit)
+
+    anterior = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="estres_mobs_") as carpeta:
+        os.chdir(carpeta)
+        try:
+            escribir_sintetico("mobs.csv", args.filas)
+            with contextlib.redirect_stdout(io.StringIO()):
+                generar_jerarquia("mobs.csv", forzar=True)
+            fila, ruta_compartida = obtener_catalogo(BASE_DIR).ubicar(OBJETIVO)
+            ancho_inicial = int(float(fila["width"]))
+            filas_iniciales = len(leer_csv(ruta_compartida))
+            invalidar_catalogo(BASE_DIR)
+
+            contexto = multiprocessing.get_context("fork" if hasattr(os, "fork") else "spawn")
+            inicio = time.perf_counter()
+            procesos = [contexto.Process(target=_trabajador,
+                                         args=(n, args.incrementos, args.altas, ruta_compartida, carpeta))
+                        for n in range(args.procesos)]
+            for proceso in procesos:
+                proceso.start()
+            for proceso in procesos:
+                proceso.join()
+            segundos = time.perf_counter() - inicio
+
+            # Verificación desde disco, con un catálogo nuevo
+            fallas = [p.exitcode for p in procesos if p.exitcode]
+            filas = leer_csv(ruta_compartida)
+            ancho = next(int(float(f["width"])) for f in filas if f["name"] == OBJETIVO)
+            esperado_ancho = ancho_inicial + args.procesos * args.incrementos
+            esperado_filas = filas_iniciales + args.procesos * args.altas
+            propias = [len(leer_csv(os.path.join(BASE_DIR, "estres", f"proceso_{n}", "mobs.csv")))
+                       for n in range(args.procesos)]
+            operaciones = args.procesos * (args.incrementos + 2 * args.altas)
+
+            print(f"Procesos: {args.procesos} | operaciones: {operaciones} | {segundos:.2f} s "
+                  f"({operaciones / segundos:.0f} op/s)")
+            print(f"Incrementos: {ancho - ancho_inicial} de {esperado_ancho - ancho_inicial}")
+            print(f"Altas en la hoja compartida: {len(filas) - filas_iniciales} de {esperado_filas - filas_iniciales}")
+            print(f"Altas en hojas propias: {sum(propias)} de {args.procesos * args.altas}")
+            perdidas = ((esperado_ancho - ancho) + (esperado_filas - len(filas))
+                        + (args.procesos * args.altas - sum(propias)))
+            if fallas or perdidas:
+                print(f"ERROR: {perdidas} actualizaciones perdidas, procesos fallidos: {fallas}")
+                sys.exit(1)
+            print("OK: ninguna actualización perdida")
+        finally:
+            os.chdir(anterior)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Generador determinístico de `mobs.csv` sintéticos con el mismo esquema que el real.
+
+Uso:
+    python benchmarks/generador.py 100000 salida.csv --forma ancho --semilla 7
+"""
+import argparse
+import csv
+import random
+
+# Encabezado del mobs.csv original
+ENCABEZADO = ["id", "internalId", "name", "displayName", "width", "height", "type", "category", "metadataKeys"]
+
+# Nombres reales (incluye los que activan no_muerto / volador / nadador en la ETL)
+NOMBRES_BASE = [
+    "allay", "armadillo", "axolotl", "bat", "bee", "blaze", "camel", "cat", "cod", "cow",
+    "creeper", "dolphin", "drowned", "enderman", "ghast", "glow_squid", "guardian", "husk",
+    "parrot", "phantom", "pig", "pufferfish", "salmon", "sheep", "skeleton", "spider", "squid",
+    "stray", "tadpole", "turtle", "vex", "wither_skeleton", "wolf", "zombie", "zombie_villager",
+]
+TIPOS = ["mob", "passive", "animal", "hostile", "water_creature", "ambient", "projectile"]
+CATEGORIAS = ["Hostile mobs", "Passive mobs", "Neutral mobs"]
+METADATOS = ["shared_flags", "air_supply", "custom_name", "custom_name_visible", "silent",
+             "no_gravity", "pose", "ticks_frozen", "living_entity_flags", "health", "mob_flags", "baby"]
+
+# Formas de árbol: cuántas categorías distintas (primer nivel de la jerarquía)
+FORMAS = {
+    "real": CATEGORIAS,
+    "ancho": CATEGORIAS + [f"Custom group {i}" for i in range(200)],
+}
+
+
+def generar_filas(cantidad: int, forma: str = "real", semilla: int = 42):
+    """Genera `cantidad` filas dict reproducibles para la misma semilla."""
+    rnd = random.Random(semilla)
+    categorias = FORMAS[forma]
+    for i in range(1, cantidad + 1):
+        base = NOMBRES_BASE[(i - 1) % len(NOMBRES_BASE)]
+        # La primera aparición conserva el nombre real; el resto es único con sufijo
+        nombre = base if i <= len(NOMBRES_BASE) else f"{base}_{i}"
+        yield {
+            "id": str(i),
+            "internalId": str(i),
+            "name": nombre,
+            "displayName": nombre.replace("_", " ").title(),
+            "width": str(round(rnd.uniform(0.2, 4.0), 2)),
+            "height": str(round(rnd.uniform(0.2, 4.0), 2)),
+            "type": rnd.choice(TIPOS),
+            "category": rnd.choice(categorias),
+            "metadataKeys": str(rnd.sample(METADATOS, rnd.randint(3, len(METADATOS)))),
+        }
+
+
+def escribir_sintetico(ruta: str, cantidad: int, forma: str = "real", semilla: int = 42):
+    """Escribe un mobs.csv sintético de `cantidad` filas en `ruta`."""
+    with open(ruta, "w", encoding="utf-8", newline="") as f:
+        escritor = csv.DictWriter(f, fieldnames=ENCABEZADO)
+        escritor.writeheader()
+        escritor.writerows(generar_filas(cantidad, forma, semilla))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera un mobs.csv sintético.")
+    parser.add_argument("cantidad", type=int)
+    parser.add_argument("salida")
+    parser.add_argument("--forma", choices=sorted(FORMAS), default="real")
+    parser.add_argument("--semilla", type=int, default=42)
+    args = parser.parse_args()
+    escribir_sintetico(args.salida, args.cantidad, args.forma, args.semilla)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Memoria de los mobs cargados: lista de (dict, ruta) contra `mod.registros.ColeccionMobs`.
+
+Para cada tamaño genera un árbol sintético en una carpeta temporal, lo carga
+de las dos formas (y como `CatalogoMobs`, que guarda los mismos registros
+compactos más sus índices por id, nombre y nivel) y mide con tracemalloc los bytes que quedan vivos (sin
+contar lo temporal de la lectura). Informa bytes por fila y la proyección a
+`--proyectar` filas.
+
+Uso:
+    python benchmarks/memoria_mobs.py --tamanos 10000 100000 --salida memoria.json
+    python benchmarks/memoria_mobs.py --tamanos 1000000 --proyectar 10000000
+"""
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from generador import escribir_sintetico  # noqa: E402
+from mod.catalogo import BASE_DIR, CatalogoMobs  # noqa: E402
+from mod.etl import generar_jerarquia  # noqa: E402
+from mod.recorrido import buscar_hojas, leer_hojas  # noqa: E402
+from mod.registros import cargar_mobs  # noqa: E402
+
+
+def cargar_dicts(ruta_base):
+    """La representación actual: una tupla (dict de la fila, ruta de la hoja) por mob."""
+    return [(fila, ruta_csv) for ruta_csv, filas in leer_hojas(buscar_hojas(ruta_base)) for fila in filas]
+
+
+def medir_memoria(funcion, *args):
+    """Ejecuta `funcion` y devuelve (resultado, bytes vivos al terminar, segundos)."""
+    gc.collect()
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    resultado = funcion(*args)
+    segundos = time.perf_counter() - inicio
+    gc.collect()
+    actual, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, actual, segundos
+
+
+def medir_tamano(cantidad):
+    anterior = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="memoria_mobs_") as carpeta:
+        os.chdir(carpeta)
+        try:
+            escribir_sintetico("mobs.csv", cantidad)
+            with contextlib.redirect_stdout(io.StringIO()):
+                generar_jerarquia("mobs.csv", forzar=True)
+            dicts, bytes_dicts, segundos_dicts = medir_memoria(cargar_dicts, BASE_DIR)
+            filas = len(dicts)
+            muestra = dicts[::max(1, filas // 1000)]
+            del dicts
+            coleccion, bytes_compacto, segundos_compacto = medir_memoria(cargar_mobs, BASE_DIR)
+            # Los registros compactos deben devolver exactamente los mismos textos
+            iguales = all(dict(mob) == fila and ruta == ruta_mob
+                          for (fila, ruta), (mob, ruta_mob) in zip(muestra, coleccion[::max(1, filas // 1000)]))
+            del coleccion
+            catalogo, bytes_catalogo, segundos_catalogo = medir_memoria(CatalogoMobs, BASE_DIR)
+            iguales = iguales and all(dict(mob) == fila and ruta == ruta_mob for (fila, ruta), (mob, ruta_mob)
+                                      in zip(muestra, catalogo.registros()[::max(1, filas // 1000)]))
+        finally:
+            os.chdir(anterior)
+    return {
+        "filas": filas,
+        "dicts": {"bytes": bytes_dicts, "bytes_fila": bytes_dicts / filas, "segundos": segundos_dicts},
+        "compacto": {"bytes": bytes_compacto, "bytes_fila": bytes_compacto / filas, "segundos": segundos_compacto},
+        "catalogo": {"bytes": bytes_catalogo, "bytes_fila": bytes_catalogo / filas, "segundos": segundos_catalogo},
+        "iguales": iguales,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memoria de dicts por fila contra registros compactos.")
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--proyectar", type=int, default=10_000_000, help="filas para la proyección")
+    parser.add_argument("--salida", help="guardar los resultados en JSON")
+    args = parser.parse_args()
+
+    resultados = []
+    for cantidad in args.tamanos:
+        resultado = medir_tamano(cantidad)
+        resultados.append(resultado)
+        dicts, compacto, catalogo = resultado["dicts"], resultado["compacto"], resultado["catalogo"]
+        print(f"{resultado['filas']} filas | dicts: {dicts['bytes_fila']:.0f} B/fila "
+              f"({dicts['bytes'] / 2 ** 20:.1f} MiB, {dicts['segundos']:.2f} s) | "
+              f"compacto: {compacto['bytes_fila']:.0f} B/fila "
+              f"({compacto['bytes'] / 2 ** 20:.1f} MiB, {compacto['segundos']:.2f} s) | "
+              f"{dicts['bytes'] / compacto['bytes']:.1f}x menos | "
+              f"catálogo: {catalogo['bytes_fila']:.0f} B/fila ({catalogo['segundos']:.2f} s)"
+              f"{'' if resultado['iguales'] else ' | ERROR: los registros no coinciden'}")
+        print(f"  proyección a {args.proyectar} filas: dicts {dicts['bytes_fila'] * args.proyectar / 2 ** 30:.1f} GiB,"
+              f" compacto {compacto['bytes_fila'] * args.proyectar / 2 ** 30:.1f} GiB,"
+              f" catálogo {catalogo['bytes_fila'] * args.proyectar / 2 ** 30:.1f} GiB")
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=1)
+    if not all(r["iguales"] for r in resultados):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
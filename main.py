@@ -1,13 +1,28 @@
+"""Gestor de mobs: menú interactivo o subcomandos para scripts.
+
+Sin argumentos abre el menú. Con un subcomando trabaja sin preguntar nada:
+    python main.py search zombie
+    python main.py query "width > 1.5 AND movilidad = volador AND type != hostile"
+    python main.py dims --height 0.5:1.0        (o --cabe 1x2: pasan por un hueco de 1x2)
+    python main.py sort --key=-width --limite 10 --formato csv
+    python main.py add -c id=9001 -c name=test -c category="Hostile mobs" -c type=hostile
+    python main.py update --entrada cambios.jsonl      (o "-" para leer de stdin)
+    python main.py delete test
+    python main.py generate --forzar
+
+Los subcomandos no regeneran la jerarquía (salvo `generate`) y solo importan
+los módulos que usan, así cada invocación arranca rápido. Con `--perfil tabla`
+(o MOBS_PERFIL=tabla) se informan en stderr los tiempos y la E/S de la corrida.
+"""
+import argparse
+import csv
+import json
 import os
-from mod.etl import buscar_interactivo, generar_jerarquia
-from mod.crud import (
-	listar_interactivo,
-	agregar_interactivo,
-	actualizar_interactivo,
-	eliminar_interactivo,
-	estadisticas_interactivo,
-	ordenar_interactivo,
-)
+import sys
+
+
+# Formatos de salida de los subcomandos
+FORMATOS = ("json", "jsonl", "csv")
 
 
 def mostrar_menu():
@@ -21,7 +36,17 @@ def mostrar_menu():
 	print("7) Ordenar mobs globalmente")
 	print("0) Salir")
 
-def main():
+def menu_interactivo():
+	from mod.etl import buscar_interactivo, generar_jerarquia
+	from mod.crud import (
+		listar_interactivo,
+		agregar_interactivo,
+		actualizar_interactivo,
+		eliminar_interactivo,
+		estadisticas_interactivo,
+		ordenar_interactivo,
+	)
+
 	# Crear estructura base si no existe
 	os.makedirs("minecraft", exist_ok=True)
 	# Generar automáticamente la jerarquía (desde mobs.csv) al iniciar
@@ -56,7 +81,254 @@ def main():
 			print("Opción no válida. Intenta nuevamente.")
 		input("Presione Enter...")
 
+# -------------------- Subcomandos --------------------
+def _aplanar(datos, prefijo=""):
+	"""Convierte un dict anidado en filas {"clave", "valor"} con claves "a.b.c"."""
+	filas = []
+	for clave, valor in datos.items():
+		nombre = f"{prefijo}{clave}"
+		if isinstance(valor, dict):
+			filas.extend(_aplanar(valor, nombre + "."))
+		else:
+			filas.append({"clave": nombre, "valor": json.dumps(valor) if isinstance(valor, list) else valor})
+	return filas
+
+
+def escribir_salida(datos, formato="json", salida=None):
+	"""Escribe `datos` (lista de dicts o un dict) en `salida` (stdout) como JSON, JSON Lines o CSV."""
+	salida = salida or sys.stdout
+	if formato == "json":
+		json.dump(datos, salida, ensure_ascii=False, indent=1)
+		salida.write("\n")
+		return
+	filas = datos if isinstance(datos, list) else [datos]
+	if formato == "jsonl":
+		for fila in filas:
+			salida.write(json.dumps(fila, ensure_ascii=False) + "\n")
+		return
+	if isinstance(datos, dict):
+		filas = _aplanar(datos)
+	# Columnas en orden de aparición (las filas pueden no tener todas las claves)
+	campos = list(dict.fromkeys(campo for fila in filas for campo in fila))
+	escritor = csv.DictWriter(salida, fieldnames=campos, lineterminator="\n")
+	escritor.writeheader()
+	escritor.writerows(filas)
+
+
+def _mobs(registros, ruta_base):
+	from mod.utils import mob_con_ruta
+	return [mob_con_ruta(mob, ruta_csv, ruta_base) for mob, ruta_csv in registros]
+
+
+def _cmd_list(args):
+	from mod.catalogo import recorrer_mobs
+	from mod.recorrido import VisitanteArbol
+
+	class _Juntar(VisitanteArbol):
+		def __init__(self):
+			self.registros = []
+
+		def visitar_hoja(self, ruta_csv, filas):
+			self.registros.extend((fila, ruta_csv) for fila in filas)
+			return args.limite is not None and len(self.registros) >= args.limite
+
+	visitante = _Juntar()
+	recorrer_mobs(args.ruta_base, visitante)
+	registros = visitante.registros if args.limite is None else visitante.registros[:args.limite]
+	escribir_salida(_mobs(registros, args.ruta_base), args.formato)
+
+
+def _cmd_search(args):
+	from mod.crud import buscar_mob
+	escribir_salida(_mobs(buscar_mob(args.termino, args.ruta_base), args.ruta_base), args.formato)
+
+
+def _cmd_query(args):
+	from mod.consultas import consultar
+	try:
+		registros = consultar(args.ruta_base, args.consulta)
+	except ValueError as e:
+		print(e, file=sys.stderr)
+		return 2
+	escribir_salida(_mobs(registros, args.ruta_base), args.formato)
+
+
+def _rango(texto):
+	"""'MIN:MAX' -> (min, max); cualquiera de los dos puede faltar ('1.5:' o ':2')."""
+	minimo, separador, maximo = texto.partition(":")
+	try:
+		if not separador:
+			return float(minimo), float(minimo)
+		return (float(minimo) if minimo else None), (float(maximo) if maximo else None)
+	except ValueError:
+		raise argparse.ArgumentTypeError(f"rango inválido (se espera MIN:MAX): {texto!r}") from None
+
+
+def _hueco(texto):
+	ancho, _, alto = texto.lower().partition("x")
+	try:
+		return float(ancho), float(alto)
+	except ValueError:
+		raise argparse.ArgumentTypeError(f"hueco inválido (se espera ANCHOxALTO): {texto!r}") from None
+
+
+def _cmd_dims(args):
+	from mod.crud import buscar_por_dimensiones
+	rangos = {campo: getattr(args, campo) for campo in ("width", "height", "area") if getattr(args, campo)}
+	if args.cabe:
+		rangos["width"] = (None, args.cabe[0])
+		rangos["height"] = (None, args.cabe[1])
+	if not rangos:
+		print("Indicar al menos --width, --height, --area o --cabe", file=sys.stderr)
+		return 2
+	escribir_salida(_mobs(buscar_por_dimensiones(args.ruta_base, **rangos), args.ruta_base), args.formato)
+
+
+def _cmd_stats(args):
+	if args.verificar or args.reparar:
+		from mod.indices import verificar_agregados
+		resultado = verificar_agregados(args.ruta_base, reparar=args.reparar)
+		escribir_salida(resultado, args.formato)
+		return 0 if resultado["ok"] else 1
+	from mod.utils import estadisticas_mobs
+	try:
+		stats = estadisticas_mobs(args.ruta_base, percentiles=args.percentiles, agrupar_por=args.por)
+	except ValueError as e:
+		print(e, file=sys.stderr)
+		return 2
+	escribir_salida(stats, args.formato)
+
+
+def _cmd_sort(args):
+	from mod.utils import ordenar_mobs
+	ordenados = ordenar_mobs(args.ruta_base, key=args.key, reverse=args.reverse, limit=args.limite, offset=args.offset)
+	escribir_salida(_mobs(ordenados, args.ruta_base), args.formato)
+
+
+def _leer_lote(args, op):
+	"""Operaciones de `--entrada` (archivo o "-" para stdin) o, si no hay, de los argumentos."""
+	from mod.lote import leer_operaciones_de
+	if args.entrada:
+		formato = args.formato_entrada or ("csv" if args.entrada.lower().endswith(".csv") else "jsonl")
+		if args.entrada == "-":
+			operaciones = leer_operaciones_de(sys.stdin, formato)
+		else:
+			with open(args.entrada, "r", encoding="utf-8", newline="") as f:
+				operaciones = leer_operaciones_de(f, formato)
+		for operacion in operaciones:
+			operacion["op"] = operacion.get("op") or op
+		return operaciones
+
+	valores = {}
+	for campo in getattr(args, "campo", None) or []:
+		nombre, separador, valor = campo.partition("=")
+		if not separador:
+			raise SystemExit(f"Campo inválido (se espera campo=valor): {campo!r}")
+		valores[nombre.strip()] = valor
+	claves = getattr(args, "claves", None) or [None]
+	return [{"op": op, "clave": clave, "valores": valores} for clave in claves]
+
+
+def _cmd_cambios(op):
+	def comando(args):
+		from mod.lote import aplicar_lote
+		resultados = aplicar_lote(_leer_lote(args, op), args.ruta_base)
+		escribir_salida(resultados, args.formato)
+		return 1 if any(r["estado"] != "ok" for r in resultados) else 0
+	return comando
+
+
+def _cmd_generate(args):
+	import contextlib
+	from mod.etl import generar_jerarquia
+	# Los mensajes de la ETL van a stderr: stdout queda para el resultado
+	with contextlib.redirect_stdout(sys.stderr):
+		resumen = generar_jerarquia(args.entrada, forzar=args.forzar, streaming=args.streaming,
+									trabajadores=args.trabajadores, ruta_base=args.ruta_base)
+	escribir_salida(resumen or {"filas": 0, "hojas": 0, "escritas": 0}, args.formato)
+
+
+def crear_parser():
+	# Opciones comunes: valen antes o después del subcomando
+	comunes = argparse.ArgumentParser(add_help=False)
+	comunes.add_argument("--ruta-base", default=argparse.SUPPRESS, help="raíz del árbol de mobs (por defecto: minecraft)")
+	comunes.add_argument("--formato", choices=FORMATOS, default=argparse.SUPPRESS, help="formato de la salida (por defecto: json)")
+	comunes.add_argument("--perfil", choices=("tabla", "json"), default=argparse.SUPPRESS,
+						 help="al terminar, escribir en stderr tiempos y contadores de E/S (ver mod.perfil)")
+
+	parser = argparse.ArgumentParser(description="Gestor de mobs de Minecraft (sin argumentos: menú interactivo).",
+									 parents=[comunes])
+	sub = parser.add_subparsers(dest="comando", required=True)
+
+	p = sub.add_parser("list", parents=[comunes], help="listar mobs (recorriendo el árbol)")
+	p.add_argument("--limite", type=int)
+	p.set_defaults(funcion=_cmd_list)
+
+	p = sub.add_parser("search", parents=[comunes], help="buscar por id o nombre (parcial)")
+	p.add_argument("termino")
+	p.set_defaults(funcion=_cmd_search)
+
+	p = sub.add_parser("query", parents=[comunes], help='filtrar con varias condiciones ("width > 1.5 AND movilidad = volador")')
+	p.add_argument("consulta", help="comparaciones campo op valor (=, !=, >, >=, <, <=, ~ contiene, !~) con AND, OR, NOT y paréntesis")
+	p.set_defaults(funcion=_cmd_query)
+
+	p = sub.add_parser("dims", parents=[comunes], help="mobs por rangos de dimensiones (índice ordenado)")
+	for campo in ("width", "height", "area"):
+		p.add_argument(f"--{campo}", type=_rango, metavar="MIN:MAX")
+	p.add_argument("--cabe", type=_hueco, metavar="ANCHOxALTO", help="mobs que pasan por un hueco de ese tamaño")
+	p.set_defaults(funcion=_cmd_dims)
+
+	p = sub.add_parser("stats", parents=[comunes], help="estadísticas globales")
+	p.add_argument("--verificar", action="store_true", help="recalcular desde el disco y comparar con los agregados y los índices")
+	p.add_argument("--reparar", action="store_true", help="como --verificar, y reemplazar lo que no coincida")
+	p.add_argument("--percentiles", action="store_true", help="agregar mediana, p90, p99 e histograma (recorre todas las filas)")
+	p.add_argument("--por", metavar="COLUMNA", help="agregar el resumen por cada valor de COLUMNA (category, hostilidad, ...)")
+	p.set_defaults(funcion=_cmd_stats)
+
+	p = sub.add_parser("sort", parents=[comunes], help="mobs ordenados")
+	p.add_argument("--key", default="name", help='clave o claves ("category,-width"; con "-" adelante usar --key=-width)')
+	p.add_argument("--reverse", action="store_true")
+	p.add_argument("--limite", type=int)
+	p.add_argument("--offset", type=int, default=0)
+	p.set_defaults(funcion=_cmd_sort)
+
+	for nombre, op, ayuda in (("add", "agregar", "agregar mobs"),
+							  ("update", "actualizar", "actualizar mobs (por id o name)"),
+							  ("delete", "eliminar", "eliminar mobs (por name)")):
+		p = sub.add_parser(nombre, help=ayuda, parents=[comunes])
+		if op != "agregar":
+			p.add_argument("claves", nargs="*", metavar="clave")
+		if op != "eliminar":
+			p.add_argument("-c", "--campo", action="append", metavar="CAMPO=VALOR")
+		p.add_argument("--entrada", help='archivo de operaciones .jsonl/.csv ("-": stdin)')
+		p.add_argument("--formato-entrada", choices=("jsonl", "csv"))
+		p.set_defaults(funcion=_cmd_cambios(op))
+
+	p = sub.add_parser("generate", parents=[comunes], help="regenerar la jerarquía desde el CSV de origen")
+	p.add_argument("--entrada", default="mobs.csv")
+	p.add_argument("--forzar", action="store_true", help="ignorar el manifiesto y reescribir todo")
+	p.add_argument("--streaming", action="store_true")
+	p.add_argument("--trabajadores", type=int, default=0)
+	p.set_defaults(funcion=_cmd_generate)
+	return parser
+
+
+def main(argv=None):
+	argv = sys.argv[1:] if argv is None else argv
+	if not argv:
+		menu_interactivo()
+		return 0
+	args = crear_parser().parse_args(argv)
+	# Los valores por defecto se completan acá: las opciones comunes se comparten entre parsers
+	vars(args).setdefault("ruta_base", "minecraft")
+	vars(args).setdefault("formato", "json")
+	if getattr(args, "perfil", None):
+		from mod.perfil import activar
+		activar(args.perfil)
+	return args.funcion(args) or 0
+
+
 if __name__ == "__main__":
-	main()
+	sys.exit(main())
 
 
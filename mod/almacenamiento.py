@@ -0,0 +1,389 @@
+import csv
+import io
+import math
+import os
+import struct
+import sys
+from array import array
+from itertools import repeat
+from typing import Dict, List, Optional
+
+from mod.perfil import contar
+
+
+# Nombre lógico de cada hoja: catálogo, índices y rutas siempre usan ".../mobs.csv"
+NOMBRE_HOJA = "mobs.csv"
+
+# Variable de entorno para elegir el formato de las hojas ("csv" o "binario")
+VARIABLE_ENTORNO = "MOBS_ALMACENAMIENTO"
+
+
+def _termina_en_salto(path: str) -> bool:
+    """True si el último byte de `path` es un salto de línea (o el archivo está vacío)."""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() == 0:
+            return True
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def publicar_archivo(path: str, contenido: bytes, sincronizar: bool = True):
+    """Escribe `contenido` en un temporal y lo publica con `os.replace` (nunca deja `path` a medias)."""
+    os.makedirs(os.path.dirname(path) or os.curdir, exist_ok=True)
+    temporal = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporal, "wb") as f:
+            f.write(contenido)
+            contar("archivos_escritos")
+            contar("bytes_escritos", len(contenido))
+            if sincronizar:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(temporal, path)
+    except BaseException:
+        try:
+            os.remove(temporal)
+        except OSError:
+            pass
+        raise
+
+
+def _validar_esquema(path: str, encabezado: List[str], fila: Dict[str, str], campos: Optional[List[str]]):
+    if campos and set(encabezado) != set(campos):
+        raise ValueError(f"El encabezado de {path} no coincide con el esquema: {encabezado}")
+    sobrantes = set(fila) - set(encabezado)
+    if sobrantes:
+        raise ValueError(f"Campos desconocidos para {path}: {sorted(sobrantes)}")
+
+
+class AlmacenamientoCSV:
+    """Formato original: cada hoja es un `mobs.csv` con encabezado."""
+
+    nombre = "csv"
+    nombre_hoja = NOMBRE_HOJA
+
+    def ruta_fisica(self, ruta: str) -> str:
+        """Archivo real en disco para la hoja lógica `ruta` (.../mobs.csv)."""
+        if os.path.basename(ruta) != NOMBRE_HOJA:
+            return ruta
+        return os.path.join(os.path.dirname(ruta), self.nombre_hoja)
+
+    def leer(self, ruta: str) -> List[Dict[str, str]]:
+        """Filas de la hoja `ruta` como diccionarios. Devuelve [] si no existe."""
+        path = self.ruta_fisica(ruta)
+        if not os.path.exists(path):
+            return []
+        with open(path, "rb") as f:
+            contenido = f.read()
+        filas = self.deserializar(contenido)
+        contar("archivos_leidos")
+        contar("bytes_leidos", len(contenido))
+        contar("filas_leidas", len(filas))
+        return filas
+
+    def serializar(self, filas: List[Dict[str, str]], campos: List[str]) -> bytes:
+        """Bytes exactos del archivo de la hoja con `filas` y encabezado `campos`."""
+        buffer = io.StringIO(newline="")
+        escritor = csv.DictWriter(buffer, fieldnames=campos)
+        escritor.writeheader()
+        escritor.writerows(filas)
+        return buffer.getvalue().encode("utf-8")
+
+    def deserializar(self, contenido: bytes) -> List[Dict[str, str]]:
+        return list(csv.DictReader(io.StringIO(contenido.decode("utf-8"), newline="")))
+
+    def escribir(self, ruta: str, filas: List[Dict[str, str]], campos: Optional[List[str]] = None,
+                 sincronizar: bool = True):
+        """Escribe la hoja completa de forma atómica (temporal + `os.replace`).
+
+        Sin filas ni `campos` queda un archivo vacío: escribir nunca borra la hoja.
+        Con `sincronizar` se hace fsync antes de publicar.
+        """
+        if campos is None:
+            campos = list(filas[0].keys()) if filas else []
+        contenido = self.serializar(filas, campos) if campos else b""
+        contar("filas_escritas", len(filas))
+        publicar_archivo(self.ruta_fisica(ruta), contenido, sincronizar)
+
+    def anexar(self, ruta: str, fila: Dict[str, str], campos: Optional[List[str]] = None):
+        """Agrega una fila al final sin reescribir el archivo (ver `mod.utils.anexar_csv`)."""
+        self.anexar_filas(ruta, [fila], campos)
+
+    def anexar_filas(self, ruta: str, filas: List[Dict[str, str]], campos: Optional[List[str]] = None,
+                     sincronizar: bool = True):
+        """Agrega `filas` al final de la hoja con un solo append (y un fsync si `sincronizar`)."""
+        if not filas:
+            return
+        path = self.ruta_fisica(ruta)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "a+", encoding="utf-8", newline="") as f:
+            tamano = os.fstat(f.fileno()).st_size
+            f.seek(0)
+            encabezado = next(csv.reader([f.readline()]), None)
+            if not encabezado:
+                encabezado = list(campos) if campos else list(filas[0].keys())
+                escritor = csv.DictWriter(f, fieldnames=encabezado)
+                escritor.writeheader()
+            else:
+                for fila in filas:
+                    _validar_esquema(path, encabezado, fila, campos)
+                # Si la última línea no terminó en salto de línea, completarla
+                if not _termina_en_salto(path):
+                    f.write("\r\n")
+                escritor = csv.DictWriter(f, fieldnames=encabezado)
+            escritor.writerows(filas)
+            f.flush()
+            contar("archivos_escritos")
+            contar("filas_escritas", len(filas))
+            contar("bytes_escritos", os.fstat(f.fileno()).st_size - tamano)
+            if sincronizar:
+                os.fsync(f.fileno())
+
+
+# -------------------- Formato binario --------------------
+# Archivo mobs.bin (little-endian):
+#   cabecera      "<4sBHII": magia, versión, columnas, filas, cadenas
+#   por columna   "<cH" + nombre utf-8: tipo ('q' int64, 'd' float64, 'I' índice de cadena)
+#   cadenas       (cadenas + 1) offsets uint32 en caracteres, largo uint32 y texto utf-8
+#   datos         un bloque de ancho fijo por columna, en el orden de las columnas
+# Como cada columna tiene ancho fijo, el valor de la fila i está en
+# inicio_columna + i * ancho: el índice de filas es implícito (ver `leer_fila`).
+
+MAGIA = b"MOBB"
+VERSION = 1
+_CABECERA = struct.Struct("<4sBHII")
+_COLUMNA = struct.Struct("<cH")
+_UINT32 = struct.Struct("<I")
+_ANCHOS = {"q": 8, "d": 8, "I": 4}
+# Código de array con 4 bytes por elemento para los índices de cadenas
+_CODIGO_INDICE = "I" if array("I").itemsize == 4 else "L"
+
+
+def _texto(valor) -> str:
+    # Igual que csv.DictWriter: None se escribe como vacío
+    return "" if valor is None else str(valor)
+
+
+def formatear_float(valor: float) -> str:
+    texto = repr(valor)
+    return texto[:-2] if texto.endswith(".0") else texto
+
+
+def _tipo_columna(valores: List[str]) -> str:
+    """'q' o 'd' solo si todos los valores vuelven a su texto exacto; si no, 'I' (cadenas)."""
+    if not valores:
+        return "I"
+    try:
+        if all(str(int(v)) == v and -(1 << 63) <= int(v) < (1 << 63) for v in valores):
+            return "q"
+    except ValueError:
+        pass
+    try:
+        # Sin NaN ni -0: los valores se decodifican con un dict float -> texto
+        if all(formatear_float(float(v)) == v and not math.isnan(float(v)) and (float(v) or v == "0")
+               for v in valores):
+            return "d"
+    except ValueError:
+        pass
+    return "I"
+
+
+def _a_little_endian(datos: array) -> array:
+    if sys.byteorder == "big":
+        datos = array(datos.typecode, datos)
+        datos.byteswap()
+    return datos
+
+
+class AlmacenamientoBinario(AlmacenamientoCSV):
+    """Hojas `mobs.bin` con columnas de ancho fijo y una tabla de cadenas.
+
+    Los números se guardan como int64/float64 solo si vuelven exactamente al
+    texto original, así CSV -> binario -> CSV produce los mismos bytes. Cada
+    texto distinto se guarda una vez y las filas lo referencian por índice.
+    """
+
+    nombre = "binario"
+    nombre_hoja = "mobs.bin"
+
+    def serializar(self, filas: List[Dict[str, str]], campos: List[str]) -> bytes:
+        cadenas: Dict[str, int] = {}
+        tipos = []
+        bloques = []
+        for campo in campos:
+            valores = [_texto(fila.get(campo)) for fila in filas]
+            tipo = _tipo_columna(valores)
+            if tipo == "q":
+                datos = array("q", map(int, valores))
+            elif tipo == "d":
+                datos = array("d", map(float, valores))
+            else:
+                datos = array(_CODIGO_INDICE, [cadenas.setdefault(v, len(cadenas)) for v in valores])
+            tipos.append(tipo)
+            bloques.append(_a_little_endian(datos).tobytes())
+
+        partes = [_CABECERA.pack(MAGIA, VERSION, len(campos), len(filas), len(cadenas))]
+        for campo, tipo in zip(campos, tipos):
+            nombre = campo.encode("utf-8")
+            partes.append(_COLUMNA.pack(tipo.encode("ascii"), len(nombre)) + nombre)
+        offsets = array(_CODIGO_INDICE, [0])
+        for texto in cadenas:  # los dict conservan el orden de inserción = índice
+            offsets.append(offsets[-1] + len(texto))
+        texto = "".join(cadenas).encode("utf-8")
+        partes.append(_a_little_endian(offsets).tobytes())
+        partes.append(_UINT32.pack(len(texto)) + texto)
+        partes.extend(bloques)
+        return b"".join(partes)
+
+    def _cabecera(self, contenido: bytes):
+        """Decodifica cabecera y tabla de cadenas. Retorna (columnas, filas, cadenas, inicio_datos)."""
+        magia, version, total_columnas, total_filas, total_cadenas = _CABECERA.unpack_from(contenido, 0)
+        if magia != MAGIA or version != VERSION:
+            raise ValueError("No es una hoja binaria de mobs (o su versión no es compatible)")
+        posicion = _CABECERA.size
+        columnas = []
+        for _ in range(total_columnas):
+            tipo, largo = _COLUMNA.unpack_from(contenido, posicion)
+            posicion += _COLUMNA.size
+            columnas.append((contenido[posicion:posicion + largo].decode("utf-8"), tipo.decode("ascii")))
+            posicion += largo
+        offsets = array(_CODIGO_INDICE)
+        offsets.frombytes(contenido[posicion:posicion + 4 * (total_cadenas + 1)])
+        offsets = _a_little_endian(offsets)
+        posicion += 4 * (total_cadenas + 1)
+        (largo,) = _UINT32.unpack_from(contenido, posicion)
+        posicion += _UINT32.size
+        texto = contenido[posicion:posicion + largo].decode("utf-8")
+        cadenas = list(map(texto.__getitem__, map(slice, offsets[:-1], offsets[1:])))
+        return columnas, total_filas, cadenas, posicion + largo
+
+    def deserializar(self, contenido: bytes) -> List[Dict[str, str]]:
+        if not contenido:
+            return []
+        columnas, total_filas, cadenas, posicion = self._cabecera(contenido)
+        valores = []
+        for _, tipo in columnas:
+            fin = posicion + total_filas * _ANCHOS[tipo]
+            datos = array(_CODIGO_INDICE if tipo == "I" else tipo)
+            datos.frombytes(contenido[posicion:fin])
+            datos = _a_little_endian(datos)
+            posicion = fin
+            # Decodificar la columna entera con map (sin bucles en Python por valor)
+            if tipo == "q":
+                valores.append(list(map(str, datos)))
+            elif tipo == "d":
+                textos = {v: formatear_float(v) for v in set(datos)}
+                valores.append(list(map(textos.__getitem__, datos)))
+            else:
+                valores.append(list(map(cadenas.__getitem__, datos)))
+        campos = [nombre for nombre, _ in columnas]
+        return list(map(dict, map(zip, repeat(campos), zip(*valores))))
+
+    def leer_fila(self, ruta: str, indice: int) -> Dict[str, str]:
+        """Lee solo la fila `indice` de la hoja, ubicándola por offset en cada columna."""
+        with open(self.ruta_fisica(ruta), "rb") as f:
+            contenido = f.read()
+        contar("archivos_leidos")
+        contar("bytes_leidos", len(contenido))
+        contar("filas_leidas")
+        columnas, total_filas, cadenas, posicion = self._cabecera(contenido)
+        if not 0 <= indice < total_filas:
+            raise IndexError(f"La hoja {ruta} tiene {total_filas} filas")
+        fila = {}
+        for nombre, tipo in columnas:
+            ancho = _ANCHOS[tipo]
+            (valor,) = struct.unpack_from("<" + tipo, contenido, posicion + indice * ancho)
+            if tipo == "q":
+                fila[nombre] = str(valor)
+            elif tipo == "d":
+                fila[nombre] = formatear_float(valor)
+            else:
+                fila[nombre] = cadenas[valor]
+            posicion += total_filas * ancho
+        return fila
+
+    def anexar_filas(self, ruta: str, filas: List[Dict[str, str]], campos: Optional[List[str]] = None,
+                     sincronizar: bool = True):
+        """Agrega filas reescribiendo la hoja (el formato por columnas no admite append).
+
+        Se escribe a un temporal y se reemplaza la hoja de forma atómica.
+        """
+        if not filas:
+            return
+        path = self.ruta_fisica(ruta)
+        contenido = b""
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                contenido = f.read()
+            contar("archivos_leidos")
+            contar("bytes_leidos", len(contenido))
+        if contenido:
+            columnas = [nombre for nombre, _ in self._cabecera(contenido)[0]]
+            for fila in filas:
+                _validar_esquema(path, columnas, fila, campos)
+            existentes = self.deserializar(contenido)
+        else:
+            columnas = list(campos) if campos else list(filas[0].keys())
+            existentes = []
+        contar("filas_escritas", len(filas))
+        publicar_archivo(path, self.serializar(existentes + list(filas), columnas), sincronizar)
+
+
+ALMACENAMIENTOS = {
+    "csv": AlmacenamientoCSV,
+    "binario": AlmacenamientoBinario,
+}
+
+_actual: Optional[AlmacenamientoCSV] = None
+
+
+def crear_almacenamiento(nombre: str) -> AlmacenamientoCSV:
+    try:
+        return ALMACENAMIENTOS[nombre.strip().lower()]()
+    except KeyError:
+        raise ValueError(f"Almacenamiento desconocido: {nombre!r} (opciones: {sorted(ALMACENAMIENTOS)})") from None
+
+
+def obtener_almacenamiento() -> AlmacenamientoCSV:
+    """Almacenamiento en uso: el configurado, o el de $MOBS_ALMACENAMIENTO (csv por defecto)."""
+    global _actual
+    if _actual is None:
+        _actual = crear_almacenamiento(os.environ.get(VARIABLE_ENTORNO) or "csv")
+    return _actual
+
+
+def configurar_almacenamiento(nombre: str) -> AlmacenamientoCSV:
+    """Cambia el formato de las hojas para todo el proceso.
+
+    No convierte los archivos existentes: para eso usar `convertir_arbol`.
+    """
+    global _actual
+    _actual = crear_almacenamiento(nombre)
+    return _actual
+
+
+def convertir_arbol(ruta_base: str, destino: str, origen: Optional[str] = None, carpeta_destino: Optional[str] = None) -> int:
+    """Convierte cada hoja bajo `ruta_base` del formato `origen` (el actual por defecto) a `destino`.
+
+    Sin `carpeta_destino` la conversión es en el lugar (se borra el archivo de
+    origen). Con `carpeta_destino` se copia el árbol convertido a esa carpeta,
+    p. ej. para exportar a CSV sin tocar el árbol binario.
+    Retorna la cantidad de hojas convertidas.
+    """
+    from mod.recorrido import buscar_hojas  # import local: recorrido usa este módulo
+    lector = crear_almacenamiento(origen) if origen else obtener_almacenamiento()
+    escritor = crear_almacenamiento(destino)
+    convertidas = 0
+    for ruta in buscar_hojas(ruta_base, almacenamiento=lector):
+        filas = lector.leer(ruta)
+        if not filas:
+            continue
+        salida = ruta
+        if carpeta_destino is not None:
+            salida = os.path.join(carpeta_destino, os.path.relpath(ruta, ruta_base))
+        escritor.escribir(salida, filas)
+        if carpeta_destino is None and lector.ruta_fisica(ruta) != escritor.ruta_fisica(ruta):
+            os.remove(lector.ruta_fisica(ruta))
+        convertidas += 1
+    return convertidas
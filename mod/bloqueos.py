@@ -0,0 +1,81 @@
+import os
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+try:
+    import fcntl  # Solo disponible en sistemas tipo Unix
+except ImportError:
+    fcntl = None
+
+
+# Archivo de bloqueo de cada hoja, en la misma carpeta que su mobs.csv
+ARCHIVO_BLOQUEO = ".mobs.lock"
+
+
+def ruta_bloqueo(ruta_csv: str) -> str:
+    """Archivo de bloqueo de la hoja `ruta_csv` (oculto: el recorrido lo ignora)."""
+    return os.path.join(os.path.dirname(ruta_csv), ARCHIVO_BLOQUEO)
+
+
+class Bloqueo:
+    """Bloqueo entre procesos de lectores/escritor sobre el archivo `ruta` (fcntl.flock).
+
+    - Compartido: varios lectores a la vez.
+    - Exclusivo: un solo escritor, sin lectores.
+    Sin fcntl (Windows) los bloqueos no hacen nada. Cada instancia abre su propio
+    descriptor, así que dos bloqueos del mismo proceso también se excluyen.
+    """
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self._fd: Optional[int] = None
+        self.exclusivo = False
+
+    @property
+    def tomado(self) -> bool:
+        return self._fd is not None
+
+    def adquirir(self, exclusivo: bool = False, bloquear: bool = True) -> bool:
+        """Toma el bloqueo. Con `bloquear=False` retorna False en lugar de esperar."""
+        if self._fd is not None:
+            raise RuntimeError(f"El bloqueo {self.ruta} ya está tomado")
+        if fcntl is None:
+            self._fd, self.exclusivo = -1, exclusivo
+            return True
+        os.makedirs(os.path.dirname(self.ruta) or os.curdir, exist_ok=True)
+        fd = os.open(self.ruta, os.O_RDWR | os.O_CREAT, 0o644)
+        modo = fcntl.LOCK_EX if exclusivo else fcntl.LOCK_SH
+        try:
+            fcntl.flock(fd, modo if bloquear else modo | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        except BaseException:
+            os.close(fd)
+            raise
+        self._fd, self.exclusivo = fd, exclusivo
+        return True
+
+    def liberar(self):
+        if self._fd is None:
+            return
+        fd, self._fd = self._fd, None
+        if fcntl is not None:
+            # Cerrar el descriptor libera el flock
+            os.close(fd)
+
+
+@contextmanager
+def bloqueo_archivo(ruta: str, exclusivo: bool = False) -> Iterator[Bloqueo]:
+    """Context manager: toma el bloqueo de `ruta` (esperando) y lo libera al salir."""
+    bloqueo = Bloqueo(ruta)
+    bloqueo.adquirir(exclusivo)
+    try:
+        yield bloqueo
+    finally:
+        bloqueo.liberar()
+
+
+def bloqueo_hoja(ruta_csv: str, exclusivo: bool = False):
+    """Bloqueo de lectura (o escritura, con `exclusivo`) de la hoja `ruta_csv`."""
+    return bloqueo_archivo(ruta_bloqueo(ruta_csv), exclusivo)
@@ -0,0 +1,571 @@
+import atexit
+import os
+from typing import Dict, List, Optional, Set, Tuple
+
+from mod.almacenamiento import obtener_almacenamiento
+from mod.bloqueos import Bloqueo, bloqueo_hoja, ruta_bloqueo
+from mod.diario import Diario
+from mod.perfil import seccion
+from mod.recorrido import buscar_hojas, leer_hojas, recorrer_arbol
+from mod.utils import leer_csv
+
+
+# Ruta base por defecto de la jerarquía
+BASE_DIR = "minecraft"
+
+# Motor que guarda los mobs: "arbol" (hojas en carpetas) o "sqlite" (ver mod.catalogo_sqlite)
+MOTORES = ("arbol", "sqlite")
+VARIABLE_MOTOR = "MOBS_MOTOR"
+
+
+def _clave(valor) -> str:
+    """Normaliza un valor para usarlo como clave de índice (sin espacios, minúsculas)."""
+    texto = str(valor if valor is not None else "")
+    clave = texto.strip().lower()
+    # Si ya estaba normalizado se usa el mismo string: la clave no ocupa memoria aparte
+    return texto if clave == texto else clave
+
+
+def _agregar_entrada(indice: Dict, clave: str, fila: Dict[str, str]):
+    """Agrega `fila` bajo `clave`: una clave con una sola fila la guarda sola, sin lista."""
+    actual = indice.get(clave)
+    if actual is None:
+        indice[clave] = fila
+    elif type(actual) is list:
+        actual.append(fila)
+    else:
+        indice[clave] = [actual, fila]
+
+
+def _entradas(indice: Dict, clave: str) -> List[Dict[str, str]]:
+    """Filas guardadas bajo `clave` (ver `_agregar_entrada`)."""
+    actual = indice.get(clave)
+    if actual is None:
+        return []
+    return actual if type(actual) is list else [actual]
+
+
+class CatalogoMobs:
+    """Índice en memoria de todos los mobs del árbol, cargado una sola vez.
+
+    - `hojas`: ruta de cada mobs.csv -> lista de filas de esa hoja (en orden).
+      Las filas son registros compactos (`mod.registros.Mob`, sin un dict por
+      fila) que guardan el número de su hoja; las que no tienen exactamente las
+      columnas de `ENCABEZADOS` (hojas editadas a mano) quedan como dict.
+    - `por_id` / `por_nombre`: clave normalizada -> fila, o lista de filas si
+      la clave se repite.
+    - `rutas`: id(fila) -> ruta_csv, solo para las filas que quedaron como dict.
+    - `por_nivel`: posición del nivel -> nombre de carpeta -> rutas de hojas
+      bajo esa carpeta (p. ej. 2 -> "volador" -> {.../volador/mobs.csv}).
+    - `derivados`: estructuras que se mantienen junto al catálogo (por ejemplo
+      `mod.indices.IndiceUnico`); reciben `insertar`/`quitar` en cada mutación
+      y `guardar` al confirmarla, con el bloqueo del diario y con el catálogo
+      al día con el disco (ver `_al_publicar`), así un proceso no pisa lo que
+      guardó otro.
+
+    Las mutaciones actualizan los índices y tocan solo la hoja afectada:
+    `agregar` anexa una línea; `actualizar` y `eliminar` reescriben la hoja.
+    Todas pasan por el diario de escritura anticipada (`diario`, ver
+    `mod.diario`), que las confirma en grupos y publica las hojas de forma atómica.
+
+    Varios procesos pueden modificar el mismo árbol: antes de tocar una hoja se
+    toma su bloqueo exclusivo (`bloquear_hoja`) y, si otro proceso la cambió
+    desde la última lectura, se vuelve a leer. El bloqueo se mantiene hasta
+    confirmar el grupo, así ninguna actualización se pierde.
+    """
+
+    def __init__(self, ruta_base: str = BASE_DIR):
+        self.ruta_base = ruta_base
+        self.hojas: Dict[str, List[Dict[str, str]]] = {}
+        self.por_id: Dict[str, object] = {}
+        self.por_nombre: Dict[str, object] = {}
+        self.rutas: Dict[int, str] = {}
+        # Rutas de hoja por número (`Mob.hoja`) y números ya asignados
+        self._rutas_hoja: List[str] = []
+        self._numeros_hoja: Dict[str, int] = {}
+        # Texto -> float ya convertido: los anchos/altos repetidos comparten objeto
+        self._compartidos: Dict[str, float] = {}
+        self.por_nivel: Dict[int, Dict[str, Set[str]]] = {}
+        self.derivados: List = []
+        # Se incrementa en cada mutación (útil para invalidar cachés derivadas)
+        self.version = 0
+        # Bloqueos exclusivos tomados (hasta la próxima confirmación) y estado en
+        # disco de cada hoja al leerla o publicarla: (inodo, tamaño, mtime_ns)
+        self._bloqueos: Dict[str, Bloqueo] = {}
+        self._sellos: Dict[str, Optional[Tuple[int, int, int]]] = {}
+        # Hojas modificadas en memoria que todavía no pasaron al diario
+        self._sucias: Set[str] = set()
+        self.diario = Diario(ruta_base)
+        # Completar lo que una ejecución anterior confirmó pero no llegó a publicar
+        self.diario.recuperar()
+        self._cargar(ruta_base)
+
+    # -------------------- Carga --------------------
+    def _cargar(self, ruta: str):
+        """Lee (en paralelo) cada mobs.csv bajo `ruta` e indexa sus filas."""
+        for ruta_csv, leidas in leer_hojas(buscar_hojas(ruta), lector=self._leer_hoja):
+            filas = self._registrar_hoja(ruta_csv)
+            filas.extend(self._compactar(leidas, ruta_csv))
+            for fila in filas:
+                self._indexar(fila, ruta_csv)
+
+    @staticmethod
+    def _sello(ruta_csv: str) -> Optional[Tuple[int, int, int]]:
+        try:
+            estado = os.stat(obtener_almacenamiento().ruta_fisica(ruta_csv))
+        except FileNotFoundError:
+            return None
+        return estado.st_ino, estado.st_size, estado.st_mtime_ns
+
+    def _leer_hoja(self, ruta_csv: str) -> List[Dict[str, str]]:
+        with bloqueo_hoja(ruta_csv):
+            self._sellos[ruta_csv] = self._sello(ruta_csv)
+            return leer_csv(ruta_csv)
+
+    # -------------------- Bloqueos entre procesos --------------------
+    def bloquear_hoja(self, ruta_csv: str) -> str:
+        """Toma el bloqueo exclusivo de la hoja hasta la próxima confirmación y la relee si cambió.
+
+        Si otro proceso la tiene, primero se confirma lo pendiente (liberando los
+        bloqueos propios) y después se espera: nadie espera teniendo bloqueos, así
+        que no hay interbloqueos. Retorna la ruta normalizada.
+        """
+        ruta_csv = os.path.normpath(ruta_csv)
+        if ruta_csv in self._bloqueos:
+            return ruta_csv
+        bloqueo = Bloqueo(ruta_bloqueo(ruta_csv))
+        if not bloqueo.adquirir(exclusivo=True, bloquear=False):
+            for sucia in list(self._sucias):
+                self.persistir_hoja(sucia)
+            self.confirmar(forzar=True)
+            bloqueo.adquirir(exclusivo=True)
+        self._bloqueos[ruta_csv] = bloqueo
+        self._refrescar_hoja(ruta_csv)
+        return ruta_csv
+
+    def _refrescar_hoja(self, ruta_csv: str):
+        """Vuelve a leer la hoja si su archivo cambió desde la última lectura o publicación."""
+        sello = self._sello(ruta_csv)
+        if sello == self._sellos.get(ruta_csv):
+            return
+        for fila in self.hojas.get(ruta_csv, []):
+            self._desindexar(fila)
+            for derivado in self.derivados:
+                derivado.quitar(fila, ruta_csv)
+        self._olvidar_hoja(ruta_csv)
+        if sello is not None:
+            filas = self._registrar_hoja(ruta_csv)
+            filas.extend(self._compactar(leer_csv(ruta_csv), ruta_csv))
+            for fila in filas:
+                self._indexar(fila, ruta_csv)
+                for derivado in self.derivados:
+                    derivado.insertar(fila, ruta_csv)
+        self._sellos[ruta_csv] = sello
+        self.version += 1
+
+    def _refrescar_cambiadas(self):
+        """Relee las hojas que otros procesos cambiaron, crearon o borraron (salvo las bloqueadas por este).
+
+        Solo se llama con el bloqueo del diario: mientras tanto nadie publica hojas.
+        """
+        for ruta_csv in list(self.hojas) + [r for r in buscar_hojas(self.ruta_base) if r not in self.hojas]:
+            if ruta_csv not in self._bloqueos:
+                self._refrescar_hoja(ruta_csv)
+
+    def _al_publicar(self, ajena: bool):
+        """Con el bloqueo del diario: se pone al día si otro proceso confirmó algo y guarda los derivados."""
+        for ruta_csv in self._bloqueos:
+            # Lo que hay en disco es lo que se acaba de publicar desde este proceso
+            self._sellos[ruta_csv] = self._sello(ruta_csv)
+        if ajena:
+            self._refrescar_cambiadas()
+        self.guardar_derivados()
+
+    def _liberar_hojas(self):
+        for ruta_csv, bloqueo in self._bloqueos.items():
+            # Lo que hay en disco es lo que se publicó desde este proceso
+            self._sellos[ruta_csv] = self._sello(ruta_csv)
+            bloqueo.liberar()
+        self._bloqueos = {}
+
+    def _ubicar_bloqueado(self, buscar) -> Optional[Tuple[Dict[str, str], str]]:
+        """Resultado de `buscar()` con la hoja bloqueada (y releída), repitiendo si cambió al releer."""
+        while True:
+            encontrado = buscar()
+            if encontrado is None or encontrado[1] in self._bloqueos:
+                return encontrado
+            self.bloquear_hoja(encontrado[1])
+
+    def ubicar_bloqueado(self, termino) -> Optional[Tuple[Dict[str, str], str]]:
+        """Como `ubicar`, pero con la hoja del mob bloqueada para modificarlo."""
+        return self._ubicar_bloqueado(lambda: self.ubicar(termino))
+
+    # -------------------- Índices --------------------
+    def _compactar(self, filas: List[Dict[str, str]], ruta_csv: str) -> List[Dict[str, str]]:
+        """Las `filas` de la hoja `ruta_csv` como `Mob` (las de otras columnas quedan como dict)."""
+        from mod.registros import Mob, es_compactable  # import local: registros depende de etl, y etl de catalogo
+        numero = self._numeros_hoja.get(ruta_csv)
+        if numero is None:
+            numero = self._numeros_hoja[ruta_csv] = len(self._rutas_hoja)
+            self._rutas_hoja.append(ruta_csv)
+        return [Mob(fila, numero, self._compartidos) if es_compactable(fila) else fila for fila in filas]
+
+    def _niveles_de(self, ruta_csv: str) -> List[str]:
+        """Nombres de carpeta entre `ruta_base` y la hoja (los valores de cada nivel)."""
+        relativa = os.path.relpath(os.path.dirname(ruta_csv), self.ruta_base)
+        return [] if relativa == os.curdir else relativa.split(os.sep)
+
+    def _registrar_hoja(self, ruta_csv: str) -> List[Dict[str, str]]:
+        filas = self.hojas.get(ruta_csv)
+        if filas is None:
+            filas = self.hojas[ruta_csv] = []
+            for posicion, valor in enumerate(self._niveles_de(ruta_csv)):
+                self.por_nivel.setdefault(posicion, {}).setdefault(valor, set()).add(ruta_csv)
+        return filas
+
+    def _olvidar_hoja(self, ruta_csv: str):
+        self.hojas.pop(ruta_csv, None)
+        for posicion, valor in enumerate(self._niveles_de(ruta_csv)):
+            rutas = self.por_nivel.get(posicion, {}).get(valor)
+            if rutas is not None:
+                rutas.discard(ruta_csv)
+                if not rutas:
+                    del self.por_nivel[posicion][valor]
+
+    def _indexar(self, fila: Dict[str, str], ruta_csv: str):
+        _agregar_entrada(self.por_id, _clave(fila.get("id")), fila)
+        _agregar_entrada(self.por_nombre, _clave(fila.get("name")), fila)
+        if not hasattr(fila, "hoja"):
+            self.rutas[id(fila)] = ruta_csv
+
+    def _desindexar(self, fila: Dict[str, str]):
+        for indice, valor in ((self.por_id, fila.get("id")), (self.por_nombre, fila.get("name"))):
+            clave = _clave(valor)
+            entradas = [e for e in _entradas(indice, clave) if e is not fila]
+            if len(entradas) > 1:
+                indice[clave] = entradas
+            elif entradas:
+                indice[clave] = entradas[0]
+            else:
+                indice.pop(clave, None)
+        self.rutas.pop(id(fila), None)
+
+    def _con_rutas(self, filas: List[Dict[str, str]]) -> List[Tuple[Dict[str, str], str]]:
+        return [(fila, self.ruta_de(fila)) for fila in filas]
+
+    # -------------------- Consultas --------------------
+    def registros(self) -> List[Tuple[Dict[str, str], str]]:
+        """Devuelve todos los mobs como lista de tuplas (mob, ruta_csv)."""
+        return [(fila, ruta) for ruta, filas in self.hojas.items() for fila in filas]
+
+    def buscar_id(self, valor) -> List[Tuple[Dict[str, str], str]]:
+        """Mobs cuyo `id` coincide exactamente con `valor` (O(1))."""
+        return self._con_rutas(_entradas(self.por_id, _clave(valor)))
+
+    def buscar_nombre(self, valor) -> List[Tuple[Dict[str, str], str]]:
+        """Mobs cuyo `name` coincide exactamente (sin distinguir mayúsculas) con `valor`."""
+        return self._con_rutas(_entradas(self.por_nombre, _clave(valor)))
+
+    def filas_de(self, ruta_csv: str) -> List[Dict[str, str]]:
+        """Filas de la hoja `ruta_csv`, en orden."""
+        return self.hojas.get(ruta_csv, [])
+
+    def rutas_hojas(self) -> List[str]:
+        """Rutas de todas las hojas, en el orden de `registros()`."""
+        return list(self.hojas)
+
+    def recorrer(self, visitante):
+        """Recorre el árbol en disco con `visitante` (ver `mod.recorrido.recorrer_arbol`)."""
+        # Publicar y liberar las hojas propias: el recorrido las lee con bloqueo compartido
+        self.confirmar(forzar=True)
+        recorrer_arbol(self.ruta_base, visitante)
+
+    def ruta_de(self, fila: Dict[str, str]) -> Optional[str]:
+        """Ruta del mobs.csv que contiene a `fila` (una fila del catálogo), o None si no se conoce."""
+        hoja = getattr(fila, "hoja", None)
+        return self.rutas.get(id(fila)) if hoja is None else self._rutas_hoja[hoja]
+
+    def en_orden(self, pares: List[Tuple[Dict[str, str], str]]) -> List[Tuple[Dict[str, str], str]]:
+        """Ordena un subconjunto de (mob, ruta_csv) como aparecería en `registros()`."""
+        orden_hojas = {ruta: i for i, ruta in enumerate(self.hojas)}
+        posiciones: Dict[str, Dict[int, int]] = {}
+        for _, ruta_csv in pares:
+            if ruta_csv not in posiciones:
+                posiciones[ruta_csv] = {id(fila): i for i, fila in enumerate(self.hojas.get(ruta_csv, []))}
+        return sorted(pares, key=lambda par: (orden_hojas.get(par[1], -1), posiciones[par[1]].get(id(par[0]), -1)))
+
+    def hojas_en_nivel(self, posicion: int, valor: str, exacto: bool = False) -> List[str]:
+        """Rutas de las hojas cuya carpeta del nivel `posicion` coincide con `valor`.
+
+        Con `exacto` se accede directo al subárbol; si no, se aceptan las carpetas
+        que contienen `valor` (sin distinguir mayúsculas). Las demás se podan.
+        """
+        carpetas = self.por_nivel.get(posicion, {})
+        if exacto:
+            # Las carpetas generadas están en minúsculas: acceso directo por clave
+            rutas = carpetas.get(str(valor)) or carpetas.get(str(valor).strip().lower()) or set()
+            return sorted(rutas)
+        nombres = [nombre for nombre in carpetas if str(valor).lower() in nombre.lower()]
+        return sorted(ruta for nombre in nombres for ruta in carpetas[nombre])
+
+    def ubicar(self, termino) -> Optional[Tuple[Dict[str, str], str]]:
+        """Primer mob cuyo `id` o, si no hay, cuyo `name` coincide exactamente con `termino`."""
+        candidatos = _entradas(self.por_id, _clave(termino)) or _entradas(self.por_nombre, _clave(termino))
+        return (candidatos[0], self.ruta_de(candidatos[0])) if candidatos else None
+
+    # -------------------- Mutaciones en memoria --------------------
+    # No tocan el disco: quien las usa debe llamar luego a `persistir_hoja`.
+    def insertar_en_memoria(self, fila: Dict[str, str], ruta_csv: str) -> str:
+        """Agrega una copia compacta de `fila` (la guardada queda al final de `filas_de(ruta_csv)`)."""
+        ruta_csv = os.path.normpath(ruta_csv)
+        fila, = self._compactar([fila], ruta_csv)
+        self._registrar_hoja(ruta_csv).append(fila)
+        self._sucias.add(ruta_csv)
+        self._indexar(fila, ruta_csv)
+        for derivado in self.derivados:
+            derivado.insertar(fila, ruta_csv)
+        self.version += 1
+        return ruta_csv
+
+    def modificar_en_memoria(self, fila: Dict[str, str], nuevos_valores: Dict[str, str]) -> str:
+        """Cambia `fila` en su lugar; lanza ValueError si `nuevos_valores` trae columnas que la hoja no tiene."""
+        sobrantes = set(nuevos_valores) - set(fila)
+        if sobrantes:
+            raise ValueError(f"Campos desconocidos: {sorted(sobrantes)}")
+        ruta_csv = self.ruta_de(fila)
+        self._desindexar(fila)
+        for derivado in self.derivados:
+            derivado.quitar(fila, ruta_csv)
+        fila.update(nuevos_valores)
+        self._sucias.add(ruta_csv)
+        self._indexar(fila, ruta_csv)
+        for derivado in self.derivados:
+            derivado.insertar(fila, ruta_csv)
+        self.version += 1
+        return ruta_csv
+
+    def quitar_en_memoria(self, fila: Dict[str, str]) -> str:
+        ruta_csv = self.ruta_de(fila)
+        filas = self.hojas[ruta_csv]
+        filas[:] = [f for f in filas if f is not fila]
+        self._sucias.add(ruta_csv)
+        self._desindexar(fila)
+        for derivado in self.derivados:
+            derivado.quitar(fila, ruta_csv)
+        self.version += 1
+        return ruta_csv
+
+    def persistir_hoja(self, ruta_csv: str):
+        """Registra en el diario el contenido en memoria de la hoja (o su borrado si quedó vacía).
+
+        Se publica en disco con la próxima confirmación (ver `confirmar`). Si la
+        hoja no cambió desde que se registró, no hace nada.
+        """
+        if ruta_csv not in self._sucias:
+            return
+        self._sucias.discard(ruta_csv)
+        filas = self.hojas.get(ruta_csv, [])
+        if filas:
+            self.diario.reescribir(ruta_csv, filas, list(filas[0].keys()))
+        else:
+            self.diario.borrar(ruta_csv)
+            self._olvidar_hoja(ruta_csv)
+
+    def confirmar(self, forzar: bool = False) -> int:
+        """Confirma las mutaciones pendientes si corresponde según el intervalo del diario (o siempre, con `forzar`).
+
+        Los derivados se guardan junto con cada grupo confirmado, no en cada mutación.
+        Retorna la cantidad de hojas publicadas.
+        """
+        if forzar:
+            publicadas = self.diario.confirmar(self._al_publicar)
+        else:
+            publicadas = self.diario.quizas_confirmar(self._al_publicar)
+        if not self.diario.pendientes:
+            self._liberar_hojas()
+        return publicadas
+
+    def cerrar(self):
+        """Confirma lo pendiente y hace un checkpoint del diario (los derivados ya se guardaron al confirmar)."""
+        self.confirmar(forzar=True)
+        self.diario.checkpoint()
+
+    def guardar_derivados(self):
+        """Persiste las estructuras derivadas luego de una o varias mutaciones."""
+        for derivado in self.derivados:
+            if hasattr(derivado, "generacion"):
+                derivado.generacion = self.diario.generacion
+            derivado.guardar()
+
+    # -------------------- Mutaciones persistidas --------------------
+    def agregar(self, fila: Dict[str, str], ruta_csv: str, campos: Optional[List[str]] = None) -> Tuple[Dict[str, str], str]:
+        """Agrega `fila` al final de la hoja `ruta_csv` (append, sin reescribirla).
+
+        `campos` es el esquema esperado de la hoja: si no coincide con el de las
+        filas existentes, o `fila` trae campos desconocidos, lanza ValueError.
+        """
+        ruta_csv = self.bloquear_hoja(ruta_csv)
+        try:
+            esquema = list(campos) if campos else list(fila.keys())
+            existentes = self.hojas.get(ruta_csv)
+            if existentes:
+                encabezado = list(existentes[0].keys())
+                if campos and set(encabezado) != set(campos):
+                    raise ValueError(f"El encabezado de {ruta_csv} no coincide con el esquema: {encabezado}")
+                sobrantes = set(fila) - set(encabezado)
+                if sobrantes:
+                    raise ValueError(f"Campos desconocidos para {ruta_csv}: {sorted(sobrantes)}")
+                esquema = encabezado
+            sucia = ruta_csv in self._sucias
+            self.insertar_en_memoria(fila, ruta_csv)
+            fila = self.hojas[ruta_csv][-1]
+            if sucia:
+                # Cambios previos sin registrar: la hoja va completa
+                self.persistir_hoja(ruta_csv)
+            else:
+                self._sucias.discard(ruta_csv)
+                self.diario.anexar(ruta_csv, fila, self.hojas[ruta_csv], esquema)
+        finally:
+            self.confirmar()
+        return fila, ruta_csv
+
+    def actualizar(self, termino, nuevos_valores: Dict[str, str]) -> Optional[Tuple[Dict[str, str], str]]:
+        """Actualiza el primer mob cuyo `id` o `name` coincida exactamente con `termino`."""
+        try:
+            encontrado = self.ubicar_bloqueado(termino)
+            if encontrado is None:
+                return None
+            fila, ruta_csv = encontrado
+            self.modificar_en_memoria(fila, nuevos_valores)
+            self.persistir_hoja(ruta_csv)
+        finally:
+            self.confirmar()
+        return fila, ruta_csv
+
+    def eliminar(self, nombre) -> Optional[Tuple[Dict[str, str], str]]:
+        """Elimina el primer mob cuyo `name` coincida exactamente con `nombre`."""
+        objetivo = str(nombre).strip()
+
+        def buscar():
+            for fila, ruta_csv in self.buscar_nombre(nombre):
+                if str(fila.get("name", "")).strip() == objetivo:
+                    return fila, ruta_csv
+            return None
+
+        try:
+            encontrado = self._ubicar_bloqueado(buscar)
+            if encontrado is None:
+                return None
+            fila, ruta_csv = encontrado
+            self.quitar_en_memoria(fila)
+            # Si la hoja quedó vacía, el diario registra su borrado
+            self.persistir_hoja(ruta_csv)
+        finally:
+            self.confirmar()
+        return fila, ruta_csv
+
+
+# Un catálogo por ruta base (clave: ruta absoluta)
+_CATALOGOS: Dict[str, CatalogoMobs] = {}
+
+_motor: Optional[str] = None
+
+
+def motor_en_uso() -> str:
+    """Motor configurado, o el de $MOBS_MOTOR ("arbol" por defecto)."""
+    global _motor
+    if _motor is None:
+        _motor = configurar_motor(os.environ.get(VARIABLE_MOTOR) or "arbol")
+    return _motor
+
+
+def configurar_motor(nombre: str) -> str:
+    """Elige el motor para todo el proceso y descarta los catálogos abiertos.
+
+    No copia datos entre motores: la base SQLite importa el árbol al crearse y
+    `CatalogoSQLite.exportar_arbol` vuelve a escribir las hojas.
+    """
+    global _motor
+    nombre = nombre.strip().lower()
+    if nombre not in MOTORES:
+        raise ValueError(f"Motor desconocido: {nombre!r} (opciones: {list(MOTORES)})")
+    for catalogo in _CATALOGOS.values():
+        if hasattr(catalogo, "cerrar"):
+            catalogo.cerrar()
+    _CATALOGOS.clear()
+    _motor = nombre
+    return _motor
+
+
+def obtener_catalogo(ruta_base: str = BASE_DIR) -> CatalogoMobs:
+    """Devuelve el catálogo de `ruta_base`, cargándolo solo la primera vez.
+
+    Con el motor "sqlite" es un `CatalogoSQLite`, que tiene la misma interfaz.
+    """
+    clave = os.path.abspath(ruta_base)
+    catalogo = _CATALOGOS.get(clave)
+    if catalogo is None:
+        with seccion("catalogo.cargar"):
+            if motor_en_uso() == "sqlite":
+                from mod.catalogo_sqlite import CatalogoSQLite  # import local: depende de etl
+                catalogo = CatalogoSQLite(ruta_base)
+            else:
+                catalogo = CatalogoMobs(ruta_base)
+            _CATALOGOS[clave] = catalogo
+            _adjuntar_derivados(catalogo)
+    return catalogo
+
+
+def _adjuntar_derivados(catalogo: CatalogoMobs):
+    """Registra en `catalogo` los índices persistentes que deben seguir sus mutaciones."""
+    # import local: indices depende de catalogo
+    from mod.indices import obtener_agregados, obtener_indice_rangos, obtener_indice_trigramas, obtener_indice_unico
+    catalogo.derivados.append(obtener_indice_unico(catalogo.ruta_base, catalogo))
+    catalogo.derivados.append(obtener_indice_trigramas(catalogo.ruta_base, catalogo))
+    catalogo.derivados.append(obtener_indice_rangos(catalogo.ruta_base, catalogo))
+    catalogo.derivados.append(obtener_agregados(catalogo.ruta_base, catalogo))
+
+
+def invalidar_catalogo(ruta_base: Optional[str] = None):
+    """Descarta el catálogo de `ruta_base` (o todos) para forzar una recarga.
+
+    También descarta los índices derivados, que se reconstruyen desde el árbol.
+    """
+    from mod.indices import invalidar_indices
+    if ruta_base is None:
+        # Las claves son rutas absolutas: no dependen del directorio actual
+        claves = list(_CATALOGOS)
+    else:
+        claves = [os.path.abspath(ruta_base)]
+    for clave in claves:
+        catalogo = _CATALOGOS.pop(clave, None)
+        if hasattr(catalogo, "cerrar"):
+            catalogo.cerrar()
+        invalidar_indices(clave)
+
+
+def confirmar_cambios(ruta_base: Optional[str] = None):
+    """Publica en disco las mutaciones pendientes del catálogo de `ruta_base` (o de todos)."""
+    for clave, catalogo in list(_CATALOGOS.items()):
+        if ruta_base is None or clave == os.path.abspath(ruta_base):
+            catalogo.confirmar(forzar=True)
+
+
+@atexit.register
+def _cerrar_catalogos():
+    # Al salir no debe quedar ningún grupo sin confirmar
+    for catalogo in list(_CATALOGOS.values()):
+        catalogo.cerrar()
+
+
+def recorrer_mobs(ruta_base: str, visitante):
+    """Recorre las hojas de `ruta_base` con `visitante` según el motor en uso.
+
+    Con el árbol se lee del disco sin cargar el catálogo (publicando antes lo
+    pendiente); con SQLite se consulta la base.
+    """
+    confirmar_cambios(ruta_base)
+    if motor_en_uso() == "sqlite":
+        obtener_catalogo(ruta_base).recorrer(visitante)
+    else:
+        recorrer_arbol(ruta_base, visitante)
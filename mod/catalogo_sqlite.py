@@ -0,0 +1,367 @@
+import os
+import sqlite3
+import weakref
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from mod.almacenamiento import NOMBRE_HOJA, crear_almacenamiento
+from mod.catalogo import BASE_DIR, _clave
+from mod.diario import Diario
+from mod.etl import ENCABEZADOS, NIVELES
+from mod.recorrido import buscar_hojas, leer_hojas
+
+
+# Archivo de la base, guardado en la carpeta base del árbol
+ARCHIVO_SQLITE = ".mobs.sqlite3"
+
+_COLUMNAS = ", ".join(f'"{campo}"' for campo in ENCABEZADOS)
+_SELECT = f"SELECT rowid, hoja, {_COLUMNAS} FROM mobs"
+
+_ESQUEMA = [
+    "CREATE TABLE IF NOT EXISTS mobs (rowid INTEGER PRIMARY KEY, hoja TEXT NOT NULL, "
+    "clave_id TEXT NOT NULL, clave_name TEXT NOT NULL, "
+    + ", ".join(f'"{campo}" TEXT' for campo in ENCABEZADOS) + ")",
+    "CREATE INDEX IF NOT EXISTS idx_mobs_id ON mobs(clave_id)",
+    "CREATE INDEX IF NOT EXISTS idx_mobs_name ON mobs(clave_name)",
+    "CREATE INDEX IF NOT EXISTS idx_mobs_hoja ON mobs(hoja)",
+] + [f'CREATE INDEX IF NOT EXISTS idx_mobs_{nivel} ON mobs("{nivel}")' for nivel in NIVELES]
+
+
+def _texto(valor) -> str:
+    return "" if valor is None else str(valor)
+
+
+def hoja_de(fila: Dict[str, str]) -> str:
+    """Ruta relativa (con "/") de la hoja que le corresponde a `fila` según sus niveles."""
+    return "/".join([fila.get(nivel) or "desconocido" for nivel in NIVELES] + [NOMBRE_HOJA])
+
+
+class FilaSQLite(dict):
+    """Un mob (dict común) que recuerda el rowid de su registro en la base."""
+    __slots__ = ("rowid", "__weakref__")
+
+
+class CatalogoSQLite:
+    """Catálogo con la misma interfaz que `CatalogoMobs`, guardado en SQLite.
+
+    La tabla `mobs` tiene una columna TEXT por campo de `ENCABEZADOS`, la hoja
+    lógica del mob (`hoja`, relativa a `ruta_base`) y las claves normalizadas
+    de id y name. Hay índices sobre id, name, hoja y cada nivel de la jerarquía.
+
+    Las mutaciones "en memoria" quedan en la transacción abierta y
+    `persistir_hoja` la confirma: un lote completo es una sola transacción.
+    Si la base no existe (y `importar`) se importa el árbol de `ruta_base`.
+
+    Los derivados se guardan con el bloqueo del diario de `ruta_base`. Desde que
+    otro proceso cambia la base, los de este proceso ya no están al día y no se
+    vuelven a escribir: quien los cargue después los reconstruye (ver
+    `mod.indices._obtener_verificado`).
+    """
+
+    def __init__(self, ruta_base: str = BASE_DIR, ruta_db: Optional[str] = None, importar: bool = True):
+        self.ruta_base = ruta_base
+        self.ruta_db = ruta_db or os.path.join(ruta_base, ARCHIVO_SQLITE)
+        self.derivados: List = []
+        self.version = 0
+        self._registros: Optional[Tuple[int, List[Tuple[Dict[str, str], str]]]] = None
+        # rowid -> fila ya entregada: la misma fila es siempre el mismo objeto (como en CatalogoMobs)
+        self._vivas: "weakref.WeakValueDictionary[int, FilaSQLite]" = weakref.WeakValueDictionary()
+        nueva = not os.path.exists(self.ruta_db)
+        os.makedirs(os.path.dirname(self.ruta_db) or os.curdir, exist_ok=True)
+        self.conexion = sqlite3.connect(self.ruta_db, check_same_thread=False)
+        for sentencia in _ESQUEMA:
+            self.conexion.execute(sentencia)
+        self.conexion.commit()
+        if nueva and importar:
+            self.importar_arbol()
+        # Solo por el bloqueo y la generación del árbol: las filas van a la base
+        self.diario = Diario(ruta_base)
+        self._cambios = self.conexion.total_changes
+        self._derivados_al_dia = True
+
+    # -------------------- Carga y exportación --------------------
+    def _insertar(self, fila: Dict[str, str], hoja: str) -> int:
+        sobrantes = set(fila) - set(ENCABEZADOS)
+        if sobrantes:
+            raise ValueError(f"Campos desconocidos para {hoja}: {sorted(sobrantes)}")
+        cursor = self.conexion.execute(
+            f"INSERT INTO mobs (hoja, clave_id, clave_name, {_COLUMNAS}) VALUES ({', '.join('?' * (len(ENCABEZADOS) + 3))})",
+            [hoja, _clave(fila.get("id")), _clave(fila.get("name"))] + [_texto(fila.get(c)) for c in ENCABEZADOS])
+        return cursor.lastrowid
+
+    def reemplazar(self, filas: Iterable[Dict[str, str]]) -> Tuple[int, int]:
+        """Reemplaza todo el contenido por `filas` en una transacción (cada una va a `hoja_de(fila)`).
+
+        Retorna (cantidad de filas, cantidad de hojas).
+        """
+        total = 0
+        hojas = set()
+        self._vivas.clear()
+        with self.conexion:
+            self.conexion.execute("DELETE FROM mobs")
+            for fila in filas:
+                hoja = hoja_de(fila)
+                self._insertar(fila, hoja)
+                hojas.add(hoja)
+                total += 1
+        self._cambio()
+        return total, len(hojas)
+
+    def importar_arbol(self, ruta_arbol: Optional[str] = None) -> int:
+        """Carga en la base las hojas del árbol `ruta_arbol` (por defecto `ruta_base`). Retorna las filas."""
+        ruta_arbol = ruta_arbol or self.ruta_base
+        total = 0
+        with self.conexion:
+            for ruta_csv, filas in leer_hojas(buscar_hojas(ruta_arbol)):
+                hoja = os.path.relpath(ruta_csv, ruta_arbol).replace(os.sep, "/")
+                for fila in filas:
+                    self._insertar(fila, hoja)
+                    total += 1
+        self._cambio()
+        return total
+
+    def exportar_arbol(self, carpeta_destino: Optional[str] = None, formato: str = "csv") -> int:
+        """Escribe el árbol de carpetas con una hoja por mobs.csv (CSV por defecto). Retorna las hojas."""
+        carpeta_destino = self.ruta_base if carpeta_destino is None else carpeta_destino
+        almacenamiento = crear_almacenamiento(formato)
+        hojas = [hoja for (hoja,) in self.conexion.execute("SELECT DISTINCT hoja FROM mobs ORDER BY hoja")]
+        for hoja in hojas:
+            filas = [dict(fila) for fila in self.filas_de(self._ruta(hoja))]
+            almacenamiento.escribir(os.path.join(carpeta_destino, *hoja.split("/")), filas, ENCABEZADOS)
+        return len(hojas)
+
+    def cerrar(self):
+        self.conexion.close()
+
+    # -------------------- Conversión --------------------
+    def _ruta(self, hoja: str) -> str:
+        return os.path.normpath(os.path.join(self.ruta_base, *hoja.split("/")))
+
+    def _hoja(self, ruta_csv: str) -> str:
+        return os.path.relpath(ruta_csv, self.ruta_base).replace(os.sep, "/")
+
+    def _fila(self, registro) -> FilaSQLite:
+        """La fila de `registro` (rowid, hoja, columnas...), con los valores recién leídos.
+
+        Si ya se había entregado, es el mismo objeto: se actualiza con lo que hay
+        en la base, que otro proceso pudo haber cambiado.
+        """
+        fila = self._vivas.get(registro[0])
+        if fila is None:
+            fila = FilaSQLite(zip(ENCABEZADOS, registro[2:]))
+            fila.rowid = registro[0]
+            self._vivas[fila.rowid] = fila
+        else:
+            fila.update(zip(ENCABEZADOS, registro[2:]))
+        return fila
+
+    def _filas(self, condicion: str = "", parametros=()) -> List[Tuple[Dict[str, str], str]]:
+        return [(self._fila(registro), self._ruta(registro[1]))
+                for registro in self.conexion.execute(f"{_SELECT} {condicion} ORDER BY hoja, rowid", parametros)]
+
+    def _releer(self, fila: FilaSQLite) -> Optional[str]:
+        """Actualiza `fila` desde la base y devuelve la ruta de su hoja (None si ya no está)."""
+        registro = self.conexion.execute(f"{_SELECT} WHERE rowid = ?", (getattr(fila, "rowid", None),)).fetchone()
+        if registro is None:
+            return None
+        self._fila(registro)
+        return self._ruta(registro[1])
+
+    def _cambio(self):
+        self.version += 1
+        self._registros = None
+
+    def _version_datos(self) -> int:
+        # Cambia cada vez que otra conexión (otro proceso) confirma algo en la base
+        return self.conexion.execute("PRAGMA data_version").fetchone()[0]
+
+    # -------------------- Consultas --------------------
+    def registros(self) -> List[Tuple[Dict[str, str], str]]:
+        """Devuelve todos los mobs como lista de tuplas (mob, ruta_csv), en orden de hoja."""
+        version = (self.version, self._version_datos())
+        if self._registros is None or self._registros[0] != version:
+            self._registros = (version, self._filas())
+        return list(self._registros[1])
+
+    def buscar_id(self, valor) -> List[Tuple[Dict[str, str], str]]:
+        """Mobs cuyo `id` coincide exactamente con `valor` (por índice)."""
+        return self._filas("WHERE clave_id = ?", (_clave(valor),))
+
+    def buscar_nombre(self, valor) -> List[Tuple[Dict[str, str], str]]:
+        """Mobs cuyo `name` coincide exactamente (sin distinguir mayúsculas) con `valor`."""
+        return self._filas("WHERE clave_name = ?", (_clave(valor),))
+
+    def filas_de(self, ruta_csv: str) -> List[Dict[str, str]]:
+        """Filas de la hoja `ruta_csv`, en orden."""
+        return [fila for fila, _ in self._filas("WHERE hoja = ?", (self._hoja(ruta_csv),))]
+
+    def rutas_hojas(self) -> List[str]:
+        """Rutas de todas las hojas, en el orden de `registros()`."""
+        return [self._ruta(hoja) for (hoja,) in self.conexion.execute("SELECT DISTINCT hoja FROM mobs ORDER BY hoja")]
+
+    def en_orden(self, pares: List[Tuple[Dict[str, str], str]]) -> List[Tuple[Dict[str, str], str]]:
+        """Ordena un subconjunto de (mob, ruta_csv) como aparecería en `registros()` (hoja, rowid)."""
+        return sorted(pares, key=lambda par: (self._hoja(par[1]), par[0].rowid))
+
+    def ruta_de(self, fila: Dict[str, str]) -> Optional[str]:
+        rowid = getattr(fila, "rowid", None)
+        registro = self.conexion.execute("SELECT hoja FROM mobs WHERE rowid = ?", (rowid,)).fetchone()
+        return self._ruta(registro[0]) if registro else None
+
+    def hojas_en_nivel(self, posicion: int, valor: str, exacto: bool = False) -> List[str]:
+        """Rutas de las hojas cuyo nivel `posicion` coincide con `valor` (exacto: por índice)."""
+        if not 0 <= posicion < len(NIVELES):
+            return []
+        nivel = NIVELES[posicion]
+        if exacto:
+            consulta = f'SELECT DISTINCT hoja FROM mobs WHERE "{nivel}" IN (?, ?)'
+            parametros = (str(valor), str(valor).strip().lower())
+        else:
+            consulta = f'SELECT DISTINCT hoja FROM mobs WHERE instr(lower("{nivel}"), lower(?)) > 0'
+            parametros = (str(valor),)
+        return sorted(self._ruta(hoja) for (hoja,) in self.conexion.execute(consulta, parametros))
+
+    def ubicar(self, termino) -> Optional[Tuple[Dict[str, str], str]]:
+        """Primer mob cuyo `id` o, si no hay, cuyo `name` coincide exactamente con `termino`."""
+        candidatos = self.buscar_id(termino) or self.buscar_nombre(termino)
+        return candidatos[0] if candidatos else None
+
+    # SQLite ya bloquea la base entre procesos: no hacen falta bloqueos por hoja
+    def bloquear_hoja(self, ruta_csv: str) -> str:
+        return os.path.normpath(ruta_csv)
+
+    def ubicar_bloqueado(self, termino) -> Optional[Tuple[Dict[str, str], str]]:
+        return self.ubicar(termino)
+
+    def recorrer(self, visitante):
+        """Entrega cada hoja a `visitante` como `mod.recorrido.recorrer_arbol` (con poda por carpeta)."""
+        decisiones: Dict[str, bool] = {}
+        for (hoja,) in self.conexion.execute("SELECT DISTINCT hoja FROM mobs ORDER BY hoja").fetchall():
+            carpetas = hoja.split("/")[:-1]
+            permitido = True
+            for profundidad, nombre in enumerate(carpetas):
+                prefijo = "/".join(carpetas[:profundidad + 1])
+                if prefijo not in decisiones:
+                    decisiones[prefijo] = visitante.entrar(self._ruta(prefijo), nombre, profundidad)
+                if not decisiones[prefijo]:
+                    permitido = False
+                    break
+            if permitido and visitante.visitar_hoja(self._ruta(hoja), self.filas_de(self._ruta(hoja))):
+                break
+
+    # -------------------- Mutaciones en la transacción --------------------
+    # No confirman: quien las usa debe llamar luego a `persistir_hoja`.
+    def insertar_en_memoria(self, fila: Dict[str, str], ruta_csv: str) -> str:
+        ruta_csv = os.path.normpath(ruta_csv)
+        self._insertar(fila, self._hoja(ruta_csv))
+        for derivado in self.derivados:
+            derivado.insertar(fila, ruta_csv)
+        self._cambio()
+        return ruta_csv
+
+    def modificar_en_memoria(self, fila: FilaSQLite, nuevos_valores: Dict[str, str]) -> str:
+        """Cambia en la base solo las columnas de `nuevos_valores` (y `fila`, releída antes).
+
+        Otro proceso puede haber cambiado otras columnas del mismo mob: no se
+        pisan, porque el UPDATE no las escribe.
+        """
+        sobrantes = set(nuevos_valores) - set(ENCABEZADOS)
+        if sobrantes:
+            raise ValueError(f"Campos desconocidos: {sorted(sobrantes)}")
+        anterior = dict(fila)
+        ruta_csv = self._releer(fila)
+        if ruta_csv is None:
+            raise KeyError("La fila no pertenece al catálogo")
+        for derivado in self.derivados:
+            derivado.quitar(anterior, ruta_csv)
+        fila.update(nuevos_valores)
+        campos = [campo for campo in ENCABEZADOS if campo in nuevos_valores]
+        asignaciones = [f'"{campo}" = ?' for campo in campos]
+        valores = [_texto(fila.get(campo)) for campo in campos]
+        for campo, clave in (("id", "clave_id"), ("name", "clave_name")):
+            if campo in nuevos_valores:
+                asignaciones.append(f"{clave} = ?")
+                valores.append(_clave(fila.get(campo)))
+        if asignaciones:
+            self.conexion.execute(f"UPDATE mobs SET {', '.join(asignaciones)} WHERE rowid = ?", valores + [fila.rowid])
+        for derivado in self.derivados:
+            derivado.insertar(fila, ruta_csv)
+        self._cambio()
+        return ruta_csv
+
+    def quitar_en_memoria(self, fila: FilaSQLite) -> str:
+        ruta_csv = self.ruta_de(fila)
+        if ruta_csv is None:
+            raise KeyError("La fila no pertenece al catálogo")
+        self.conexion.execute("DELETE FROM mobs WHERE rowid = ?", (fila.rowid,))
+        self._vivas.pop(fila.rowid, None)
+        for derivado in self.derivados:
+            derivado.quitar(fila, ruta_csv)
+        self._cambio()
+        return ruta_csv
+
+    def persistir_hoja(self, ruta_csv: str = None):
+        """Confirma la transacción abierta (todas las hojas tocadas a la vez)."""
+        self.conexion.commit()
+
+    def confirmar(self, forzar: bool = False) -> int:
+        """Confirma la transacción abierta (si la hay) y guarda los derivados."""
+        self.conexion.commit()
+        self.guardar_derivados()
+        return 0
+
+    def guardar_derivados(self):
+        """Guarda los derivados con el bloqueo del diario, avanzando la generación si la base cambió."""
+        cambios = self.conexion.total_changes
+        avanzar, self._cambios = cambios != self._cambios, cambios
+        self.diario.sincronizar(self._guardar_derivados, avanzar)
+
+    def _guardar_derivados(self, ajena: bool):
+        self._derivados_al_dia = self._derivados_al_dia and not ajena
+        if not self._derivados_al_dia:
+            return
+        for derivado in self.derivados:
+            if hasattr(derivado, "generacion"):
+                derivado.generacion = self.diario.generacion
+            derivado.guardar()
+
+    # -------------------- Mutaciones persistidas --------------------
+    def agregar(self, fila: Dict[str, str], ruta_csv: str, campos: Optional[List[str]] = None) -> Tuple[Dict[str, str], str]:
+        """Agrega `fila` a la hoja `ruta_csv` en su propia transacción."""
+        if campos and set(campos) != set(ENCABEZADOS):
+            raise ValueError(f"El esquema no coincide con el de la base: {campos}")
+        with self.conexion:
+            ruta_csv = self.insertar_en_memoria(fila, ruta_csv)
+        self.guardar_derivados()
+        return fila, ruta_csv
+
+    def actualizar(self, termino, nuevos_valores: Dict[str, str]) -> Optional[Tuple[Dict[str, str], str]]:
+        """Actualiza el primer mob cuyo `id` o `name` coincida exactamente con `termino`."""
+        encontrado = self.ubicar(termino)
+        if encontrado is None:
+            return None
+        fila, _ = encontrado
+        with self.conexion:
+            ruta_csv = self.modificar_en_memoria(fila, nuevos_valores)
+        self.guardar_derivados()
+        return fila, ruta_csv
+
+    def eliminar(self, nombre) -> Optional[Tuple[Dict[str, str], str]]:
+        """Elimina el primer mob cuyo `name` coincida exactamente con `nombre`."""
+        objetivo = str(nombre).strip()
+        for fila, _ in self.buscar_nombre(nombre):
+            if str(fila.get("name", "")).strip() != objetivo:
+                continue
+            with self.conexion:
+                ruta_csv = self.quitar_en_memoria(fila)
+            self.guardar_derivados()
+            return fila, ruta_csv
+        return None
+
+
+def cargar_sqlite(ruta_base: str, filas: Iterable[Dict[str, str]]) -> Tuple[int, int]:
+    """Reemplaza el contenido de la base de `ruta_base` por `filas`. Retorna (filas, hojas)."""
+    catalogo = CatalogoSQLite(ruta_base, importar=False)
+    try:
+        return catalogo.reemplazar(filas)
+    finally:
+        catalogo.cerrar()
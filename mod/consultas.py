@@ -0,0 +1,323 @@
+import operator
+import os
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+from mod.catalogo import confirmar_cambios, obtener_catalogo
+from mod.etl import ENCABEZADOS, NIVELES
+from mod.recorrido import VisitanteArbol, recorrer_arbol
+from mod.utils import CAMPOS_NUMERICOS
+
+# Operadores de comparación: "~" es "contiene" (sin distinguir mayúsculas)
+OPERADORES = ("==", "!=", ">=", "<=", "!~", "=", ">", "<", "~")
+
+_COMPARAR = {
+    "=": operator.eq, "==": operator.eq, "!=": operator.ne,
+    ">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le,
+    "~": lambda valor, buscado: buscado in valor,
+    "!~": lambda valor, buscado: buscado not in valor,
+}
+
+_TOKEN = re.compile(r"""
+    \s*(?:
+        (?P<parentesis>[()])
+      | (?P<operador>==|!=|>=|<=|!~|=|>|<|~)
+      | "(?P<comillas>[^"]*)"
+      | '(?P<simples>[^']*)'
+      | (?P<palabra>[^\s()=!<>~"']+)
+    )""", re.VERBOSE)
+
+# Nodos del árbol sintáctico:
+#   ("y", [nodos]) | ("o", [nodos]) | ("no", nodo) | ("cmp", campo, operador, valor)
+Nodo = Tuple
+
+
+def _tokenizar(texto: str) -> List[Tuple[str, str]]:
+    tokens = []
+    posicion = 0
+    texto = texto.rstrip()
+    while posicion < len(texto):
+        encontrado = _TOKEN.match(texto, posicion)
+        if encontrado is None:
+            raise ValueError(f"Consulta inválida cerca de {texto[posicion:]!r}")
+        tipo = encontrado.lastgroup
+        valor = encontrado.group(tipo)
+        if tipo in ("comillas", "simples"):
+            tipo = "texto"
+        elif tipo == "palabra" and valor.upper() in ("AND", "OR", "NOT"):
+            tipo, valor = "logico", valor.upper()
+        tokens.append((tipo, valor))
+        posicion = encontrado.end()
+    return tokens
+
+
+class _Parser:
+    """Descenso recursivo: expr := termino (OR termino)*, termino := factor (AND factor)*."""
+
+    def __init__(self, tokens: List[Tuple[str, str]]):
+        self.tokens = tokens
+        self.posicion = 0
+
+    def _ver(self) -> Tuple[str, str]:
+        return self.tokens[self.posicion] if self.posicion < len(self.tokens) else ("fin", "")
+
+    def _tomar(self) -> Tuple[str, str]:
+        token = self._ver()
+        self.posicion += 1
+        return token
+
+    def expresion(self) -> Nodo:
+        hijos = [self.termino()]
+        while self._ver() == ("logico", "OR"):
+            self._tomar()
+            hijos.append(self.termino())
+        return hijos[0] if len(hijos) == 1 else ("o", hijos)
+
+    def termino(self) -> Nodo:
+        hijos = [self.factor()]
+        while self._ver() == ("logico", "AND"):
+            self._tomar()
+            hijos.append(self.factor())
+        return hijos[0] if len(hijos) == 1 else ("y", hijos)
+
+    def factor(self) -> Nodo:
+        tipo, valor = self._tomar()
+        if (tipo, valor) == ("logico", "NOT"):
+            return ("no", self.factor())
+        if (tipo, valor) == ("parentesis", "("):
+            nodo = self.expresion()
+            if self._tomar() != ("parentesis", ")"):
+                raise ValueError("Consulta inválida: falta ')'")
+            return nodo
+        if tipo != "palabra":
+            raise ValueError(f"Consulta inválida: se esperaba un campo y llegó {valor or 'el final'!r}")
+        campo = valor
+        if campo not in ENCABEZADOS:
+            raise ValueError(f"Consulta inválida: campo desconocido {campo!r} (disponibles: {', '.join(ENCABEZADOS)})")
+        tipo, operador = self._tomar()
+        if tipo != "operador":
+            raise ValueError(f"Consulta inválida: falta el operador después de {campo!r}")
+        tipo, buscado = self._tomar()
+        if tipo not in ("palabra", "texto"):
+            raise ValueError(f"Consulta inválida: falta el valor de {campo} {operador}")
+        return ("cmp", campo, operador, _constante(campo, operador, buscado))
+
+
+def _es_numerica(campo: str, operador: str) -> bool:
+    return campo in CAMPOS_NUMERICOS and operador not in ("~", "!~")
+
+
+def _numero(valor) -> float:
+    """Vacío -> 0, inválido -> NaN (no cumple ninguna comparación salvo "!=")."""
+    try:
+        return float(valor or 0)
+    except (ValueError, TypeError):
+        return float("nan")
+
+
+def _constante(campo: str, operador: str, valor: str):
+    if _es_numerica(campo, operador):
+        try:
+            return float(valor)
+        except ValueError:
+            raise ValueError(f"Consulta inválida: {campo} se compara con números, no con {valor!r}") from None
+    return valor.strip().lower()
+
+
+def _simplificar(nodo: Nodo, niveles: Dict[str, str]):
+    """Reemplaza las comparaciones sobre niveles conocidos por True/False y reduce el resto.
+
+    Retorna True, False o el nodo que queda por evaluar fila a fila.
+    """
+    clase = nodo[0]
+    if clase == "cmp":
+        _, campo, operador, valor = nodo
+        if campo not in niveles:
+            return nodo
+        return _COMPARAR[operador](niveles[campo].strip().lower(), valor)
+    if clase == "no":
+        hijo = _simplificar(nodo[1], niveles)
+        return (not hijo) if isinstance(hijo, bool) else ("no", hijo)
+    # "y" se decide con un False; "o", con un True
+    decisivo = clase == "o"
+    restantes = []
+    for hijo in nodo[1]:
+        hijo = _simplificar(hijo, niveles)
+        if hijo is decisivo:
+            return decisivo
+        if hijo is not (not decisivo):
+            restantes.append(hijo)
+    if not restantes:
+        return not decisivo
+    return restantes[0] if len(restantes) == 1 else (clase, restantes)
+
+
+# Función compilada: (columnas de la hoja, índices candidatos) -> índices que cumplen
+Filtro = Callable[["_Columnas", List[int]], List[int]]
+
+
+class _Columnas:
+    """Columnas de una hoja, convertidas una sola vez cada una (números o texto en minúsculas)."""
+
+    def __init__(self, filas: List[Dict[str, str]]):
+        self.filas = filas
+        self._cache: Dict[Tuple[str, bool], list] = {}
+
+    def __call__(self, campo: str, numerica: bool) -> list:
+        columna = self._cache.get((campo, numerica))
+        if columna is None:
+            if numerica:
+                columna = [_numero(fila.get(campo)) for fila in self.filas]
+            else:
+                columna = [str(fila.get(campo) or "").strip().lower() for fila in self.filas]
+            self._cache[(campo, numerica)] = columna
+        return columna
+
+
+def _compilar(nodo: Nodo) -> Filtro:
+    clase = nodo[0]
+    if clase == "cmp":
+        _, campo, operador, buscado = nodo
+        numerica = _es_numerica(campo, operador)
+        comparar = _COMPARAR[operador]
+
+        def filtro_cmp(columnas, indices):
+            valores = columnas(campo, numerica)
+            return [i for i in indices if comparar(valores[i], buscado)]
+        return filtro_cmp
+
+    if clase == "no":
+        hijo = _compilar(nodo[1])
+
+        def filtro_no(columnas, indices):
+            cumplen = set(hijo(columnas, indices))
+            return [i for i in indices if i not in cumplen]
+        return filtro_no
+
+    hijos = [_compilar(hijo) for hijo in nodo[1]]
+    if clase == "y":
+        def filtro_y(columnas, indices):
+            # Cada condición solo mira las filas que pasaron las anteriores
+            for hijo in hijos:
+                if not indices:
+                    break
+                indices = hijo(columnas, indices)
+            return indices
+        return filtro_y
+
+    def filtro_o(columnas, indices):
+        # Cada alternativa solo mira las filas que las anteriores no aceptaron
+        aceptados = set()
+        pendientes = indices
+        for hijo in hijos:
+            if not pendientes:
+                break
+            aceptados.update(hijo(columnas, pendientes))
+            pendientes = [i for i in pendientes if i not in aceptados]
+        return [i for i in indices if i in aceptados]
+    return filtro_o
+
+
+class Consulta:
+    """Consulta compilada: `width > 1.5 AND movilidad = volador AND type != hostile`.
+
+    - Comparaciones `campo operador valor` con =, ==, !=, >, >=, <, <=, ~ (contiene)
+      y !~ (no contiene), combinadas con AND, OR, NOT y paréntesis. Los valores con
+      espacios van entre comillas. Un campo que no está en `ENCABEZADOS` es un
+      error (ValueError) al compilar, no una condición que nunca se cumple.
+    - `id`, `width` y `height` se comparan como números (salvo con ~ y !~); el
+      resto, como texto sin distinguir mayúsculas.
+    - Las condiciones sobre niveles de la jerarquía (hostilidad, subtipo,
+      movilidad) se resuelven con los nombres de carpeta: las carpetas que no
+      pueden cumplir la consulta se podan sin leer sus hojas.
+    - Sobre cada hoja el filtro se evalúa por columnas: cada columna se convierte
+      una sola vez y cada condición solo revisa las filas que siguen en carrera.
+    """
+
+    def __init__(self, texto: str):
+        self.texto = texto
+        tokens = _tokenizar(texto)
+        if not tokens:
+            raise ValueError("Consulta vacía")
+        parser = _Parser(tokens)
+        self.arbol = parser.expresion()
+        if parser.posicion < len(tokens):
+            raise ValueError(f"Consulta inválida: sobra {tokens[parser.posicion][1]!r}")
+        # Filtro compilado por combinación de niveles conocidos (una por hoja, como mucho)
+        self._filtros: Dict[Tuple[Tuple[str, str], ...], object] = {}
+
+    def __repr__(self):
+        return f"Consulta({self.texto!r})"
+
+    def podar(self, niveles: Dict[str, str]) -> Optional[bool]:
+        """Con los niveles conocidos (`nivel -> carpeta`): False si nada puede cumplir, True si todo cumple, None si hay que mirar las filas."""
+        resultado = _simplificar(self.arbol, niveles)
+        return resultado if isinstance(resultado, bool) else None
+
+    def _filtro(self, niveles: Dict[str, str]):
+        clave = tuple(sorted(niveles.items()))
+        filtro = self._filtros.get(clave)
+        if filtro is None:
+            resto = _simplificar(self.arbol, niveles)
+            filtro = self._filtros[clave] = resto if isinstance(resto, bool) else _compilar(resto)
+        return filtro
+
+    def filtrar(self, filas: List[Dict[str, str]], niveles: Optional[Dict[str, str]] = None) -> List[Dict[str, str]]:
+        """Filas de una hoja que cumplen la consulta (en orden). `niveles`: los de su carpeta."""
+        filtro = self._filtro(niveles or {})
+        if filtro is True:
+            return list(filas)
+        if filtro is False or not filas:
+            return []
+        return [filas[i] for i in filtro(_Columnas(filas), range(len(filas)))]
+
+    def coincide(self, fila: Dict[str, str]) -> bool:
+        """Predicado sobre una sola fila (los niveles se toman de la fila)."""
+        return bool(self.filtrar([fila]))
+
+
+def compilar(consulta) -> Consulta:
+    """Compila `consulta` (texto) en una `Consulta`; si ya lo es, la devuelve tal cual."""
+    return consulta if isinstance(consulta, Consulta) else Consulta(consulta)
+
+
+def niveles_de_ruta(ruta_directorio: str, ruta_base: str) -> Dict[str, str]:
+    """Niveles que fija la carpeta `ruta_directorio` (uno por carpeta bajo `ruta_base`)."""
+    relativa = os.path.relpath(ruta_directorio, ruta_base)
+    partes = [] if relativa == os.curdir else relativa.split(os.sep)
+    return dict(zip(NIVELES, partes))
+
+
+def consultar(ruta_base: str, consulta) -> List[Tuple[Dict[str, str], str]]:
+    """Mobs del catálogo de `ruta_base` que cumplen `consulta`, como (mob, ruta_csv), en orden.
+
+    Una sola pasada: las hojas cuyas carpetas descartan la consulta ni se miran.
+    """
+    consulta = compilar(consulta)
+    catalogo = obtener_catalogo(ruta_base)
+    resultado = []
+    for ruta_csv in catalogo.rutas_hojas():
+        niveles = niveles_de_ruta(os.path.dirname(ruta_csv), ruta_base)
+        if consulta.podar(niveles) is False:
+            continue
+        resultado.extend((fila, ruta_csv) for fila in consulta.filtrar(catalogo.filas_de(ruta_csv), niveles))
+    return resultado
+
+
+def consultar_en_disco(ruta_base: str, consulta) -> List[Tuple[Dict[str, str], str]]:
+    """Como `consultar`, pero recorriendo el disco sin catálogo: las carpetas descartadas no se abren."""
+    consulta = compilar(consulta)
+    resultado = []
+
+    class _Consultar(VisitanteArbol):
+        def entrar(self, ruta, nombre, profundidad):
+            return consulta.podar(niveles_de_ruta(ruta, ruta_base)) is not False
+
+        def visitar_hoja(self, ruta_csv, filas):
+            niveles = niveles_de_ruta(os.path.dirname(ruta_csv), ruta_base)
+            resultado.extend((fila, ruta_csv) for fila in consulta.filtrar(filas, niveles))
+
+    # Publicar (y liberar) las hojas que el catálogo tenga bloqueadas antes de leerlas
+    confirmar_cambios(ruta_base)
+    recorrer_arbol(ruta_base, _Consultar())
+    return resultado
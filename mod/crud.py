@@ -1,7 +1,11 @@
 import os
 
-from mod.etl import TIPOS_PERMITIDOS, buscar_en_arbol
-from mod.utils import leer_csv, escribir_csv, formatear_mob, estadisticas_mobs, ordenar_mobs
+from mod.catalogo import obtener_catalogo, recorrer_mobs
+from mod.etl import ENCABEZADOS, TIPOS_PERMITIDOS, buscar_en_arbol
+from mod.indices import obtener_indice_rangos, obtener_indice_trigramas, obtener_indice_unico
+from mod.perfil import operacion
+from mod.recorrido import VisitanteArbol
+from mod.utils import formatear_mob, estadisticas_mobs, ordenar_pagina
 
 
 # Ruta base de la jerarquia
@@ -9,38 +13,28 @@ BASE_DIR = "minecraft"
 
 
 # -------------------- 1) Listar --------------------
+@operacion
 def listar_recursivo(ruta_base, limite=5):
 	"""Recorre el árbol desde `ruta_base` e imprime hasta `limite` mobs encontrados."""
-	mostrados = 0
-
-	def _listar(ruta):
-		nonlocal mostrados
-		# Si ya mostramos suficientes, terminamos (caso base que corta la recursión).
-		if mostrados >= limite:
-			return
-		ruta_csv = os.path.join(ruta, "mobs.csv")
-		if os.path.exists(ruta_csv):
-			filas = leer_csv(ruta_csv)
+
+	class _Listar(VisitanteArbol):
+		mostrados = 0
+
+		def visitar_hoja(self, ruta_csv, filas):
 			if filas:
 				# Obtenemos la categoría del primer mob
 				tipo, categoria = filas[0].get("type", "Desconocida"), filas[0].get("category", "Desconocida")
 				print(f"\n=== {tipo.title()} - {categoria.title()} ===")
 				for fila in filas:
-					if mostrados >= limite:
-						return
+					if self.mostrados >= limite:
+						break
 					print(formatear_mob(fila))
-					mostrados += 1
-		# Recorremos subcarpetas y llamamos de nuevo a `_listar` (recursión)
-		try:
-			for elemento in os.listdir(ruta):
-				ruta_elemento = os.path.join(ruta, elemento)
-				if os.path.isdir(ruta_elemento):
-					_listar(ruta_elemento)
-		except FileNotFoundError:
-			# Si la carpeta no existe, simplemente ignoramos y seguimos
-			return
+					self.mostrados += 1
+			# Si ya mostramos suficientes, cortamos el recorrido
+			return self.mostrados >= limite
 
-	_listar(ruta_base)
+	if limite > 0:
+		recorrer_mobs(ruta_base, _Listar())
 
 
 def listar_interactivo():
@@ -49,6 +43,13 @@ def listar_interactivo():
 
 
 # -------------------- 2) Agregar --------------------
+def _mobs_por_ids(ids):
+	"""Devuelve los mobs del catálogo con los ids dados (para mostrar coincidencias)."""
+	catalogo = obtener_catalogo(BASE_DIR)
+	return [mob for id_mob in ids for mob, _ in catalogo.buscar_id(id_mob)]
+
+
+@operacion
 def agregar_recursivo(ruta_base, nueva_fila, ruta_destino):
 	"""Agrega `nueva_fila` al `mobs.csv` dentro de `ruta_destino` relativa a `ruta_base`.
 
@@ -58,16 +59,8 @@ def agregar_recursivo(ruta_base, nueva_fila, ruta_destino):
 		# Construir ruta completa al CSV destino
 		ruta_csv = os.path.join(ruta_base, ruta_destino, "mobs.csv")
 
-		# Leer archivo existente o crear nuevo
-		filas = leer_csv(ruta_csv)
-		filas.append(nueva_fila)
-
-		# Asegurar que exista el directorio
-		os.makedirs(os.path.dirname(ruta_csv), exist_ok=True)
-
-		# Escribir archivo
-		escribir_csv(ruta_csv, filas)
-		return nueva_fila, ruta_csv
+		# El catálogo agrega la fila al final del archivo (append) y a su hoja en memoria
+		return obtener_catalogo(ruta_base).agregar(nueva_fila, ruta_csv, ENCABEZADOS)
 	except Exception as e:
 		print(f"Error al agregar mob: {str(e)}")
 		return None
@@ -93,15 +86,11 @@ def agregar_interactivo():
 			print("Error: 'id' debe ser un número.")
 			continue
 
-		# Buscar coincidencias exactas del ID
-		try:
-			coincidencias = buscar_en_arbol("", "id", id_input)
-		except Exception:
-			coincidencias = []
-		
+		# Buscar coincidencias exactas del ID (O(1) en el índice único)
+		coincidencias = obtener_indice_unico(ruta).ids("id", id_input)
 		if coincidencias:
 			print(f"Error: ID '{id_input}' ya existe en:")
-			for mob in coincidencias:
+			for mob in _mobs_por_ids(coincidencias):
 				print(formatear_mob(mob))
 			continue
 		
@@ -117,21 +106,12 @@ def agregar_interactivo():
 			print("Error: 'name' es obligatorio.")
 			continue
 
-		# Buscar coincidencias exactas del nombre
-		try:
-			coincidencias = buscar_en_arbol("", "name", name_input)
-		except Exception:
-			coincidencias = []
-		
-		# También buscar coincidencias en displayName
-		try:
-			coincidencias_display = buscar_en_arbol("", "displayName", name_input)
-		except Exception:
-			coincidencias_display = []
-
-		if coincidencias or coincidencias_display:
+		# Buscar coincidencias exactas del nombre y también en displayName
+		indice = obtener_indice_unico(ruta)
+		coincidencias = indice.ids("name", name_input) + indice.ids("displayName", name_input)
+		if coincidencias:
 			print(f"Error: El nombre '{name_input}' ya existe en:")
-			for mob in coincidencias + coincidencias_display:
+			for mob in _mobs_por_ids(dict.fromkeys(coincidencias)):
 				print(formatear_mob(mob))
 			continue
 		
@@ -271,43 +251,14 @@ def agregar_interactivo():
 
 
 # -------------------- 3) Actualizar --------------------
+@operacion
 def actualizar_recursivo(ruta_base, id_buscar, nuevos_valores):
 	"""Actualiza el primer mob cuyo `id` o `name` coincida con `id_buscar`.
 
 	Retorna (obj_actualizado, ruta_csv) o None si no encuentra.
 	"""
-	resultado = None
-
-	search = str(id_buscar).strip().lower()
-
-	def _actualizar(ruta):
-		nonlocal resultado
-		if resultado is not None:
-			return True
-		ruta_csv = os.path.join(ruta, "mobs.csv")
-		if os.path.exists(ruta_csv):
-			filas = leer_csv(ruta_csv)
-			for i, fila in enumerate(filas):
-				name_val = str(fila.get("name", "")).strip().lower()
-				id_val = str(fila.get("id", "")).strip().lower()
-				# Coincidir por id exacto o por name exacto
-				if search == id_val or search == name_val:
-					filas[i].update(nuevos_valores)
-					escribir_csv(ruta_csv, filas)
-					resultado = (filas[i], ruta_csv)
-					return True
-		try:
-			for elemento in os.listdir(ruta):
-				ruta_elemento = os.path.join(ruta, elemento)
-				if os.path.isdir(ruta_elemento):
-					if _actualizar(ruta_elemento):
-						return True
-		except FileNotFoundError:
-			return False
-		return False
-
-	_actualizar(ruta_base)
-	return resultado
+	# Búsqueda O(1) por id o name exacto en el catálogo
+	return obtener_catalogo(ruta_base).actualizar(id_buscar, nuevos_valores)
 
 
 def actualizar_interactivo():
@@ -384,11 +335,8 @@ def actualizar_interactivo():
 			if not valor:
 				print("Error: ID no puede quedar vacío")
 				continue
-			try:
-				existentes = buscar_en_arbol("", "id", valor)
-			except Exception:
-				existentes = []
-			if existentes and not (len(existentes) == 1 and existentes[0].get("id") == original_id):
+			existentes = obtener_indice_unico(ruta).ids("id", valor)
+			if any(otro != original_id for otro in existentes):
 				print(f"Error: ID '{valor}' ya existe en otro registro")
 				continue
 			try:
@@ -402,11 +350,8 @@ def actualizar_interactivo():
 			if not valor:
 				print("Error: Nombre no puede quedar vacío")
 				continue
-			try:
-				existentes = buscar_en_arbol("", "name", valor)
-			except Exception:
-				existentes = []
-			if existentes and not (len(existentes) == 1 and existentes[0].get("name") == original.get("name")):
+			existentes = obtener_indice_unico(ruta).ids("name", valor)
+			if any(otro != original_id for otro in existentes):
 				print(f"Error: Nombre '{valor}' ya existe")
 				continue
 			nuevos[campo] = valor
@@ -447,43 +392,60 @@ def actualizar_interactivo():
 	return None
 
 # -------------------- 4) Buscar --------------------
-def buscar_mob(termino_buscar):
+@operacion
+def buscar_mob(termino_buscar, ruta_base=BASE_DIR):
     """Busca mobs por nombre o ID, permitiendo búsqueda parcial para nombres.
     
     Args:
         termino_buscar: ID o nombre (completo o parcial) a buscar
+        ruta_base: raíz del árbol (por defecto `BASE_DIR`)
         
     Returns:
         Lista de tuplas (mob, ruta_archivo) que coinciden con la búsqueda
     """
-    resultados = []
+    catalogo = obtener_catalogo(ruta_base)
     termino_buscar = str(termino_buscar).lower()
-    
-    def _buscar(ruta):
-        try:
-            for elemento in os.listdir(ruta):
-                ruta_elemento = os.path.join(ruta, elemento)
-                if os.path.isdir(ruta_elemento):
-                    _buscar(ruta_elemento)
-                elif elemento == "mobs.csv":
-                    filas = leer_csv(ruta_elemento)
-                    for fila in filas:
-                        # Búsqueda por ID (exacta)
-                        if termino_buscar == str(fila.get("id", "")).lower():
-                            resultados.append((fila, ruta_elemento))
-                            continue
-                            
-                        # Búsqueda por nombre (parcial)
-                        nombre = fila.get("name", "").lower()
-                        display_name = fila.get("displayName", "").lower()
-                        if termino_buscar in nombre or termino_buscar in display_name:
-                            resultados.append((fila, ruta_elemento))
-        except FileNotFoundError:
-            return
-
-    _buscar(os.path.join(BASE_DIR))
+
+    # Búsqueda por ID (exacta, O(1) en el índice)
+    resultados = catalogo.buscar_id(termino_buscar)
+    ya_incluidos = {id(fila) for fila, _ in resultados}
+
+    # Búsqueda por nombre (parcial): con 3 letras o más, solo los candidatos del índice de trigramas
+    coincidencias = obtener_indice_trigramas(ruta_base, catalogo).buscar(catalogo, termino_buscar)
+    if coincidencias is not None:
+        resultados.extend(par for par in coincidencias if id(par[0]) not in ya_incluidos)
+        return resultados
+
+    # Término corto: revisar todos los mobs en memoria
+    for fila, ruta_elemento in catalogo.registros():
+        if id(fila) in ya_incluidos:
+            continue
+        nombre = fila.get("name", "").lower()
+        display_name = fila.get("displayName", "").lower()
+        if termino_buscar in nombre or termino_buscar in display_name:
+            resultados.append((fila, ruta_elemento))
     return resultados
 
+
+@operacion
+def buscar_por_dimensiones(ruta_base=BASE_DIR, **rangos):
+    """Busca mobs por rangos de `width`, `height` o `area` (width * height).
+
+    Cada rango es una tupla (minimo, maximo), con None para "sin límite":
+        buscar_por_dimensiones(height=(0.5, 1.0))
+    Usa el índice ordenado de dimensiones (O(log n + k), sin recorrer el árbol).
+
+    Returns:
+        Lista de tuplas (mob, ruta_archivo)
+    """
+    catalogo = obtener_catalogo(ruta_base)
+    return obtener_indice_rangos(ruta_base, catalogo).buscar(catalogo, rangos)
+
+
+def mobs_que_caben(ancho, alto, ruta_base=BASE_DIR):
+    """Mobs que pasan por un hueco de `ancho` x `alto` bloques (width <= ancho y height <= alto)."""
+    return buscar_por_dimensiones(ruta_base, width=(None, float(ancho)), height=(None, float(alto)))
+
 def buscar_interactivo():
     """Interfaz para buscar mobs por ID o nombre."""
     termino = input("Ingrese ID o nombre a buscar: ").strip()
@@ -505,38 +467,13 @@ def buscar_interactivo():
 
 
 # -------------------- 5) Eliminar --------------------
+@operacion
 def eliminar_recursivo(ruta_base, id_eliminar):
 	"""Elimina el primer mob cuyo `name` coincida con `id_eliminar`.
 
 	Retorna (fila_eliminada, ruta_csv) o None si no encuentra.
 	"""
-	resultado = None
-
-	def _eliminar(ruta):
-		nonlocal resultado
-		if resultado is not None:
-			return True
-		ruta_csv = os.path.join(ruta, "mobs.csv")
-		if os.path.exists(ruta_csv):
-			filas = leer_csv(ruta_csv)
-			for i, fila in enumerate(filas):
-				if str(fila.get("name", "")).strip() == str(id_eliminar).strip():
-					eliminada = filas.pop(i)
-					escribir_csv(ruta_csv, filas)
-					resultado = (eliminada, ruta_csv)
-					return True
-		try:
-			for elemento in os.listdir(ruta):
-				ruta_elemento = os.path.join(ruta, elemento)
-				if os.path.isdir(ruta_elemento):
-					if _eliminar(ruta_elemento):
-						return True
-		except FileNotFoundError:
-			return False
-		return False
-
-	_eliminar(ruta_base)
-	return resultado
+	return obtener_catalogo(ruta_base).eliminar(id_eliminar)
 
 
 def eliminar_interactivo():
@@ -576,9 +513,12 @@ def estadisticas_interactivo(ruta_base=BASE_DIR):
 	"""Muestra estadísticas globales sobre todos los mobs bajo `ruta_base`.
 
 	Esta función imprime un resumen legible con	total de mobs, conteos por categoría/tipo y estadísticas simples de	dimensiones (ancho/alto). Usa `mod.utils.estadisticas_mobs`.
+	Opcionalmente agrupa por una columna (ej: hostilidad) y muestra ancho/alto de cada grupo.
 	"""
+	print("\nAgrupar por: category, type, hostilidad, subtipo, movilidad (u otra columna)")
+	agrupar_por = input("Columna para agrupar (Enter para no agrupar): ").strip() or None
 	try:
-		stats = estadisticas_mobs(ruta_base)
+		stats = estadisticas_mobs(ruta_base, percentiles=True, agrupar_por=agrupar_por)
 	except Exception as e:
 		print(f"Error al calcular estadísticas: {e}")
 		return None
@@ -596,33 +536,57 @@ def estadisticas_interactivo(ruta_base=BASE_DIR):
 	print("\nDimensiones (promedio/min/max):")
 	print(f" Width: {stats.get('avg_width'):.2f} / {stats.get('min_width'):.2f} / {stats.get('max_width'):.2f}")
 	print(f" Height: {stats.get('avg_height'):.2f} / {stats.get('min_height'):.2f} / {stats.get('max_height'):.2f}")
+
+	print("\nDimensiones (mediana/p90/p99/desvío):")
+	for dim in ("width", "height"):
+		r = stats.get(dim) or {}
+		print(f" {dim.title()}: {r.get('median', 0):.2f} / {r.get('p90', 0):.2f} / {r.get('p99', 0):.2f} / {r.get('std', 0):.2f}")
+
+	if agrupar_por:
+		print(f"\nPor {agrupar_por} (cantidad, width promedio/mediana, height promedio/mediana):")
+		for valor, grupo in stats["grupos"][agrupar_por].items():
+			ancho, alto = grupo["columnas"]["width"], grupo["columnas"]["height"]
+			print(f" - {valor or 'Desconocida'}: {grupo['total']}, {ancho['mean']:.2f}/{ancho['median']:.2f}, {alto['mean']:.2f}/{alto['median']:.2f}")
 	return stats
 
 
 # -------------------- 7) Ordenamiento global --------------------
-def ordenar_interactivo(ruta_base=BASE_DIR):
+def ordenar_interactivo(ruta_base=BASE_DIR, por_pagina=20):
 	"""Interfaz simple para ordenar mobs globalmente.
 
-	Permite elegir la clave de ordenamiento y muestra los resultados formateados. No modifica archivos; solo muestra la lista ordenada por pantalla.
+	Permite elegir la clave de ordenamiento (o varias, ej: "category,-width") y muestra los resultados formateados de a `por_pagina`. No modifica archivos; solo muestra la lista ordenada por pantalla.
 	"""
-	print("\nOpciones de ordenamiento: id, name, category, type")
+	print("\nOpciones de ordenamiento: id, name, category, type, width, height")
+	print("Varias claves separadas por coma; '-' adelante para descendente (ej: category,-width)")
 	clave = input("Ingrese clave de ordenamiento (por defecto 'name'): ").strip() or "name"
 	sentido = input("Invertir orden? (s/N): ").strip().lower()
 	reverse = True if sentido == "s" else False
 
-	try:
-		ordenados = ordenar_mobs(ruta_base, key=clave, reverse=reverse)
-	except Exception as e:
-		print(f"Error al ordenar: {e}")
-		return None
-
-	if not ordenados:
-		print("No hay mobs para mostrar")
-		return []
+	mostrados = []
+	cursor = None
+	while True:
+		try:
+			if cursor is None:
+				pagina, cursor = ordenar_pagina(ruta_base, key=clave, reverse=reverse, limit=por_pagina)
+			else:
+				pagina, cursor = ordenar_pagina(ruta_base, cursor=cursor)
+		except Exception as e:
+			print(f"Error al ordenar: {e}")
+			return None
 
-	print(f"\nMobs ordenados por '{clave}' (invertido={reverse}):")
-	for mob, path in ordenados:
-		print(formatear_mob(mob))
-		print(f"  Ubicación: {os.path.dirname(path)}")
+		if not pagina and not mostrados:
+			print("No hay mobs para mostrar")
+			return []
+		if not mostrados:
+			print(f"\nMobs ordenados por '{clave}' (invertido={reverse}):")
+		for mob, path in pagina:
+			print(formatear_mob(mob))
+			print(f"  Ubicación: {os.path.dirname(path)}")
+		mostrados.extend(pagina)
+
+		if cursor is None:
+			break
+		if input("\nEnter para ver más, 'q' para terminar: ").strip().lower() == "q":
+			break
 
-	return ordenados
\ No newline at end of file
+	return mostrados
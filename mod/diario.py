@@ -0,0 +1,320 @@
+import json
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from mod.almacenamiento import obtener_almacenamiento, publicar_archivo
+from mod.bloqueos import bloqueo_archivo
+from mod.perfil import contar
+
+
+# Archivo del diario, guardado en la carpeta base del árbol
+ARCHIVO_DIARIO = ".diario.jsonl"
+
+# Bloqueo del diario: lo comparten todos los procesos que escriben el árbol
+ARCHIVO_BLOQUEO_DIARIO = ".diario.lock"
+
+# Generación del árbol: cantidad de grupos confirmados (ver `Diario.generacion`)
+ARCHIVO_GENERACION = ".generacion"
+
+# Segundos entre confirmaciones de grupo (0: cada mutación se confirma al instante)
+VARIABLE_INTERVALO = "MOBS_INTERVALO_COMMIT"
+
+# Un grupo se confirma igual si junta esta cantidad de mutaciones
+MAX_PENDIENTES = 1000
+
+# Tamaño del diario a partir del cual se hace un checkpoint
+TAMANO_CHECKPOINT = 4 * 1024 * 1024
+
+
+def _fsync_directorio(ruta: str):
+    """Lleva a disco las entradas (creaciones, renombres, borrados) del directorio `ruta`."""
+    try:
+        fd = os.open(ruta or os.curdir, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass  # Algunos sistemas no permiten fsync sobre directorios
+    finally:
+        os.close(fd)
+
+
+def leer_generacion(ruta_base: str) -> int:
+    """Generación actual del árbol de `ruta_base` (0 si todavía no se confirmó nada)."""
+    try:
+        with open(os.path.join(ruta_base, ARCHIVO_GENERACION), "r", encoding="ascii") as f:
+            return int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+def _como_dict(fila):
+    # Las filas del catálogo suelen ser `mod.registros.Mob`: pasan a dict una sola vez por grupo
+    if type(fila) is dict:
+        return fila
+    return fila.como_dict() if hasattr(fila, "como_dict") else dict(fila)
+
+
+class Diario:
+    """Diario de escritura anticipada (write-ahead) para las hojas de un árbol.
+
+    Las mutaciones se acumulan como pendientes, una por hoja:
+    - `anexar`: filas nuevas al final de la hoja, con la cantidad previa (`desde`).
+    - `imagen`: contenido completo de la hoja (actualizaciones y eliminaciones).
+    - `borrar`: la hoja quedó vacía y se elimina.
+
+    `confirmar` escribe todo el grupo como una línea del diario con un único
+    fsync y recién después publica las hojas (temporal + `os.replace`, o append
+    en CSV) sin fsync por archivo. El `checkpoint` lleva las hojas a disco y
+    vacía el diario. Si el proceso se cae, `recuperar` vuelve a aplicar los
+    grupos completos: cada registro es idempotente.
+
+    Varios procesos pueden compartir el diario: escribir un grupo y publicarlo,
+    el checkpoint y la recuperación se hacen con el bloqueo exclusivo del
+    diario, así el orden de las líneas es el orden en que se publicaron las hojas.
+    Quien escribe debe tener además el bloqueo de cada hoja (ver `mod.bloqueos`),
+    siempre tomado antes que el del diario.
+
+    Cada grupo confirmado avanza la generación del árbol (`.generacion`).
+    `generacion` es la última que este proceso tiene completa en memoria: si al
+    confirmar la del archivo es otra, otro proceso confirmó algo en el medio y
+    `al_publicar` lo recibe como `ajena` para ponerse al día.
+    """
+
+    def __init__(self, ruta_base: str, intervalo: Optional[float] = None,
+                 max_pendientes: int = MAX_PENDIENTES, tamano_checkpoint: int = TAMANO_CHECKPOINT):
+        self.ruta_base = ruta_base
+        if intervalo is None:
+            intervalo = float(os.environ.get(VARIABLE_INTERVALO) or 0)
+        self.intervalo = intervalo
+        self.max_pendientes = max_pendientes
+        self.tamano_checkpoint = tamano_checkpoint
+        self._pendientes: Dict[str, Dict[str, Any]] = {}  # ruta_csv -> registro
+        self._mutaciones = 0
+        self._sin_sincronizar: Set[str] = set()  # hojas publicadas sin fsync
+        self._ultimo = time.monotonic()
+        # Se lee antes de cargar las hojas: lo cargado es de esta generación o posterior
+        self.generacion = leer_generacion(ruta_base)
+
+    @property
+    def ruta(self) -> str:
+        return os.path.join(self.ruta_base, ARCHIVO_DIARIO)
+
+    @property
+    def pendientes(self) -> int:
+        """Cantidad de hojas con mutaciones sin confirmar."""
+        return len(self._pendientes)
+
+    def _bloqueo(self):
+        return bloqueo_archivo(os.path.join(self.ruta_base, ARCHIVO_BLOQUEO_DIARIO), exclusivo=True)
+
+    def _avanzar_generacion(self, avanzar: bool = True) -> bool:
+        """Con el bloqueo tomado: avanza la generación del árbol (si `avanzar`) y la registra como propia.
+
+        Retorna True si otro proceso la había cambiado desde la última vista.
+        """
+        actual = leer_generacion(self.ruta_base)
+        ajena = actual != self.generacion
+        if avanzar:
+            actual += 1
+            publicar_archivo(os.path.join(self.ruta_base, ARCHIVO_GENERACION), str(actual).encode("ascii"),
+                             sincronizar=False)
+        self.generacion = actual
+        return ajena
+
+    def sincronizar(self, funcion: Callable[[bool], Any], avanzar: bool = False):
+        """Ejecuta `funcion(ajena)` con el bloqueo del diario (ver `_avanzar_generacion`).
+
+        Mientras dura nadie publica hojas: `funcion` puede releer las que cambiaron
+        y escribir archivos derivados sin pisar los de otro proceso.
+        """
+        os.makedirs(self.ruta_base, exist_ok=True)
+        with self._bloqueo():
+            return funcion(self._avanzar_generacion(avanzar))
+
+    def con_bloqueo(self, funcion: Callable[[int], Any]):
+        """Ejecuta `funcion(generacion)` con el bloqueo del diario, sin tomar como vista la generación del archivo.
+
+        Para escribir un archivo derivado de una generación ya conocida solo si
+        el árbol sigue en ella (`funcion` recibe la actual y compara).
+        """
+        with self._bloqueo():
+            return funcion(leer_generacion(self.ruta_base))
+
+    # -------------------- Registro de mutaciones --------------------
+    def anexar(self, ruta_csv: str, fila: Dict[str, str], filas_hoja: List[Dict[str, str]], campos: List[str]):
+        """Registra `fila`, ya agregada al final de `filas_hoja` (la lista en memoria de la hoja)."""
+        previo = self._pendientes.get(ruta_csv)
+        if previo is None:
+            self._pendientes[ruta_csv] = {"op": "anexar", "desde": len(filas_hoja) - 1, "filas": [fila], "campos": campos}
+        elif previo["op"] == "anexar":
+            previo["filas"].append(fila)
+        else:
+            self.reescribir(ruta_csv, filas_hoja, campos)
+        self._mutaciones += 1
+
+    def reescribir(self, ruta_csv: str, filas_hoja: List[Dict[str, str]], campos: List[str]):
+        """Registra el contenido completo de la hoja (reemplaza lo pendiente para esa hoja)."""
+        self._pendientes[ruta_csv] = {"op": "imagen", "filas": filas_hoja, "campos": campos}
+        self._mutaciones += 1
+
+    def borrar(self, ruta_csv: str):
+        self._pendientes[ruta_csv] = {"op": "borrar"}
+        self._mutaciones += 1
+
+    # -------------------- Confirmación --------------------
+    def quizas_confirmar(self, al_publicar: Optional[Callable[[bool], Any]] = None) -> int:
+        """Confirma el grupo si pasó el intervalo o si ya hay demasiadas mutaciones pendientes."""
+        if (self.intervalo <= 0 or self._mutaciones >= self.max_pendientes
+                or time.monotonic() - self._ultimo >= self.intervalo):
+            return self.confirmar(al_publicar)
+        return 0
+
+    def confirmar(self, al_publicar: Optional[Callable[[bool], Any]] = None) -> int:
+        """Escribe y sincroniza el grupo pendiente en el diario y publica las hojas.
+
+        Si hay grupo, `al_publicar(ajena)` se llama después de publicarlo y antes
+        de soltar el bloqueo del diario. Retorna la cantidad de hojas publicadas.
+        """
+        self._ultimo = time.monotonic()
+        if not self._pendientes:
+            return 0
+        registros = []
+        for ruta_csv, registro in self._pendientes.items():
+            entrada = {"op": registro["op"], "hoja": os.path.relpath(ruta_csv, self.ruta_base).replace(os.sep, "/")}
+            if registro["op"] == "anexar":
+                entrada["desde"] = registro["desde"]
+            if registro["op"] != "borrar":
+                # Copia de las filas en este momento: las listas en memoria siguen cambiando
+                entrada["filas"] = [_como_dict(fila) for fila in registro["filas"]]
+                entrada["campos"] = registro["campos"]
+            registros.append((ruta_csv, entrada))
+
+        os.makedirs(self.ruta_base, exist_ok=True)
+        linea = json.dumps({"registros": [entrada for _, entrada in registros]}, separators=(",", ":"))
+        with self._bloqueo():
+            with open(self.ruta, "a", encoding="utf-8") as f:
+                f.write(linea + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            contar("archivos_escritos")
+            contar("bytes_escritos", len(linea.encode("utf-8")) + 1)
+            ajena = self._avanzar_generacion()
+            for ruta_csv, entrada in registros:
+                self._aplicar(ruta_csv, entrada)
+            self._pendientes = {}
+            self._mutaciones = 0
+            if al_publicar is not None:
+                al_publicar(ajena)
+            if os.path.getsize(self.ruta) >= self.tamano_checkpoint:
+                self._checkpoint()
+        return len(registros)
+
+    def _aplicar(self, ruta_csv: str, entrada: Dict[str, Any]):
+        almacenamiento = obtener_almacenamiento()
+        op = entrada["op"]
+        if op == "borrar":
+            try:
+                os.remove(almacenamiento.ruta_fisica(ruta_csv))
+            except FileNotFoundError:
+                pass
+        elif op == "imagen":
+            almacenamiento.escribir(ruta_csv, entrada["filas"], entrada["campos"], sincronizar=False)
+        else:
+            almacenamiento.anexar_filas(ruta_csv, entrada["filas"], entrada["campos"], sincronizar=False)
+        self._sin_sincronizar.add(ruta_csv)
+
+    def _ruta_hoja(self, hoja: str) -> str:
+        return os.path.normpath(os.path.join(self.ruta_base, *hoja.split("/")))
+
+    def _grupos(self) -> List[Dict[str, Any]]:
+        """Grupos completos del diario, en orden. Una última línea cortada se descarta."""
+        try:
+            with open(self.ruta, "r", encoding="utf-8") as f:
+                lineas = f.readlines()
+        except FileNotFoundError:
+            return []
+        grupos = []
+        for linea in lineas:
+            if not linea.endswith("\n"):
+                break
+            try:
+                grupos.append(json.loads(linea))
+            except ValueError:
+                break
+        return grupos
+
+    def checkpoint(self):
+        """Sincroniza las hojas publicadas desde el último checkpoint y vacía el diario."""
+        with self._bloqueo():
+            self._checkpoint()
+
+    def _checkpoint(self):
+        almacenamiento = obtener_almacenamiento()
+        # También las hojas que publicaron otros procesos: el diario es de todos
+        hojas = set(self._sin_sincronizar)
+        for grupo in self._grupos():
+            hojas.update(self._ruta_hoja(entrada["hoja"]) for entrada in grupo["registros"])
+        directorios = set()
+        for ruta_csv in hojas:
+            ruta = almacenamiento.ruta_fisica(ruta_csv)
+            directorios.add(os.path.dirname(ruta))
+            try:
+                with open(ruta, "rb") as f:
+                    os.fsync(f.fileno())
+            except FileNotFoundError:
+                pass
+        for directorio in directorios:
+            _fsync_directorio(directorio)
+        self._sin_sincronizar.clear()
+        if os.path.exists(self.ruta):
+            # Si este truncado se pierde en una caída, repetir el diario no cambia nada
+            with open(self.ruta, "w", encoding="utf-8"):
+                pass
+
+    # -------------------- Recuperación --------------------
+    def recuperar(self) -> int:
+        """Vuelve a aplicar los grupos completos del diario y hace un checkpoint.
+
+        Una última línea cortada (caída durante la escritura) es un grupo que
+        nunca se confirmó y se descarta. Los grupos se combinan en memoria y cada
+        hoja se escribe una sola vez, y solo si difiere de lo que hay en disco:
+        un lector nunca ve una versión anterior de la hoja. Retorna la cantidad
+        de grupos aplicados.
+        """
+        if not os.path.exists(self.ruta):
+            return 0
+        almacenamiento = obtener_almacenamiento()
+        with self._bloqueo():
+            grupos = self._grupos()
+            finales: Dict[str, Optional[List[Dict[str, str]]]] = {}  # None: hoja borrada
+            campos: Dict[str, List[str]] = {}
+            for grupo in grupos:
+                for entrada in grupo["registros"]:
+                    ruta_csv = self._ruta_hoja(entrada["hoja"])
+                    if entrada["op"] == "borrar":
+                        finales[ruta_csv] = None
+                        continue
+                    campos[ruta_csv] = entrada["campos"]
+                    if entrada["op"] == "imagen":
+                        finales[ruta_csv] = entrada["filas"]
+                        continue
+                    if ruta_csv in finales:
+                        actuales = finales[ruta_csv] or []
+                    else:
+                        actuales = almacenamiento.leer(ruta_csv)
+                    desde, nuevas = entrada["desde"], entrada["filas"]
+                    # Si la publicación se cortó, la hoja se reconstruye desde `desde`
+                    finales[ruta_csv] = actuales[:desde] + nuevas
+            for ruta_csv, filas in finales.items():
+                if filas is None:
+                    self._aplicar(ruta_csv, {"op": "borrar"})
+                elif almacenamiento.leer(ruta_csv) != filas:
+                    self._aplicar(ruta_csv, {"op": "imagen", "filas": filas, "campos": campos[ruta_csv]})
+            if grupos:
+                # Lo derivado de antes de la caída pudo quedar a medio guardar
+                self._avanzar_generacion()
+            self._checkpoint()
+        return len(grupos)
@@ -0,0 +1,189 @@
+import math
+import os
+import sys
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np  # Opcional: acelera los cálculos si está instalado
+except ImportError:
+    np = None
+
+
+# Columnas numéricas que se cargan como arrays de floats
+COLUMNAS_NUMERICAS = ("width", "height")
+# Columnas derivadas de la jerarquía (también codificadas en la ruta de la hoja)
+NIVELES = ("hostilidad", "subtipo", "movilidad")
+
+
+def valor_numerico(valor) -> float:
+    """Convierte a float como lo hacía `estadisticas_mobs`: vacío -> 0, inválido -> NaN."""
+    try:
+        return float(valor or 0)
+    except (ValueError, TypeError):
+        return math.nan
+
+
+class TablaColumnar:
+    """Mobs almacenados por columnas en lugar de un dict por fila.
+
+    - `numericas`: columna -> array('d') (NaN para valores no numéricos).
+    - `categoricas`: columna -> lista de strings internados (sys.intern).
+    Todas las columnas tienen la misma longitud `total`.
+    """
+
+    def __init__(self, columnas_numericas: Sequence[str] = COLUMNAS_NUMERICAS):
+        self.numericas: Dict[str, array] = {c: array("d") for c in columnas_numericas}
+        self.categoricas: Dict[str, List[str]] = {}
+        self.total = 0
+
+    @classmethod
+    def desde_registros(cls, registros: Iterable[Tuple[Dict[str, str], str]], ruta_base: str = "",
+                        columnas_numericas: Sequence[str] = COLUMNAS_NUMERICAS) -> "TablaColumnar":
+        """Construye la tabla desde tuplas (mob, ruta_csv), parseando cada número una sola vez.
+
+        Si un mob no tiene hostilidad/subtipo/movilidad, se toman de su ruta.
+        """
+        tabla = cls(columnas_numericas)
+        for fila, ruta_csv in registros:
+            categoricas = {c: v for c, v in fila.items() if c not in tabla.numericas}
+            if any(not categoricas.get(nivel) for nivel in NIVELES):
+                relativa = os.path.relpath(os.path.dirname(ruta_csv), ruta_base or os.curdir)
+                partes = relativa.split(os.sep)[-len(NIVELES):]
+                for posicion, nivel in enumerate(NIVELES):
+                    if not categoricas.get(nivel):
+                        categoricas[nivel] = partes[posicion] if posicion < len(partes) else "desconocido"
+            for columna, valor in categoricas.items():
+                columna_tabla = tabla.categoricas.get(columna)
+                if columna_tabla is None:
+                    columna_tabla = tabla.categoricas[columna] = [""] * tabla.total
+                columna_tabla.append(sys.intern(valor or ""))
+            for columna, valores in tabla.numericas.items():
+                valores.append(valor_numerico(fila.get(columna, "0")))
+            tabla.total += 1
+            # Columnas que esta fila no tenía: completar con vacío
+            for columna_tabla in tabla.categoricas.values():
+                if len(columna_tabla) < tabla.total:
+                    columna_tabla.append("")
+        return tabla
+
+    def grupos(self, columna: Optional[str]) -> Dict[str, List[int]]:
+        """Índices de fila agrupados por el valor de `columna` (un solo grupo si es None)."""
+        if columna is None:
+            return {"": list(range(self.total))}
+        valores = self.categoricas.get(columna)
+        if valores is None:
+            valores = [str(v) for v in self.numericas.get(columna, [])] or [""] * self.total
+        grupos: Dict[str, List[int]] = {}
+        for i, valor in enumerate(valores):
+            grupos.setdefault(valor, []).append(i)
+        return grupos
+
+
+def _percentil(ordenados: Sequence[float], p: float) -> float:
+    """Percentil `p` (0-100) con interpolación lineal, igual que numpy por defecto."""
+    if not ordenados:
+        return 0.0
+    k = (len(ordenados) - 1) * p / 100.0
+    f = int(math.floor(k))
+    c = min(f + 1, len(ordenados) - 1)
+    return ordenados[f] + (ordenados[c] - ordenados[f]) * (k - f)
+
+
+def _histograma(ordenados: Sequence[float], bins: int) -> Dict[str, List[float]]:
+    if not ordenados:
+        return {"bordes": [], "conteos": []}
+    minimo, maximo = ordenados[0], ordenados[-1]
+    ancho = (maximo - minimo) / bins if maximo > minimo else 1.0
+    conteos = [0] * bins
+    for v in ordenados:
+        conteos[min(int((v - minimo) / ancho), bins - 1)] += 1
+    return {"bordes": [minimo + ancho * i for i in range(bins + 1)], "conteos": conteos}
+
+
+def resumen_columna(valores: Sequence[float], bins: int = 10) -> Dict[str, Any]:
+    """count, mean, std, min, max, median, p90, p99 e histograma de `valores` (ignora NaN)."""
+    if np is not None:
+        datos = np.asarray(valores, dtype="d")
+        datos = np.sort(datos[~np.isnan(datos)])
+        if not datos.size:
+            return _resumen_vacio()
+        p50, p90, p99 = np.percentile(datos, [50, 90, 99])
+        conteos, bordes = np.histogram(datos, bins=bins)
+        return {
+            "count": int(datos.size),
+            "mean": float(datos.mean()),
+            "std": float(datos.std()),
+            "min": float(datos[0]),
+            "max": float(datos[-1]),
+            "median": float(p50),
+            "p90": float(p90),
+            "p99": float(p99),
+            "histograma": {"bordes": bordes.tolist(), "conteos": conteos.tolist()},
+        }
+
+    ordenados = sorted(v for v in valores if v == v)  # v != v solo para NaN
+    if not ordenados:
+        return _resumen_vacio()
+    n = len(ordenados)
+    media = math.fsum(ordenados) / n
+    varianza = math.fsum((v - media) ** 2 for v in ordenados) / n
+    return {
+        "count": n,
+        "mean": media,
+        "std": math.sqrt(varianza),
+        "min": ordenados[0],
+        "max": ordenados[-1],
+        "median": _percentil(ordenados, 50),
+        "p90": _percentil(ordenados, 90),
+        "p99": _percentil(ordenados, 99),
+        "histograma": _histograma(ordenados, bins),
+    }
+
+
+def _resumen_vacio() -> Dict[str, Any]:
+    return {"count": 0, "mean": 0.0, "std": 0.0, "min": 0.0, "max": 0.0,
+            "median": 0.0, "p90": 0.0, "p99": 0.0, "histograma": {"bordes": [], "conteos": []}}
+
+
+def _subconjunto(valores: array, indices: List[int], total: int) -> Sequence[float]:
+    if len(indices) == total:
+        return valores
+    if np is not None:
+        return np.frombuffer(valores, dtype="d")[indices]
+    return array("d", (valores[i] for i in indices))
+
+
+def estadisticas_tabla(tabla: TablaColumnar, agrupar_por: Optional[str] = None, bins: int = 10) -> Dict[str, Any]:
+    """Resume cada columna numérica de `tabla`, globalmente y por grupo.
+
+    `agrupar_por` debe ser una columna de `tabla` (ValueError si no lo es).
+    """
+    if (agrupar_por is not None and tabla.total
+            and agrupar_por not in tabla.categoricas and agrupar_por not in tabla.numericas):
+        raise ValueError(f"Columna desconocida para agrupar: {agrupar_por!r}")
+    resultado: Dict[str, Any] = {
+        "total": tabla.total,
+        "columnas": {c: resumen_columna(v, bins) for c, v in tabla.numericas.items()},
+    }
+    if agrupar_por is not None:
+        grupos = {}
+        for valor, indices in sorted(tabla.grupos(agrupar_por).items()):
+            grupos[valor] = {
+                "total": len(indices),
+                "columnas": {c: resumen_columna(_subconjunto(v, indices, tabla.total), bins)
+                             for c, v in tabla.numericas.items()},
+            }
+        resultado["agrupado_por"] = agrupar_por
+        resultado["grupos"] = grupos
+    return resultado
+
+
+def estadisticas_columnares(ruta_base: str, agrupar_por: Optional[str] = None, bins: int = 10) -> Dict[str, Any]:
+    """Estadísticas de width/height de todos los mobs bajo `ruta_base`.
+
+    `agrupar_por` puede ser cualquier columna (category, type, hostilidad, ...).
+    """
+    from mod.utils import recolectar_mobs  # import local: utils usa este módulo
+    tabla = TablaColumnar.desde_registros(recolectar_mobs(ruta_base), ruta_base)
+    return estadisticas_tabla(tabla, agrupar_por, bins)
@@ -1,5 +1,20 @@
 import csv
+import hashlib
+import json
 import os
+from collections import OrderedDict
+
+try:
+	import resource  # Solo disponible en sistemas tipo Unix
+except ImportError:
+	resource = None
+
+from mod.almacenamiento import obtener_almacenamiento, publicar_archivo
+from mod.catalogo import BASE_DIR, confirmar_cambios, invalidar_catalogo, motor_en_uso, obtener_catalogo
+from mod.diario import Diario
+from mod.indices import CAMPOS_TRIGRAMAS, obtener_indice_trigramas
+from mod.perfil import contar, operacion
+from mod.recorrido import VisitanteArbol, recorrer_arbol
 
 
 # Campos importantes a conservar de mobs.csv (excluidos metadatos e id interno)
@@ -13,13 +28,24 @@ VOLADORES = {"bat", "bee", "parrot", "phantom", "vex", "blaze", "ghast", "happy_
 NADADORES = {"cod", "salmon", "tropical_fish", "pufferfish", "tadpole", "axolotl", "dolphin", "squid", "glow_squid", "guardian", "elder_guardian", "turtle"}
 TIPOS_PERMITIDOS = {"mob", "passive", "animal", "hostile", "acuatico", "water_creature"}
 
+# Estructura de la jerarquía generada: minecraft/<hostilidad>/<subtipo>/<movilidad>/mobs.csv
+NIVELES = ["hostilidad", "subtipo", "movilidad"]
+ENCABEZADOS = CAMPOS_IMPORTANTES + NIVELES
+
+# Manifiesto de la última generación (guardado en la carpeta base del árbol)
+ARCHIVO_MANIFIESTO = ".manifiesto.json"
+
 
+@operacion
 def leer_csv(ruta_csv):
 	filas = []
 	with open(ruta_csv, "r", encoding="utf-8", newline="") as archivo:
 		lector = csv.DictReader(archivo)
 		for fila in lector:
 			filas.append(fila)
+		contar("bytes_leidos", os.fstat(archivo.fileno()).st_size)
+	contar("archivos_leidos")
+	contar("filas_leidas", len(filas))
 	return filas
 
 
@@ -85,73 +111,427 @@ def derivar_movilidad(fila):
 
 
 def escribir_csv(ruta_salida, filas, campos):
-	os.makedirs(os.path.dirname(ruta_salida), exist_ok=True)
-	with open(ruta_salida, "w", encoding="utf-8", newline="") as archivo:
-		escritor = csv.DictWriter(archivo, fieldnames=campos)
-		escritor.writeheader()
-		escritor.writerows(filas)
+	# El formato real de la hoja lo decide el almacenamiento en uso (CSV o binario)
+	obtener_almacenamiento().escribir(ruta_salida, filas, campos)
+
+
+def _hash_archivo(ruta):
+	"""SHA-256 del contenido de `ruta`, leído por bloques."""
+	h = hashlib.sha256()
+	with open(ruta, "rb") as archivo:
+		for bloque in iter(lambda: archivo.read(1 << 20), b""):
+			h.update(bloque)
+	return h.hexdigest()
+
+
+def leer_manifiesto(base):
+	"""Devuelve el manifiesto guardado en `base`, o {} si no existe o está dañado."""
+	try:
+		with open(os.path.join(base, ARCHIVO_MANIFIESTO), "r", encoding="utf-8") as archivo:
+			return json.load(archivo)
+	except (OSError, ValueError):
+		return {}
+
+
+def guardar_manifiesto(base, manifiesto):
+	"""Guarda el manifiesto en `base` (escribe a un temporal y lo reemplaza)."""
+	os.makedirs(base, exist_ok=True)
+	ruta = os.path.join(base, ARCHIVO_MANIFIESTO)
+	with open(ruta + ".tmp", "w", encoding="utf-8") as archivo:
+		json.dump(manifiesto, archivo, indent=1, sort_keys=True)
+	os.replace(ruta + ".tmp", ruta)
+
+
+def _hoja_vigente(ruta_csv, tamano, digest, previa):
+	"""True si el archivo en disco ya tiene `tamano` bytes con hash `digest`."""
+	try:
+		estado = os.stat(ruta_csv)
+	except FileNotFoundError:
+		return False
+	if estado.st_size != tamano:
+		return False
+	# Camino rápido: el archivo no se tocó desde que lo registró el manifiesto
+	if previa and previa.get("sha256") == digest and previa.get("mtime_ns") == estado.st_mtime_ns:
+		return True
+	return _hash_archivo(ruta_csv) == digest
+
+
+def _escribir_hoja(ruta_csv, filas, encabezados, previa=None, almacenamiento=None):
+	"""Escribe una hoja solo si su contenido cambió.
+
+	`almacenamiento` define el formato en disco (por defecto, el actual).
+	Retorna (entrada_manifiesto, escrito) donde la entrada tiene sha256/tamano/mtime_ns.
+	"""
+	almacenamiento = almacenamiento or obtener_almacenamiento()
+	ruta_fisica = almacenamiento.ruta_fisica(ruta_csv)
+	contenido = almacenamiento.serializar(filas, encabezados)
+	digest = hashlib.sha256(contenido).hexdigest()
+	escrito = False
+	if not _hoja_vigente(ruta_fisica, len(contenido), digest, previa):
+		# Temporal + os.replace: un lector (o una caída) nunca ve la hoja a medias
+		publicar_archivo(ruta_fisica, contenido, sincronizar=False)
+		contar("filas_escritas", len(filas))
+		escrito = True
+	estado = os.stat(ruta_fisica)
+	entrada = {"sha256": digest, "tamano": estado.st_size, "mtime_ns": estado.st_mtime_ns}
+	return entrada, escrito
+
+
+def particionar_filas(filas, nombre_nivel):
+	"""Agrupa `filas` por el valor de `nombre_nivel` recorriéndolas una sola vez.
+
+	Retorna un dict valor -> lista de filas, conservando el orden original dentro
+	de cada grupo. Los valores vacíos se agrupan como "desconocido".
+	"""
+	grupos = {}
+	for fila in filas:
+		valor = fila.get(nombre_nivel) or "desconocido"
+		grupo = grupos.get(valor)
+		if grupo is None:
+			grupos[valor] = [fila]
+		else:
+			grupo.append(fila)
+	return grupos
 
 
-def _escribir_jerarquia_recursiva(ruta_actual, filas, encabezados, niveles, posicion):
+def _escribir_jerarquia_recursiva(ruta_actual, filas, encabezados, niveles, posicion, hojas=None):
 	# Caso base: cuando ya no hay más niveles, escribimos un mobs.csv aquí
 	if posicion == len(niveles):
 		ruta_csv_final = os.path.join(ruta_actual, "mobs.csv")
-		escribir_csv(ruta_csv_final, filas, encabezados)
+		if hojas is None:
+			escribir_csv(ruta_csv_final, filas, encabezados)
+		else:
+			# Se difiere la escritura para hacerla incremental y/o en paralelo
+			hojas.append((ruta_csv_final, filas))
 		return
 
 	# Nombre del nivel actual (por ejemplo: hostilidad, subtipo, movilidad)
 	nombre_nivel = niveles[posicion]
 
-	# Juntar los valores distintos de este nivel (sin estructuras avanzadas)
-	valores_nivel = []
-	for fila in filas:
-		valor = fila.get(nombre_nivel) or "desconocido"
-		if valor not in valores_nivel:
-			valores_nivel.append(valor)
-	valores_nivel.sort()
-
-	# Para cada valor, filtrar filas y bajar recursivamente
-	for valor in valores_nivel:
-		subconjunto = []
-		for fila in filas:
-			if (fila.get(nombre_nivel) or "desconocido") == valor:
-				subconjunto.append(fila)
+	# Repartir las filas por valor del nivel en una sola pasada (O(n) por nivel)
+	grupos = particionar_filas(filas, nombre_nivel)
+
+	# Bajar recursivamente por cada valor, en orden alfabético
+	for valor in sorted(grupos):
+		subconjunto = grupos[valor]
 		ruta_siguiente = os.path.join(ruta_actual, valor)
-		_escribir_jerarquia_recursiva(ruta_siguiente, subconjunto, encabezados, niveles, posicion + 1)
+		_escribir_jerarquia_recursiva(ruta_siguiente, subconjunto, encabezados, niveles, posicion + 1, hojas)
 
 
-def generar_jerarquia(ruta_entrada:str = "mobs.csv", carpeta_salida:str = ""):
-	"""Genera la jerarquía de carpetas y archivos para los mobs.
-	
-	Implementación recursiva mediante _escribir_jerarquia_recursiva:
-	1. Prepara y filtra los datos del CSV de entrada
-	2. Deriva campos adicionales (hostilidad, subtipo, movilidad)
-	3. Llama a función recursiva para generar estructura de directorios
+@operacion
+def _escribir_hojas(hojas, encabezados, base, previas=None, trabajadores=0, usar_procesos=False):
+	"""Escribe las hojas pendientes (ruta_csv, filas) con `_escribir_hoja`.
+
+	Con `trabajadores` > 1 la serialización y escritura se reparten en un pool
+	de hilos (o de procesos si `usar_procesos`). El contenido de cada archivo
+	es el mismo que en modo secuencial: solo cambia quién lo escribe. El
+	almacenamiento se pasa explícito para que los procesos usen el mismo formato.
+	Retorna dict ruta_relativa -> entrada de manifiesto (con clave `escrito`).
 	"""
-	# 1) Lectura y preparación
-	filas = leer_csv(ruta_entrada)
-	filas = filtrar_campos_importantes(filas)
-	normalizar_dimensiones(filas)
-	filas = filtrar_tipos_permitidos(filas)
-	if not filas:
-		print("No quedaron filas válidas.")
-		return
+	previas = previas or {}
+	relativas = [os.path.relpath(ruta, base).replace(os.sep, "/") for ruta, _ in hojas]
+	argumentos = (
+		[ruta for ruta, _ in hojas],
+		[filas for _, filas in hojas],
+		[encabezados] * len(hojas),
+		[previas.get(relativa) for relativa in relativas],
+		[obtener_almacenamiento()] * len(hojas),
+	)
+	if trabajadores and trabajadores > 1 and len(hojas) > 1:
+		# Import local: el pool de procesos arrastra multiprocessing y solo hace falta aquí
+		from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+		Ejecutor = ProcessPoolExecutor if usar_procesos else ThreadPoolExecutor
+		with Ejecutor(max_workers=trabajadores) as pool:
+			bloque = max(1, len(hojas) // (trabajadores * 4)) if usar_procesos else 1
+			resultados = list(pool.map(_escribir_hoja, *argumentos, chunksize=bloque))
+	else:
+		resultados = list(map(_escribir_hoja, *argumentos))
+
+	nuevas = {}
+	for relativa, (entrada, escrito) in zip(relativas, resultados):
+		nuevas[relativa] = dict(entrada, escrito=escrito)
+	return nuevas
+
+
+def _fuente_sin_cambios(manifiesto, ruta_entrada, estado):
+	"""Compara el archivo de entrada con el registrado en el manifiesto.
+
+	Retorna (sin_cambios, sha256). El hash solo se calcula si tamaño/mtime difieren.
+	"""
+	fuente = manifiesto.get("fuente") or {}
+	if manifiesto.get("encabezados") != ENCABEZADOS or manifiesto.get("niveles") != NIVELES:
+		return False, None
+	if manifiesto.get("almacenamiento", "csv") != obtener_almacenamiento().nombre:
+		return False, None
+	if manifiesto.get("motor", "arbol") != motor_en_uso():
+		return False, None
+	if fuente.get("ruta") != os.path.abspath(ruta_entrada) or fuente.get("tamano") != estado.st_size:
+		return False, None
+	if fuente.get("mtime_ns") == estado.st_mtime_ns:
+		return True, fuente.get("sha256")
+	# Archivo "tocado" pero quizás con el mismo contenido
+	digest = _hash_archivo(ruta_entrada)
+	return digest == fuente.get("sha256"), digest
+
+
+def _hojas_presentes(base, manifiesto):
+	if manifiesto.get("motor") == "sqlite":
+		from mod.catalogo_sqlite import ARCHIVO_SQLITE  # import local: catalogo_sqlite importa etl
+		return os.path.exists(os.path.join(base, ARCHIVO_SQLITE))
+	almacenamiento = obtener_almacenamiento()
+	for relativa in manifiesto.get("hojas", {}):
+		if not os.path.exists(almacenamiento.ruta_fisica(os.path.join(base, relativa))):
+			return False
+	return True
+
+
+# -------------------- Pipeline en streaming --------------------
+# Cada etapa recibe un iterable de filas y devuelve un generador: la entrada
+# nunca se carga completa en memoria.
+
+def etapa_leer(ruta_csv):
+	"""Genera las filas de `ruta_csv` una por una."""
+	cantidad = 0
+	with open(ruta_csv, "r", encoding="utf-8", newline="") as archivo:
+		contar("archivos_leidos")
+		contar("bytes_leidos", os.fstat(archivo.fileno()).st_size)
+		try:
+			for fila in csv.DictReader(archivo):
+				cantidad += 1
+				yield fila
+		finally:
+			contar("filas_leidas", cantidad)
+
+
+def etapa_proyectar(filas, campos=CAMPOS_IMPORTANTES):
+	"""Conserva solo `campos` de cada fila (equivalente a filtrar_campos_importantes)."""
+	for fila in filas:
+		yield {campo: fila.get(campo) for campo in campos}
+
+
+def etapa_normalizar(filas):
+	"""Equivalente en streaming de normalizar_dimensiones."""
+	for f in filas:
+		if (f.get("width") in (None, "", "None")) and (f.get("height") in (None, "", "None")):
+			f["width"] = "0"
+			f["height"] = "0"
+		yield f
+
 
-	# 2) Derivados en español
+def etapa_filtrar(filas, tipos=TIPOS_PERMITIDOS):
+	"""Descarta las filas cuyo `type` no está en `tipos`."""
+	for f in filas:
+		if (f.get("type") or "").strip().lower() in tipos:
+			yield f
+
+
+def etapa_derivar(filas):
+	"""Agrega los campos derivados hostilidad, subtipo y movilidad."""
 	for f in filas:
 		f["hostilidad"] = derivar_hostilidad(f.get("category"))
 		f["subtipo"] = derivar_subtipo(f)
 		f["movilidad"] = derivar_movilidad(f)
+		yield f
+
+
+def pipeline_mobs(ruta_entrada):
+	"""Encadena leer -> proyectar -> normalizar -> filtrar -> derivar."""
+	return etapa_derivar(etapa_filtrar(etapa_normalizar(etapa_proyectar(etapa_leer(ruta_entrada)))))
 
-	# 3) Encabezados: campos importantes + derivados
-	encabezados = CAMPOS_IMPORTANTES + ["hostilidad", "subtipo", "movilidad"]
 
-	# 4) Llamada recursiva para construir: minecraft/<hostilidad>/<subtipo>/<movilidad>/mobs.csv
-	base = "minecraft"
-	niveles = ["hostilidad", "subtipo", "movilidad"]
-	_escribir_jerarquia_recursiva(base, filas, encabezados, niveles, 0)
+class EscritorHojas:
+	"""Enruta filas a su hoja `mobs.csv` escribiendo a medida que llegan.
 
-	print("Árbol generado en:", os.path.abspath(base))
+	Cada hoja se escribe primero en `mobs.csv.tmp`; al cerrar, el temporal
+	reemplaza al archivo solo si su contenido cambió (ver `_hoja_vigente`).
+	Con un almacenamiento no CSV el temporal se convierte a ese formato al cerrar.
+	Se mantienen abiertos como máximo `max_abiertos` archivos a la vez: el
+	menos usado recientemente se cierra y luego se reabre en modo append.
+	"""
+
+	def __init__(self, base, encabezados=ENCABEZADOS, niveles=NIVELES, max_abiertos=64, previas=None, buffer=64 * 1024):
+		self.base = base
+		self.encabezados = encabezados
+		self.niveles = niveles
+		self.max_abiertos = max_abiertos
+		self.previas = previas or {}
+		self.buffer = buffer
+		self.almacenamiento = obtener_almacenamiento()
+		self.filas = 0
+		self._abiertos = OrderedDict()  # ruta_csv -> (archivo, escritor)
+		self._hojas = {}  # ruta_csv -> ruta relativa a base (en orden de aparición)
+
+	def _ruta_hoja(self, fila):
+		valores = [fila.get(nivel) or "desconocido" for nivel in self.niveles]
+		return os.path.join(self.base, *valores, "mobs.csv")
+
+	def _escritor(self, ruta_csv):
+		abierto = self._abiertos.get(ruta_csv)
+		if abierto is not None:
+			self._abiertos.move_to_end(ruta_csv)
+			return abierto[1]
+		if len(self._abiertos) >= self.max_abiertos:
+			_, (archivo, _) = self._abiertos.popitem(last=False)
+			archivo.close()
+		nueva = ruta_csv not in self._hojas
+		if nueva:
+			os.makedirs(os.path.dirname(ruta_csv), exist_ok=True)
+			relativa = os.path.relpath(ruta_csv, self.base).replace(os.sep, "/")
+			self._hojas[ruta_csv] = relativa
+		modo = "w" if nueva else "a"
+		archivo = open(ruta_csv + ".tmp", modo, encoding="utf-8", newline="", buffering=self.buffer)
+		escritor = csv.DictWriter(archivo, fieldnames=self.encabezados)
+		if nueva:
+			escritor.writeheader()
+		self._abiertos[ruta_csv] = (archivo, escritor)
+		return escritor
+
+	def escribir(self, fila):
+		self._escritor(self._ruta_hoja(fila)).writerow(fila)
+		self.filas += 1
+
+	def cerrar(self):
+		"""Cierra todo y publica las hojas cambiadas.
+
+		Retorna dict ruta_relativa -> entrada de manifiesto (con clave `escrito`).
+		"""
+		for archivo, _ in self._abiertos.values():
+			archivo.close()
+		self._abiertos.clear()
+		contar("filas_escritas", self.filas)
+		nuevas = {}
+		for ruta_csv in sorted(self._hojas):
+			relativa = self._hojas[ruta_csv]
+			temporal = ruta_csv + ".tmp"
+			ruta_fisica = self.almacenamiento.ruta_fisica(ruta_csv)
+			if ruta_fisica != ruta_csv:
+				# Una hoja a la vez: convertir el CSV temporal al formato del almacenamiento
+				with open(temporal, "r", encoding="utf-8", newline="") as archivo:
+					filas = list(csv.DictReader(archivo))
+				with open(temporal, "wb") as archivo:
+					archivo.write(self.almacenamiento.serializar(filas, self.encabezados))
+			tamano = os.path.getsize(temporal)
+			digest = _hash_archivo(temporal)
+			escrito = not _hoja_vigente(ruta_fisica, tamano, digest, self.previas.get(relativa))
+			if escrito:
+				os.replace(temporal, ruta_fisica)
+				contar("archivos_escritos")
+				contar("bytes_escritos", tamano)
+			else:
+				os.remove(temporal)
+			estado = os.stat(ruta_fisica)
+			nuevas[relativa] = {"sha256": digest, "tamano": estado.st_size, "mtime_ns": estado.st_mtime_ns, "escrito": escrito}
+		return nuevas
+
+
+def rss_pico_kb():
+	"""Memoria residente máxima del proceso en KB (None si no se puede medir)."""
+	if resource is None:
+		return None
+	pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	# En macOS ru_maxrss está en bytes; en Linux, en KB
+	return pico // 1024 if os.uname().sysname == "Darwin" else pico
+
+
+@operacion
+def generar_jerarquia(ruta_entrada:str = "mobs.csv", carpeta_salida:str = "", forzar:bool = False, streaming:bool = False,
+		trabajadores:int = 0, usar_procesos:bool = False, ruta_base:str = BASE_DIR):
+	"""Genera la jerarquía de carpetas y archivos para los mobs bajo `ruta_base`.
+	
+	Implementación recursiva mediante _escribir_jerarquia_recursiva:
+	1. Prepara y filtra los datos del CSV de entrada
+	2. Deriva campos adicionales (hostilidad, subtipo, movilidad)
+	3. Llama a función recursiva para generar estructura de directorios
+
+	La generación es incremental: si `ruta_entrada` no cambió desde la última
+	ejecución (según el manifiesto) no se hace nada, y si cambió solo se
+	reescriben las hojas cuyo contenido es distinto. `forzar=True` ignora el manifiesto.
+
+	Con `streaming=True` las filas pasan por `pipeline_mobs` y se enrutan a su
+	hoja con `EscritorHojas` sin cargar la entrada completa en memoria.
+
+	Con `trabajadores` > 1 (solo en modo en memoria) las hojas se serializan y
+	escriben en paralelo con un pool de hilos, o de procesos si `usar_procesos`.
+
+	Las hojas se escriben en el formato del almacenamiento en uso (ver
+	`mod.almacenamiento`); cambiar de formato fuerza una regeneración. Con el
+	motor "sqlite" las filas se cargan en la base en una sola transacción y no
+	se escribe el árbol (ver `CatalogoSQLite.exportar_arbol`).
+
+	Retorna un resumen con filas, hojas, hojas escritas y memoria pico (KB),
+	o None si no hubo nada que hacer.
+	"""
+	base = ruta_base
+	manifiesto = {} if forzar else leer_manifiesto(base)
+	estado = os.stat(ruta_entrada)
+	sin_cambios, digest = _fuente_sin_cambios(manifiesto, ruta_entrada, estado)
+	if sin_cambios and _hojas_presentes(base, manifiesto):
+		if manifiesto["fuente"].get("mtime_ns") != estado.st_mtime_ns:
+			manifiesto["fuente"]["mtime_ns"] = estado.st_mtime_ns
+			guardar_manifiesto(base, manifiesto)
+		print("Árbol sin cambios en:", os.path.abspath(base))
+		return None
+
+	# Publicar antes lo que el diario tenga pendiente (o dejó una caída) y
+	# vaciarlo: si no, al recuperarlo pisaría las hojas nuevas
+	confirmar_cambios(base)
+	Diario(base).recuperar()
+	total_hojas = None
+	if motor_en_uso() == "sqlite":
+		from mod.catalogo_sqlite import cargar_sqlite  # import local: catalogo_sqlite importa etl
+		invalidar_catalogo(base)
+		total_filas, total_hojas = cargar_sqlite(base, pipeline_mobs(ruta_entrada))
+		nuevas = {}
+	elif streaming:
+		escritor = EscritorHojas(base, ENCABEZADOS, NIVELES, previas=manifiesto.get("hojas"))
+		for fila in pipeline_mobs(ruta_entrada):
+			escritor.escribir(fila)
+		nuevas = escritor.cerrar()
+		total_filas = escritor.filas
+	else:
+		# 1) Lectura, preparación y derivados en español
+		filas = list(pipeline_mobs(ruta_entrada))
+		total_filas = len(filas)
+		# 2) Llamada recursiva para construir: minecraft/<hostilidad>/<subtipo>/<movilidad>/mobs.csv
+		hojas = []
+		if filas:
+			_escribir_jerarquia_recursiva(base, filas, ENCABEZADOS, NIVELES, 0, hojas)
+		# 3) Escritura de las hojas (secuencial o en paralelo)
+		nuevas = _escribir_hojas(hojas, ENCABEZADOS, base, manifiesto.get("hojas"), trabajadores, usar_procesos)
+
+	if not total_filas:
+		print("No quedaron filas válidas.")
+		return None
+	if total_hojas is None:
+		total_hojas = len(nuevas)
+		escritas = sum(1 for entrada in nuevas.values() if entrada.pop("escrito"))
+	else:
+		# La base se reemplaza completa
+		escritas = total_hojas
+
+	# 4) Registrar la generación para la próxima ejecución
+	guardar_manifiesto(base, {
+		"fuente": {
+			"ruta": os.path.abspath(ruta_entrada),
+			"tamano": estado.st_size,
+			"mtime_ns": estado.st_mtime_ns,
+			"sha256": digest or _hash_archivo(ruta_entrada),
+		},
+		"encabezados": ENCABEZADOS,
+		"niveles": NIVELES,
+		"almacenamiento": obtener_almacenamiento().nombre,
+		"motor": motor_en_uso(),
+		"hojas": nuevas,
+	})
+
+	if escritas:
+		# El árbol cambió en disco: el catálogo en memoria se recarga en el próximo uso
+		invalidar_catalogo(base)
+	resumen = {"filas": total_filas, "hojas": total_hojas, "escritas": escritas, "rss_pico_kb": rss_pico_kb()}
+	print(f"Árbol generado en: {os.path.abspath(base)} ({escritas} de {total_hojas} hojas reescritas)")
+	if streaming and resumen["rss_pico_kb"] is not None:
+		print(f"Memoria pico: {resumen['rss_pico_kb'] / 1024:.1f} MB")
+	return resumen
 
 
 def generar_interactivo():
@@ -161,33 +541,65 @@ def generar_interactivo():
 	generar_jerarquia(entrada)
 
 
-def _buscar_recursivo_en_directorio(ruta_directorio, coincidencias, criterio_clave, criterio_valor):
-    # Si existe un mobs.csv aquí, leerlo y filtrar filas que cumplan criterio
-    ruta_csv = os.path.join(ruta_directorio, "mobs.csv")
-    if os.path.exists(ruta_csv):
-        with open(ruta_csv, "r", encoding="utf-8", newline="") as f:
-            lector = csv.DictReader(f)
-            for fila in lector:
+def _coincide(valor, criterio_valor, exacto=False):
+    """Contiene (por defecto) o igualdad, sin distinguir mayúsculas."""
+    if exacto:
+        return str(valor).strip().lower() == criterio_valor.strip().lower()
+    return criterio_valor.lower() in str(valor).lower()
+
+
+@operacion
+def _buscar_recursivo_en_directorio(ruta_directorio, coincidencias, criterio_clave, criterio_valor, profundidad=0, exacto=False):
+    """Busca en disco (sin catálogo) las filas bajo `ruta_directorio` que cumplan el criterio.
+
+    Recorre con `mod.recorrido.recorrer_arbol`. Si se busca por un nivel de la
+    jerarquía, el valor está en el nombre de la carpeta de esa profundidad: las
+    carpetas que no coinciden se podan. `profundidad` es el nivel de `ruta_directorio`.
+    """
+
+    class _Buscar(VisitanteArbol):
+        def entrar(self, ruta, nombre, nivel):
+            nivel += profundidad
+            if nivel < len(NIVELES) and criterio_clave == NIVELES[nivel]:
+                return _coincide(nombre, criterio_valor, exacto)
+            return True
+
+        def visitar_hoja(self, ruta_csv, filas):
+            for fila in filas:
                 valor = (fila.get(criterio_clave) or "")
-                # Búsqueda simple: si el valor contiene el criterio (en minúsculas)
-                if criterio_valor.lower() in str(valor).lower():
+                if _coincide(valor, criterio_valor, exacto):
                     coincidencias.append(fila)
 
-    # Recorrer subdirectorios recursivamente (sin os.walk para explicitar recursión)
-    try:
-        elementos = os.listdir(ruta_directorio)
-    except FileNotFoundError:
-        return
-    for nombre in elementos:
-        ruta_hija = os.path.join(ruta_directorio, nombre)
-        if os.path.isdir(ruta_hija):
-            _buscar_recursivo_en_directorio(ruta_hija, coincidencias, criterio_clave, criterio_valor)
+    # Publicar (y liberar) las hojas que el catálogo tenga bloqueadas antes de leerlas
+    confirmar_cambios()
+    recorrer_arbol(ruta_directorio, _Buscar())
+
 
+@operacion
+def buscar_en_arbol(carpeta_salida, criterio_clave, criterio_valor, exacto=False):
+    """Devuelve las filas cuyo `criterio_clave` contiene (o, con `exacto`, es igual a) `criterio_valor`.
 
-def buscar_en_arbol(carpeta_salida, criterio_clave, criterio_valor):
+    Consulta el catálogo en memoria (ver `mod.catalogo`) en lugar de recorrer el disco.
+    Si la clave es un nivel de la jerarquía (hostilidad, subtipo, movilidad) solo
+    se revisan las hojas cuya carpeta de ese nivel coincide.
+    """
     base = os.path.join(carpeta_salida, "minecraft")
+    catalogo = obtener_catalogo(base)
+    if not exacto and criterio_clave in CAMPOS_TRIGRAMAS:
+        # Subcadena en un campo indexado: solo se verifican los candidatos del índice
+        coincidencias = obtener_indice_trigramas(base, catalogo).buscar(catalogo, criterio_valor, (criterio_clave,))
+        if coincidencias is not None:
+            return [fila for fila, _ in coincidencias]
+    if criterio_clave in NIVELES:
+        rutas = catalogo.hojas_en_nivel(NIVELES.index(criterio_clave), criterio_valor, exacto)
+        filas = (fila for ruta in rutas for fila in catalogo.filas_de(ruta))
+    else:
+        filas = (fila for fila, _ in catalogo.registros())
     coincidencias = []
-    _buscar_recursivo_en_directorio(base, coincidencias, criterio_clave, criterio_valor)
+    for fila in filas:
+        valor = (fila.get(criterio_clave) or "")
+        if _coincide(valor, criterio_valor, exacto):
+            coincidencias.append(fila)
     return coincidencias
 
 
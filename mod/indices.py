@@ -0,0 +1,980 @@
+import json
+import math
+import os
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from mod.almacenamiento import publicar_archivo
+from mod.catalogo import BASE_DIR, motor_en_uso, obtener_catalogo
+from mod.diario import leer_generacion
+from mod.estadisticas import COLUMNAS_NUMERICAS, valor_numerico
+from mod.perfil import contar
+from mod.recorrido import VisitanteArbol
+
+
+# Campos que no pueden repetirse entre mobs (comparación exacta, sin mayúsculas)
+CAMPOS_UNICOS = ("id", "name", "displayName")
+
+# Archivo del índice, guardado en la carpeta base del árbol
+ARCHIVO_INDICE_UNICO = ".indice_unico.json"
+
+# Campos con búsqueda por subcadena indexada (ver `IndiceTrigramas`)
+CAMPOS_TRIGRAMAS = ("name", "displayName")
+ARCHIVO_INDICE_TRIGRAMAS = ".indice_trigramas.json"
+
+# Campos con consultas por rango (ver `IndiceRangos`); "area" es width * height
+CAMPOS_RANGO = ("width", "height", "area")
+ARCHIVO_INDICE_RANGOS = ".indice_rangos.json"
+
+# El registro de cambios de un índice se compacta en su archivo al superar esta
+# proporción de las filas indexadas (y al menos MINIMO_COMPACTAR cambios)
+PROPORCION_COMPACTAR = 0.25
+MINIMO_COMPACTAR = 1000
+
+# Estadísticas globales mantenidas con cada cambio (ver `AgregadosMobs`)
+CAMPOS_CONTEO = ("category", "type")
+ARCHIVO_AGREGADOS = ".agregados.json"
+
+
+def _clave(valor) -> str:
+    return str(valor if valor is not None else "").strip().lower()
+
+
+def _leer_json(ruta: str):
+    """Contenido JSON de `ruta`, o None si no existe o está dañado."""
+    try:
+        with open(ruta, "rb") as f:
+            contenido = f.read()
+        datos = json.loads(contenido)
+    except (OSError, ValueError):
+        return None
+    contar("archivos_leidos")
+    contar("bytes_leidos", len(contenido))
+    return datos
+
+
+class _IndicePersistente:
+    """Persistencia común de los índices: archivo completo más registro de cambios.
+
+    `guardar` se llama con el bloqueo del diario en cada confirmación, con
+    `generacion` ya puesta en la del grupo: agrega al final de
+    `<archivo>.cambios` una línea con las filas insertadas y quitadas desde la
+    anterior (solo id y `campos_huella`), así que cuesta O(cambios) y no
+    O(filas). El archivo completo se reescribe y el registro se vacía cuando
+    el registro crece más que `PROPORCION_COMPACTAR` de las filas, o cuando otro
+    proceso escribió el índice (o confirmó sin escribirlo) desde la última vez.
+
+    `cargar` lee el archivo y repite las líneas del registro de generaciones
+    consecutivas: la última es la generación del índice, que
+    `_obtener_verificado` compara con la del árbol en lugar de recorrer las filas.
+    """
+
+    archivo = ""
+    campos_huella: Tuple[str, ...] = ()
+
+    def __init__(self, ruta_base: str = BASE_DIR):
+        self.ruta_base = ruta_base
+        # Filas indexadas y su huella (ver `huella_filas`)
+        self.total = 0
+        self.huella = 0
+        # Generación del árbol que refleja (None: desconocida) y motor que lo escribió
+        self.generacion: Optional[int] = None
+        self.motor: Optional[str] = None
+        self._cambios: List[List[str]] = []
+        self._en_registro = 0
+        # Generación y sello (ver `_sello_disco`) de lo último escrito o leído; None: nada
+        self._escrita: Optional[int] = None
+        self._sello = None
+
+    @property
+    def ruta(self) -> str:
+        return os.path.join(self.ruta_base, self.archivo)
+
+    @property
+    def ruta_cambios(self) -> str:
+        return os.path.splitext(self.ruta)[0] + ".cambios"
+
+    @property
+    def campos_cambios(self) -> Tuple[str, ...]:
+        return ("id",) + tuple(campo for campo in self.campos_huella if campo != "id")
+
+    def _datos(self) -> Dict:
+        raise NotImplementedError
+
+    def _cargar_datos(self, datos: Dict) -> bool:
+        raise NotImplementedError
+
+    # -------------------- Persistencia --------------------
+    @classmethod
+    def cargar(cls, ruta_base: str = BASE_DIR, *args):
+        """Lee el índice guardado en `ruta_base` con su registro de cambios, o None si no existe o está dañado."""
+        indice = cls(ruta_base, *args)
+        datos = _leer_json(indice.ruta)
+        if not isinstance(datos, dict) or not indice._cargar_datos(datos):
+            return None
+        indice.total = datos.get("total", 0)
+        indice.huella = datos.get("huella", 0)
+        indice.generacion = datos.get("generacion")
+        indice.motor = datos.get("motor")
+        if isinstance(indice.generacion, int):
+            indice._leer_cambios()
+            indice._escrita = indice.generacion
+            indice._sello = indice._sello_disco()
+        return indice
+
+    def _leer_cambios(self):
+        try:
+            with open(self.ruta_cambios, "rb") as f:
+                lineas = f.read().splitlines()
+        except OSError:
+            return
+        for linea in lineas:
+            try:
+                registro = json.loads(linea)
+                generacion, cambios = registro["generacion"], registro["cambios"]
+            except (ValueError, KeyError, TypeError):
+                # Línea a medio escribir (otro proceso, o una caída): el índice queda en la anterior
+                break
+            if generacion <= self.generacion:
+                # De antes de la última compactación
+                continue
+            if generacion != self.generacion + 1:
+                break
+            for signo, *valores in cambios:
+                fila = dict(zip(self.campos_cambios, valores))
+                if signo == "+":
+                    self.insertar(fila)
+                else:
+                    self.quitar(fila)
+            self._en_registro += len(cambios)
+            self.generacion = generacion
+
+    def _sello_disco(self) -> Tuple:
+        """(inodo, tamaño, mtime) del archivo y del registro: cambia si otro proceso escribe cualquiera de los dos."""
+        sello = []
+        for ruta in (self.ruta, self.ruta_cambios):
+            try:
+                estado = os.stat(ruta)
+                sello.append((estado.st_ino, estado.st_size, estado.st_mtime_ns))
+            except OSError:
+                sello.append(None)
+        return tuple(sello)
+
+    def escribir(self):
+        """Escribe el índice completo (a un temporal que luego reemplaza al archivo) y vacía el registro."""
+        if not os.path.isdir(self.ruta_base):
+            return
+        self.motor = motor_en_uso()
+        datos = dict(self._datos(), total=self.total, huella=self.huella, generacion=self.generacion, motor=self.motor)
+        # json.dumps usa el codificador en C; el temporal es único por proceso
+        publicar_archivo(self.ruta, json.dumps(datos, separators=(",", ":")).encode("utf-8"), sincronizar=False)
+        try:
+            os.remove(self.ruta_cambios)
+        except OSError:
+            pass
+        self._cambios = []
+        self._en_registro = 0
+        self._escrita = self.generacion
+        self._sello = self._sello_disco()
+
+    def guardar(self):
+        """Persiste los cambios de la generación `generacion` (ver la descripción de la clase)."""
+        if not os.path.isdir(self.ruta_base) or (self.generacion == self._escrita and not self._cambios):
+            return
+        continua = (self._escrita is not None and self.generacion == self._escrita + 1
+                    and self._sello == self._sello_disco())
+        limite = max(MINIMO_COMPACTAR, self.total * PROPORCION_COMPACTAR)
+        if not continua or self._en_registro + len(self._cambios) > limite:
+            self.escribir()
+            return
+        linea = json.dumps({"generacion": self.generacion, "cambios": self._cambios}, separators=(",", ":"))
+        contenido = linea.encode("utf-8") + b"\n"
+        with open(self.ruta_cambios, "ab") as f:
+            f.write(contenido)
+        contar("archivos_escritos")
+        contar("bytes_escritos", len(contenido))
+        self._en_registro += len(self._cambios)
+        self._cambios = []
+        self._escrita = self.generacion
+        self._sello = self._sello_disco()
+
+    def _anotar(self, signo: str, fila: Dict[str, str]):
+        # Sin nada escrito todavía no hay registro al que agregar: se escribirá completo
+        if self._sello is not None:
+            self._cambios.append([signo] + [str(fila.get(campo) or "") for campo in self.campos_cambios])
+
+
+class IndiceUnico(_IndicePersistente):
+    """Índice persistente de coincidencias exactas para `CAMPOS_UNICOS`.
+
+    Para cada campo guarda valor normalizado -> lista de ids de los mobs que lo
+    usan, de modo que validar unicidad es una búsqueda O(1) en un dict.
+    Se mantiene sincronizado con el catálogo en cada mutación (ver
+    `CatalogoMobs.derivados`) y se guarda en `<ruta_base>/.indice_unico.json`
+    con cada confirmación (ver `_IndicePersistente`).
+    """
+
+    archivo = ARCHIVO_INDICE_UNICO
+    campos_huella = CAMPOS_UNICOS
+
+    def __init__(self, ruta_base: str = BASE_DIR):
+        super().__init__(ruta_base)
+        self.valores: Dict[str, Dict[str, List[str]]] = {campo: {} for campo in CAMPOS_UNICOS}
+
+    # -------------------- Persistencia --------------------
+    def _datos(self) -> Dict:
+        return {"valores": self.valores}
+
+    def _cargar_datos(self, datos: Dict) -> bool:
+        if set(datos.get("valores", ())) != set(CAMPOS_UNICOS):
+            return False
+        self.valores = datos["valores"]
+        return True
+
+    @classmethod
+    def desde_registros(cls, ruta_base: str, registros) -> "IndiceUnico":
+        """Construye el índice a partir de una lista de (mob, ruta_csv)."""
+        indice = cls(ruta_base)
+        for fila, ruta_csv in registros:
+            indice.insertar(fila, ruta_csv)
+        return indice
+
+    # -------------------- Mantenimiento --------------------
+    def insertar(self, fila: Dict[str, str], ruta_csv: str = None):
+        id_mob = str(fila.get("id", "")).strip()
+        for campo in CAMPOS_UNICOS:
+            clave = _clave(fila.get(campo))
+            if clave:
+                self.valores[campo].setdefault(clave, []).append(id_mob)
+        self.total += 1
+        self.huella = (self.huella + huella_filas((fila,), CAMPOS_UNICOS)) % 2 ** 64
+        self._anotar("+", fila)
+
+    def quitar(self, fila: Dict[str, str], ruta_csv: str = None):
+        id_mob = str(fila.get("id", "")).strip()
+        for campo in CAMPOS_UNICOS:
+            clave = _clave(fila.get(campo))
+            ids = self.valores[campo].get(clave)
+            if not ids:
+                continue
+            if id_mob in ids:
+                ids.remove(id_mob)
+            if not ids:
+                del self.valores[campo][clave]
+        self.total -= 1
+        self.huella = (self.huella - huella_filas((fila,), CAMPOS_UNICOS)) % 2 ** 64
+        self._anotar("-", fila)
+
+    # -------------------- Consultas --------------------
+    def ids(self, campo: str, valor) -> List[str]:
+        """Ids de los mobs cuyo `campo` es exactamente `valor` (sin distinguir mayúsculas)."""
+        return list(self.valores.get(campo, {}).get(_clave(valor), []))
+
+    def existe(self, campo: str, valor) -> bool:
+        return bool(self.valores.get(campo, {}).get(_clave(valor)))
+
+
+# Un índice por ruta base (clave: ruta absoluta)
+_INDICES: Dict[str, IndiceUnico] = {}
+
+
+def obtener_indice_unico(ruta_base: str = BASE_DIR, catalogo=None) -> IndiceUnico:
+    """Devuelve el índice único de `ruta_base` (ver `_obtener_verificado`)."""
+    return _obtener_verificado(_INDICES, IndiceUnico, ruta_base, catalogo)
+
+
+def _trigramas(valor) -> Set[str]:
+    texto = str(valor if valor is not None else "").lower()
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+def huella_filas(filas: Iterable[Dict[str, str]], campos: Iterable[str]) -> int:
+    """Suma (módulo 2**64) del CRC32 de id + `campos` de cada fila: no depende del orden y se actualiza sumando/restando."""
+    campos = tuple(campos)
+    total = 0
+    for fila in filas:
+        texto = "\x1f".join(str(fila.get(campo) or "") for campo in ("id",) + campos)
+        total += zlib.crc32(texto.encode("utf-8"))
+    return total % 2 ** 64
+
+
+class IndiceTrigramas(_IndicePersistente):
+    """Índice invertido de trigramas para búsquedas por subcadena en `campos`.
+
+    Para cada campo guarda trigrama -> {id del mob: cantidad de filas con ese
+    id}. Un término de 3 o más letras solo puede estar en las filas que tienen
+    todos sus trigramas: se intersecan esas listas (empezando por la más corta)
+    y solo los candidatos se verifican con `in`. Se mantiene como derivado del
+    catálogo y se guarda en `<ruta_base>/.indice_trigramas.json`.
+
+    El archivo pesa mucho más que el índice único: por eso cada confirmación
+    solo agrega sus cambios al registro (ver `_IndicePersistente`).
+    """
+
+    archivo = ARCHIVO_INDICE_TRIGRAMAS
+
+    def __init__(self, ruta_base: str = BASE_DIR, campos: Iterable[str] = CAMPOS_TRIGRAMAS):
+        super().__init__(ruta_base)
+        self.campos = tuple(campos)
+        self.trigramas: Dict[str, Dict[str, Dict[str, int]]] = {campo: {} for campo in self.campos}
+
+    @property
+    def campos_huella(self) -> Tuple[str, ...]:
+        return self.campos
+
+    def _huella_fila(self, fila: Dict[str, str]) -> int:
+        return huella_filas((fila,), self.campos)
+
+    # -------------------- Persistencia --------------------
+    def _datos(self) -> Dict:
+        return {"campos": list(self.campos), "trigramas": self.trigramas}
+
+    def _cargar_datos(self, datos: Dict) -> bool:
+        if datos.get("campos") != list(self.campos):
+            return False
+        self.trigramas = datos["trigramas"]
+        return True
+
+    @classmethod
+    def desde_registros(cls, ruta_base: str, registros, campos: Iterable[str] = CAMPOS_TRIGRAMAS) -> "IndiceTrigramas":
+        indice = cls(ruta_base, campos)
+        for fila, ruta_csv in registros:
+            indice.insertar(fila, ruta_csv)
+        return indice
+
+    # -------------------- Mantenimiento --------------------
+    def insertar(self, fila: Dict[str, str], ruta_csv: str = None):
+        id_mob = str(fila.get("id", "")).strip()
+        for campo in self.campos:
+            listas = self.trigramas[campo]
+            for trigrama in _trigramas(fila.get(campo)):
+                ids = listas.setdefault(trigrama, {})
+                ids[id_mob] = ids.get(id_mob, 0) + 1
+        self.total += 1
+        self.huella = (self.huella + self._huella_fila(fila)) % 2 ** 64
+        self._anotar("+", fila)
+
+    def quitar(self, fila: Dict[str, str], ruta_csv: str = None):
+        id_mob = str(fila.get("id", "")).strip()
+        for campo in self.campos:
+            listas = self.trigramas[campo]
+            for trigrama in _trigramas(fila.get(campo)):
+                ids = listas.get(trigrama)
+                if not ids or id_mob not in ids:
+                    continue
+                if ids[id_mob] > 1:
+                    ids[id_mob] -= 1
+                else:
+                    del ids[id_mob]
+                    if not ids:
+                        del listas[trigrama]
+        self.total -= 1
+        self.huella = (self.huella - self._huella_fila(fila)) % 2 ** 64
+        self._anotar("-", fila)
+
+    # -------------------- Consultas --------------------
+    def candidatos(self, campo: str, termino) -> Optional[Set[str]]:
+        """Ids de los mobs cuyo `campo` puede contener `termino`, o None si no se puede usar el índice.
+
+        None significa "revisar todo": el campo no está indexado o el término
+        tiene menos de 3 letras.
+        """
+        trigramas = _trigramas(termino)
+        if campo not in self.trigramas or not trigramas:
+            return None
+        listas = self.trigramas[campo]
+        ordenadas = sorted((listas.get(t, {}) for t in trigramas), key=len)
+        ids = set(ordenadas[0])
+        for lista in ordenadas[1:]:
+            if not ids:
+                break
+            ids.intersection_update(lista.keys())
+        return ids
+
+    def buscar(self, catalogo, termino, campos: Iterable[str] = CAMPOS_TRIGRAMAS) -> Optional[List[Tuple[Dict[str, str], str]]]:
+        """Mobs de `catalogo` cuyo valor en alguno de `campos` contiene `termino` (sin mayúsculas).
+
+        Retorna (mob, ruta_csv) en el orden de `catalogo.registros()`, o None si
+        el índice no sirve para este término (ver `candidatos`).
+        """
+        termino = str(termino).lower()
+        ids: Set[str] = set()
+        for campo in campos:
+            candidatos = self.candidatos(campo, termino)
+            if candidatos is None:
+                return None
+            ids |= candidatos
+        coincidencias = []
+        vistos = set()
+        for id_mob in ids:
+            for fila, ruta_csv in catalogo.buscar_id(id_mob):
+                if id(fila) in vistos or str(fila.get("id", "")).strip() != id_mob:
+                    continue
+                vistos.add(id(fila))
+                if any(termino in str(fila.get(campo) or "").lower() for campo in campos):
+                    coincidencias.append((fila, ruta_csv))
+        return catalogo.en_orden(coincidencias)
+
+
+# Un índice de trigramas por ruta base (clave: ruta absoluta)
+_TRIGRAMAS: Dict[str, IndiceTrigramas] = {}
+
+
+def obtener_indice_trigramas(ruta_base: str = BASE_DIR, catalogo=None) -> IndiceTrigramas:
+    """Devuelve el índice de trigramas de `ruta_base` (ver `_obtener_verificado`)."""
+    return _obtener_verificado(_TRIGRAMAS, IndiceTrigramas, ruta_base, catalogo)
+
+
+def _obtener_verificado(registro: Dict, clase, ruta_base: str, catalogo=None):
+    """Índice `clase` de `ruta_base` (ver `IndiceUnico` / `IndiceTrigramas`), guardado en `registro`.
+
+    Se lee del disco si es de la generación con que se cargó el catálogo, el
+    árbol sigue en ella y lo escribió el motor en uso (como `agregados_vigentes`):
+    no se recorren las filas. Si no, se construye desde el catálogo y se
+    escribe (ver `_publicar_vigente`). Los cambios hechos a mano en las hojas no
+    avanzan la generación: los detecta `verificar_agregados` por la huella.
+    """
+    clave = os.path.abspath(ruta_base)
+    indice = registro.get(clave)
+    if indice is not None:
+        return indice
+    if catalogo is None:
+        # Al crearse, el catálogo construye y registra este mismo índice
+        catalogo = obtener_catalogo(ruta_base)
+        if clave in registro:
+            return registro[clave]
+    generacion = catalogo.diario.generacion
+    indice = clase.cargar(ruta_base)
+    # Si el árbol avanzó mientras se cargaba, las hojas leídas pueden ser de después que el índice
+    if (indice is None or indice.generacion != generacion or indice.motor != motor_en_uso()
+            or leer_generacion(ruta_base) != generacion):
+        indice = clase.desde_registros(ruta_base, catalogo.registros())
+        indice.generacion = generacion
+        _publicar_vigente(indice, catalogo)
+    registro[clave] = indice
+    return indice
+
+
+def _publicar_vigente(indice, catalogo):
+    """Escribe `indice` con el bloqueo del diario si el árbol sigue en `indice.generacion`.
+
+    Si otro proceso confirmó algo en el medio, su archivo es más nuevo: este se
+    escribirá completo en la próxima confirmación propia, ya al día.
+    """
+    if not os.path.isdir(catalogo.ruta_base) or catalogo.diario.pendientes:
+        # Con mutaciones sin confirmar, lo que hay en memoria no es de esa generación
+        return
+
+    def publicar(actual: int):
+        if actual == indice.generacion:
+            indice.escribir()
+
+    catalogo.diario.con_bloqueo(publicar)
+
+
+def _dimension(fila: Dict[str, str], campo: str) -> float:
+    """Valor de `campo` como número (vacío -> 0, inválido -> NaN); "area" es width * height."""
+    if campo == "area":
+        return _dimension(fila, "width") * _dimension(fila, "height")
+    try:
+        return float(fila.get(campo) or 0)
+    except (ValueError, TypeError):
+        return math.nan
+
+
+class IndiceRangos(_IndicePersistente):
+    """Índice ordenado para consultas por rango sobre `CAMPOS_RANGO`.
+
+    Para cada campo guarda dos arreglos paralelos ordenados por valor: los
+    valores (array('d')) y los ids de los mobs. Un rango se resuelve con dos
+    bisect y la porción entre ellos: O(log n + k). Las filas con valores no
+    numéricos no se indexan en ese campo.
+
+    Se mantiene como derivado del catálogo y, como el índice de trigramas, se
+    guarda en `<ruta_base>/.indice_rangos.json` con su registro de cambios.
+    """
+
+    archivo = ARCHIVO_INDICE_RANGOS
+    campos_huella = ("width", "height")
+
+    def __init__(self, ruta_base: str = BASE_DIR):
+        super().__init__(ruta_base)
+        self.valores: Dict[str, array] = {campo: array("d") for campo in CAMPOS_RANGO}
+        self.ids: Dict[str, List[str]] = {campo: [] for campo in CAMPOS_RANGO}
+
+    # -------------------- Persistencia --------------------
+    def _datos(self) -> Dict:
+        return {"ids": self.ids, "valores": {campo: valores.tolist() for campo, valores in self.valores.items()}}
+
+    def _cargar_datos(self, datos: Dict) -> bool:
+        if set(datos.get("valores", ())) != set(CAMPOS_RANGO) or set(datos.get("ids", ())) != set(CAMPOS_RANGO):
+            return False
+        self.valores = {campo: array("d", valores) for campo, valores in datos["valores"].items()}
+        self.ids = datos["ids"]
+        return True
+
+    @classmethod
+    def desde_registros(cls, ruta_base: str, registros) -> "IndiceRangos":
+        """Construye el índice ordenando una sola vez cada campo (no con inserciones sucesivas)."""
+        indice = cls(ruta_base)
+        filas = [fila for fila, _ in registros]
+        for campo in CAMPOS_RANGO:
+            pares = sorted((valor, str(fila.get("id", "")).strip()) for fila in filas
+                           for valor in (_dimension(fila, campo),) if not math.isnan(valor))
+            indice.valores[campo] = array("d", (valor for valor, _ in pares))
+            indice.ids[campo] = [id_mob for _, id_mob in pares]
+        indice.total = len(filas)
+        indice.huella = huella_filas(filas, cls.campos_huella)
+        return indice
+
+    # -------------------- Mantenimiento --------------------
+    def insertar(self, fila: Dict[str, str], ruta_csv: str = None):
+        id_mob = str(fila.get("id", "")).strip()
+        for campo in CAMPOS_RANGO:
+            valor = _dimension(fila, campo)
+            if math.isnan(valor):
+                continue
+            posicion = bisect_right(self.valores[campo], valor)
+            self.valores[campo].insert(posicion, valor)
+            self.ids[campo].insert(posicion, id_mob)
+        self.total += 1
+        self.huella = (self.huella + huella_filas((fila,), self.campos_huella)) % 2 ** 64
+        self._anotar("+", fila)
+
+    def quitar(self, fila: Dict[str, str], ruta_csv: str = None):
+        id_mob = str(fila.get("id", "")).strip()
+        for campo in CAMPOS_RANGO:
+            valor = _dimension(fila, campo)
+            if math.isnan(valor):
+                continue
+            valores, ids = self.valores[campo], self.ids[campo]
+            # Entre las entradas con el mismo valor, la de este id
+            for posicion in range(bisect_left(valores, valor), bisect_right(valores, valor)):
+                if ids[posicion] == id_mob:
+                    del valores[posicion]
+                    del ids[posicion]
+                    break
+        self.total -= 1
+        self.huella = (self.huella - huella_filas((fila,), self.campos_huella)) % 2 ** 64
+        self._anotar("-", fila)
+
+    # -------------------- Consultas --------------------
+    def _tramo(self, campo: str, minimo: Optional[float], maximo: Optional[float]) -> Tuple[int, int]:
+        if campo not in self.valores:
+            raise ValueError(f"Campo sin índice de rangos: {campo!r} (disponibles: {', '.join(CAMPOS_RANGO)})")
+        valores = self.valores[campo]
+        inicio = 0 if minimo is None else bisect_left(valores, minimo)
+        fin = len(valores) if maximo is None else bisect_right(valores, maximo)
+        return inicio, max(inicio, fin)
+
+    def rango(self, campo: str, minimo: Optional[float] = None, maximo: Optional[float] = None) -> List[str]:
+        """Ids de los mobs con `minimo <= campo <= maximo` (None: sin límite), de menor a mayor valor."""
+        inicio, fin = self._tramo(campo, minimo, maximo)
+        return self.ids[campo][inicio:fin]
+
+    def buscar(self, catalogo, condiciones: Dict[str, Tuple[Optional[float], Optional[float]]]) -> List[Tuple[Dict[str, str], str]]:
+        """Mobs de `catalogo` que cumplen todos los rangos `campo -> (minimo, maximo)`.
+
+        Se recorre solo el tramo más corto de los índices y el resto de las
+        condiciones se verifica sobre esos candidatos. Retorna (mob, ruta_csv)
+        de menor a mayor valor del campo de ese tramo.
+        """
+        if not condiciones:
+            raise ValueError("Se necesita al menos un rango")
+        tramos = {campo: self._tramo(campo, *limites) for campo, limites in condiciones.items()}
+        campo = min(tramos, key=lambda c: tramos[c][1] - tramos[c][0])
+        inicio, fin = tramos[campo]
+        resto = [(nombre, minimo, maximo) for nombre, (minimo, maximo) in condiciones.items() if nombre != campo]
+        minimo_tramo, maximo_tramo = condiciones[campo]
+
+        def cumple(fila, condiciones):
+            for nombre, minimo, maximo in condiciones:
+                valor = _dimension(fila, nombre)
+                if math.isnan(valor) or (minimo is not None and valor < minimo) or (maximo is not None and valor > maximo):
+                    return False
+            return True
+
+        coincidencias = []
+        vistos = set()
+        for id_mob in self.ids[campo][inicio:fin]:
+            filas = catalogo.buscar_id(id_mob)
+            if len(filas) > 1:
+                # Id repetido: cada fila se toma una sola vez y solo si su valor está en el tramo
+                filas = [(fila, ruta_csv) for fila, ruta_csv in filas
+                         if id(fila) not in vistos and cumple(fila, [(campo, minimo_tramo, maximo_tramo)])]
+                vistos.update(id(fila) for fila, _ in filas)
+            for fila, ruta_csv in filas:
+                if not resto or cumple(fila, resto):
+                    coincidencias.append((fila, ruta_csv))
+        return coincidencias
+
+
+# Un índice de rangos por ruta base (clave: ruta absoluta)
+_RANGOS: Dict[str, IndiceRangos] = {}
+
+
+def obtener_indice_rangos(ruta_base: str = BASE_DIR, catalogo=None) -> IndiceRangos:
+    """Devuelve el índice de rangos de `ruta_base` (ver `_obtener_verificado`)."""
+    return _obtener_verificado(_RANGOS, IndiceRangos, ruta_base, catalogo)
+
+
+def _momentos_vacios() -> Dict:
+    """Cantidad, suma, suma de cuadrados y extremos de una columna (con cuántas filas tienen cada extremo)."""
+    return {"n": 0, "suma": 0.0, "suma2": 0.0, "min": None, "max": None, "n_min": 0, "n_max": 0}
+
+
+def _sumar_extremos(momentos: Dict, valor: float, desde_cero: bool = True):
+    # Un extremo None con `desde_cero` se toma como sin valores; si no, es desconocido y se deja así
+    for extremo, cantidad, mejor in (("min", "n_min", valor.__lt__), ("max", "n_max", valor.__gt__)):
+        actual = momentos[extremo]
+        if actual is None:
+            if desde_cero:
+                momentos[extremo], momentos[cantidad] = valor, 1
+        elif mejor(actual):
+            momentos[extremo], momentos[cantidad] = valor, 1
+        elif valor == actual:
+            momentos[cantidad] += 1
+
+
+def _sumar_momento(momentos: Dict, valor: float, signo: int):
+    """Suma (`signo` 1) o resta (-1) `valor` a `momentos` en O(1).
+
+    Quitar el último valor igual a un extremo lo deja en None (desconocido):
+    `AgregadosMobs.recalcular_extremos` lo vuelve a calcular desde las filas.
+    """
+    if signo > 0:
+        _sumar_extremos(momentos, valor, momentos["n"] == 0)
+        momentos["n"] += 1
+        momentos["suma"] += valor
+        momentos["suma2"] += valor * valor
+        return
+    momentos["n"] -= 1
+    if momentos["n"] <= 0:
+        momentos.update(_momentos_vacios())
+        return
+    momentos["suma"] -= valor
+    momentos["suma2"] -= valor * valor
+    for extremo, cantidad in (("min", "n_min"), ("max", "n_max")):
+        if momentos[extremo] == valor:
+            momentos[cantidad] -= 1
+            if momentos[cantidad] <= 0:
+                momentos[extremo], momentos[cantidad] = None, 0
+
+
+def _resumen_momentos(momentos: Dict) -> Dict:
+    """count, mean, std, min y max (como `mod.estadisticas.resumen_columna`, sin percentiles)."""
+    n = momentos["n"]
+    if not n:
+        return {"count": 0, "mean": 0.0, "std": 0.0, "min": 0.0, "max": 0.0}
+    media = momentos["suma"] / n
+    # suma2 / n - media² puede dar apenas negativo por redondeo
+    varianza = max(momentos["suma2"] / n - media * media, 0.0)
+    return {"count": n, "mean": media, "std": math.sqrt(varianza), "min": momentos["min"], "max": momentos["max"]}
+
+
+def _momentos_iguales(a: Optional[Dict], b: Optional[Dict]) -> bool:
+    """Compara dos momentos: exactos salvo las sumas, que según el orden de las altas y bajas redondean distinto."""
+    if a is None or b is None:
+        return a is b
+    return (all(a[clave] == b[clave] for clave in ("n", "min", "max", "n_min", "n_max"))
+            and all(math.isclose(a[clave], b[clave], rel_tol=1e-9, abs_tol=1e-9) for clave in ("suma", "suma2")))
+
+
+class AgregadosMobs:
+    """Agregados de las estadísticas globales, actualizados en cada alta/baja.
+
+    - `conteos`: para `CAMPOS_CONTEO`, valor -> cantidad de mobs.
+    - `columnas`: para cada columna numérica, cantidad, suma, suma de cuadrados,
+      mínimo y máximo (ver `_momentos_vacios`). De ahí salen media y desvío.
+    - `grupos`: lo mismo por cada valor de `CAMPOS_CONTEO` (campo -> valor ->
+      columna -> momentos).
+    Cada alta o baja cuesta O(1) y el archivo es chico (O(grupos)): se escribe
+    completo en cada confirmación en `<ruta_base>/.agregados.json`. Los
+    extremos guardan cuántas filas los tienen: si una baja se lleva el último,
+    quedan desconocidos hasta `recalcular_extremos`. Los percentiles y el
+    histograma necesitan todos los valores: no se mantienen aquí (ver
+    `mod.utils.estadisticas_mobs`).
+
+    El archivo también guarda la generación del árbol (`mod.diario`) y el motor
+    que lo escribió: si coinciden con los actuales, `agregados_vigentes` lo usa
+    sin cargar el catálogo. Los cambios hechos a mano en las hojas no avanzan la
+    generación: para eso está `verificar_agregados`.
+    """
+
+    campos_huella = CAMPOS_CONTEO + COLUMNAS_NUMERICAS
+
+    def __init__(self, ruta_base: str = BASE_DIR):
+        self.ruta_base = ruta_base
+        self.total = 0
+        self.huella = 0
+        self.conteos: Dict[str, Dict[str, int]] = {campo: {} for campo in CAMPOS_CONTEO}
+        self.columnas: Dict[str, Dict] = {columna: _momentos_vacios() for columna in COLUMNAS_NUMERICAS}
+        self.grupos: Dict[str, Dict[str, Dict[str, Dict]]] = {campo: {} for campo in CAMPOS_CONTEO}
+        # Generación del árbol que reflejan (None: desconocida) y motor que los escribió
+        self.generacion: Optional[int] = None
+        self.motor: Optional[str] = None
+        self._modificado = False
+
+    @property
+    def ruta(self) -> str:
+        return os.path.join(self.ruta_base, ARCHIVO_AGREGADOS)
+
+    # -------------------- Persistencia --------------------
+    @classmethod
+    def cargar(cls, ruta_base: str = BASE_DIR) -> Optional["AgregadosMobs"]:
+        """Lee los agregados guardados en `ruta_base`, o None si no existen, están dañados o son de otro formato."""
+        agregados = cls(ruta_base)
+        datos = _leer_json(agregados.ruta)
+        if (not isinstance(datos, dict) or set(datos.get("conteos", ())) != set(CAMPOS_CONTEO)
+                or set(datos.get("columnas", ())) != set(COLUMNAS_NUMERICAS)
+                or set(datos.get("grupos", ())) != set(CAMPOS_CONTEO)):
+            return None
+        agregados.total = datos["total"]
+        agregados.huella = datos["huella"]
+        agregados.generacion = datos.get("generacion")
+        agregados.motor = datos.get("motor")
+        agregados.conteos = datos["conteos"]
+        agregados.columnas = datos["columnas"]
+        agregados.grupos = datos["grupos"]
+        return agregados
+
+    @classmethod
+    def desde_registros(cls, ruta_base: str, registros) -> "AgregadosMobs":
+        agregados = cls(ruta_base)
+        for fila, ruta_csv in registros:
+            agregados.insertar(fila, ruta_csv)
+        return agregados
+
+    def datos(self) -> Dict:
+        """Contenido persistido (también sirve para comparar dos agregados)."""
+        return {"total": self.total, "huella": self.huella, "conteos": self.conteos,
+                "columnas": self.columnas, "grupos": self.grupos}
+
+    def escribir(self):
+        """Escribe los agregados si cambiaron (a un temporal que luego reemplaza al archivo)."""
+        if not self._modificado or not os.path.isdir(self.ruta_base):
+            return
+        self.motor = motor_en_uso()
+        datos = dict(self.datos(), generacion=self.generacion, motor=self.motor)
+        publicar_archivo(self.ruta, json.dumps(datos, separators=(",", ":")).encode("utf-8"), sincronizar=False)
+        self._modificado = False
+
+    def guardar(self):
+        self.escribir()
+
+    # -------------------- Mantenimiento --------------------
+    def _momentos_de(self, fila: Dict[str, str]) -> List[Dict[str, Dict]]:
+        """Momentos por columna que toca `fila`: los globales y los de su grupo en cada `CAMPOS_CONTEO`."""
+        afectados = [self.columnas]
+        for campo in CAMPOS_CONTEO:
+            grupos = self.grupos[campo]
+            valor = fila.get(campo) or ""
+            grupo = grupos.get(valor)
+            if grupo is None:
+                grupo = grupos[valor] = {columna: _momentos_vacios() for columna in COLUMNAS_NUMERICAS}
+            afectados.append(grupo)
+        return afectados
+
+    def _sumar(self, fila: Dict[str, str], signo: int):
+        afectados = self._momentos_de(fila)
+        for columna in COLUMNAS_NUMERICAS:
+            valor = valor_numerico(fila.get(columna, "0"))
+            if math.isnan(valor):
+                continue
+            for momentos in afectados:
+                _sumar_momento(momentos[columna], valor, signo)
+        for campo in CAMPOS_CONTEO:
+            conteos = self.conteos[campo]
+            valor = fila.get(campo) or ""
+            conteos[valor] = conteos.get(valor, 0) + signo
+            if conteos[valor] <= 0:
+                del conteos[valor]
+                del self.grupos[campo][valor]
+        self.total += signo
+        self.huella = (self.huella + signo * huella_filas((fila,), self.campos_huella)) % 2 ** 64
+        self._modificado = True
+
+    def insertar(self, fila: Dict[str, str], ruta_csv: str = None):
+        self._sumar(fila, 1)
+
+    def quitar(self, fila: Dict[str, str], ruta_csv: str = None):
+        self._sumar(fila, -1)
+
+    def _todos_los_momentos(self) -> Iterable[Dict]:
+        yield from self.columnas.values()
+        for grupos in self.grupos.values():
+            for grupo in grupos.values():
+                yield from grupo.values()
+
+    @property
+    def completos(self) -> bool:
+        """False si alguna baja dejó un mínimo o máximo desconocido (ver `recalcular_extremos`)."""
+        return all(momentos["n"] == 0 or (momentos["min"] is not None and momentos["max"] is not None)
+                   for momentos in self._todos_los_momentos())
+
+    def recalcular_extremos(self, registros):
+        """Vuelve a calcular mínimos y máximos desde `registros` (mob, ruta_csv): O(filas), solo tras esas bajas."""
+        for momentos in self._todos_los_momentos():
+            momentos.update(min=None, max=None, n_min=0, n_max=0)
+        for fila, _ in registros:
+            afectados = self._momentos_de(fila)
+            for columna in COLUMNAS_NUMERICAS:
+                valor = valor_numerico(fila.get(columna, "0"))
+                if not math.isnan(valor):
+                    for momentos in afectados:
+                        _sumar_extremos(momentos[columna], valor)
+        self._modificado = True
+
+    # -------------------- Consultas --------------------
+    def resumen(self, columna: str, grupo: Optional[Tuple[str, str]] = None) -> Dict:
+        """count, mean, std, min y max de `columna`, global o del `grupo` (campo, valor)."""
+        if grupo is None:
+            return _resumen_momentos(self.columnas[columna])
+        campo, valor = grupo
+        return _resumen_momentos(self.grupos[campo][valor][columna])
+
+    def estadisticas(self) -> Dict:
+        """Resultado de `mod.utils.estadisticas_mobs` (sin percentiles), en O(grupos)."""
+        columnas = {columna: self.resumen(columna) for columna in COLUMNAS_NUMERICAS}
+        stats = {"total": self.total}
+        for campo in CAMPOS_CONTEO:
+            agrupados: Dict[str, int] = {}
+            for valor, conteo in self.conteos[campo].items():
+                clave = valor or "Desconocida"
+                agrupados[clave] = agrupados.get(clave, 0) + conteo
+            stats[f"por_{campo}"] = agrupados
+        for columna in ("width", "height"):
+            stats[f"avg_{columna}"] = columnas[columna]["mean"]
+            stats[f"min_{columna}"] = columnas[columna]["min"]
+            stats[f"max_{columna}"] = columnas[columna]["max"]
+        stats.update(columnas)
+        stats["grupos"] = {
+            campo: {valor or "Desconocida": {"total": self.conteos[campo][valor],
+                                             "columnas": {columna: self.resumen(columna, (campo, valor))
+                                                          for columna in COLUMNAS_NUMERICAS}}
+                    for valor in sorted(self.grupos[campo])}
+            for campo in CAMPOS_CONTEO}
+        return stats
+
+
+# Agregados por ruta base (clave: ruta absoluta)
+_AGREGADOS: Dict[str, AgregadosMobs] = {}
+
+
+def obtener_agregados(ruta_base: str = BASE_DIR, catalogo=None) -> AgregadosMobs:
+    """Devuelve los agregados de `ruta_base` (ver `_obtener_verificado`)."""
+    return _obtener_verificado(_AGREGADOS, AgregadosMobs, ruta_base, catalogo)
+
+
+def agregados_vigentes(ruta_base: str = BASE_DIR) -> AgregadosMobs:
+    """Agregados de `ruta_base` cargando el catálogo solo si hace falta.
+
+    Si el catálogo ya está en memoria se usan los suyos. Si no, se lee
+    `.agregados.json` y, si es de la generación actual del árbol y del motor en
+    uso y no le falta ningún extremo, se devuelve tal cual: no se lee ninguna
+    hoja. En otro caso se cargan con el catálogo (`obtener_agregados`), que los
+    reconstruye si no son de su generación, y los extremos desconocidos se
+    recalculan desde sus filas.
+    """
+    if os.path.abspath(ruta_base) not in _AGREGADOS:
+        agregados = AgregadosMobs.cargar(ruta_base)
+        if (agregados is not None and agregados.generacion is not None and agregados.completos
+                and agregados.generacion == leer_generacion(ruta_base) and agregados.motor == motor_en_uso()):
+            return agregados
+    agregados = obtener_agregados(ruta_base)
+    if not agregados.completos:
+        catalogo = obtener_catalogo(ruta_base)
+        agregados.recalcular_extremos(catalogo.registros())
+        _publicar_vigente(agregados, catalogo)
+    return agregados
+
+
+class _Reconstruir(VisitanteArbol):
+    def __init__(self, agregados: AgregadosMobs, campos_huella: List[Tuple[str, ...]]):
+        self.agregados = agregados
+        # Huella de las filas leídas para los campos de cada índice
+        self.campos_huella = campos_huella
+        self.huellas = [0] * len(campos_huella)
+
+    def visitar_hoja(self, ruta_csv, filas):
+        for fila in filas:
+            self.agregados.insertar(fila, ruta_csv)
+        for posicion, campos in enumerate(self.campos_huella):
+            self.huellas[posicion] = (self.huellas[posicion] + huella_filas(filas, campos)) % 2 ** 64
+
+
+# Índices que verifica `verificar_agregados`: (nombre, registro, clase)
+_INDICES_VERIFICADOS = (
+    ("indice_unico", _INDICES, IndiceUnico),
+    ("indice_trigramas", _TRIGRAMAS, IndiceTrigramas),
+    ("indice_rangos", _RANGOS, IndiceRangos),
+)
+
+
+def _reemplazar(catalogo, registro: Dict, actual, nuevo):
+    """Pone `nuevo` en lugar de `actual` en `catalogo.derivados` y en `registro`, y lo escribe."""
+    nuevo.generacion = catalogo.diario.generacion
+    _publicar_vigente(nuevo, catalogo)
+    catalogo.derivados[catalogo.derivados.index(actual)] = nuevo
+    registro[os.path.abspath(catalogo.ruta_base)] = nuevo
+
+
+def verificar_agregados(ruta_base: str = BASE_DIR, reparar: bool = False) -> Dict:
+    """Reconstruye los agregados releyendo todas las hojas y los compara con los actuales.
+
+    Las hojas se leen con `catalogo.recorrer` (del disco, o de la base con el
+    motor "sqlite"). También se compara el total y la huella de cada índice
+    (`_INDICES_VERIFICADOS`) con la de las filas leídas: al cargarlos solo se
+    mira la generación. Retorna {"ok", "total", "diferencias"} (campos que no
+    coinciden). Con `reparar`, lo que difiere se reemplaza: los agregados por
+    los reconstruidos y los índices por uno construido desde el catálogo.
+    """
+    catalogo = obtener_catalogo(ruta_base)
+    actuales = obtener_agregados(ruta_base, catalogo)
+    if not actuales.completos:
+        actuales.recalcular_extremos(catalogo.registros())
+    indices = [_obtener_verificado(registro, clase, ruta_base, catalogo) for _, registro, clase in _INDICES_VERIFICADOS]
+    reconstruidos = AgregadosMobs(ruta_base)
+    visitante = _Reconstruir(reconstruidos, [indice.campos_huella for indice in indices])
+    catalogo.recorrer(visitante)
+    diferencias = []
+    for clave in ("total", "huella"):
+        if getattr(reconstruidos, clave) != getattr(actuales, clave):
+            diferencias.append(clave)
+    for campo in CAMPOS_CONTEO:
+        if reconstruidos.conteos[campo] != actuales.conteos.get(campo):
+            diferencias.append(f"conteos.{campo}")
+        esperados, obtenidos = reconstruidos.grupos[campo], actuales.grupos.get(campo, {})
+        if esperados.keys() != obtenidos.keys() or not all(
+                _momentos_iguales(momentos, obtenidos[valor].get(columna))
+                for valor, grupo in esperados.items() for columna, momentos in grupo.items()):
+            diferencias.append(f"grupos.{campo}")
+    for columna, momentos in reconstruidos.columnas.items():
+        if not _momentos_iguales(momentos, actuales.columnas.get(columna)):
+            diferencias.append(f"columnas.{columna}")
+    if diferencias and reparar:
+        _reemplazar(catalogo, _AGREGADOS, actuales, reconstruidos)
+    for (nombre, registro, clase), indice, huella in zip(_INDICES_VERIFICADOS, indices, visitante.huellas):
+        if (indice.total, indice.huella) != (reconstruidos.total, huella):
+            diferencias.append(f"{nombre}.huella")
+            if reparar:
+                _reemplazar(catalogo, registro, indice, clase.desde_registros(ruta_base, catalogo.registros()))
+    return {"ok": not diferencias, "total": reconstruidos.total, "diferencias": diferencias}
+
+
+def invalidar_indices(ruta_base: str):
+    """Descarta los índices de `ruta_base` en memoria y en disco (se reconstruirán)."""
+    _INDICES.pop(os.path.abspath(ruta_base), None)
+    _TRIGRAMAS.pop(os.path.abspath(ruta_base), None)
+    _RANGOS.pop(os.path.abspath(ruta_base), None)
+    _AGREGADOS.pop(os.path.abspath(ruta_base), None)
+    for archivo in (ARCHIVO_INDICE_UNICO, ARCHIVO_INDICE_TRIGRAMAS, ARCHIVO_INDICE_RANGOS, ARCHIVO_AGREGADOS):
+        ruta = os.path.join(ruta_base, archivo)
+        # Junto con el registro de cambios de los índices (ver `_IndicePersistente`)
+        for descartado in (ruta, os.path.splitext(ruta)[0] + ".cambios"):
+            try:
+                os.remove(descartado)
+            except OSError:
+                pass
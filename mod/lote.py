@@ -0,0 +1,204 @@
+import csv
+import json
+import os
+from typing import Any, Dict, Iterable, List, TextIO
+
+from mod.catalogo import BASE_DIR, obtener_catalogo
+from mod.etl import ENCABEZADOS, NIVELES, TIPOS_PERMITIDOS, derivar_hostilidad, derivar_movilidad, derivar_subtipo
+from mod.indices import obtener_indice_unico
+from mod.perfil import operacion
+
+
+# Nombres aceptados para cada operación (en español o en inglés)
+OPERACIONES = {
+    "agregar": "agregar", "insert": "agregar", "add": "agregar",
+    "actualizar": "actualizar", "update": "actualizar",
+    "eliminar": "eliminar", "delete": "eliminar",
+}
+
+
+def leer_operaciones(ruta: str) -> List[Dict[str, Any]]:
+    """Lee un archivo de cambios `.csv` o `.jsonl` y devuelve la lista de operaciones.
+
+    Ver `leer_operaciones_de` para el formato de cada operación.
+    """
+    formato = "jsonl" if ruta.lower().endswith(".jsonl") else "csv"
+    with open(ruta, "r", encoding="utf-8", newline="") as f:
+        return leer_operaciones_de(f, formato)
+
+
+def leer_operaciones_de(archivo: TextIO, formato: str = "jsonl") -> List[Dict[str, Any]]:
+    """Lee operaciones de un archivo de texto ya abierto (p. ej. stdin) en `formato` "jsonl" o "csv".
+
+    Cada operación es un dict con:
+    - `op`: agregar/actualizar/eliminar (o insert/update/delete).
+    - `clave`: id o name del mob a actualizar/eliminar.
+    - `valores`: campos del mob (fila completa al agregar, cambios al actualizar).
+
+    En CSV, las columnas `op` y `clave` son fijas y el resto forman `valores`
+    (las celdas vacías se ignoran). En JSONL, los campos pueden ir dentro de
+    `valores` o directamente en el objeto.
+    """
+    operaciones = []
+    if formato == "jsonl":
+        for linea in archivo:
+            if not linea.strip():
+                continue
+            obj = json.loads(linea)
+            valores = obj.pop("valores", None)
+            if valores is None:
+                valores = {k: v for k, v in obj.items() if k not in ("op", "clave")}
+            operaciones.append({"op": obj.get("op"), "clave": obj.get("clave"), "valores": valores})
+    else:
+        for fila in csv.DictReader(archivo):
+            valores = {k: v for k, v in fila.items() if k not in ("op", "clave") and v not in (None, "")}
+            operaciones.append({"op": fila.get("op"), "clave": fila.get("clave"), "valores": valores})
+    return operaciones
+
+
+def _ruta_hoja(ruta_base: str, fila: Dict[str, str]) -> str:
+    """Completa los niveles que falten en `fila` y devuelve la ruta de su hoja."""
+    if not fila.get("hostilidad"):
+        fila["hostilidad"] = derivar_hostilidad(fila.get("category"))
+    if not fila.get("subtipo"):
+        fila["subtipo"] = derivar_subtipo(fila)
+    if not fila.get("movilidad"):
+        fila["movilidad"] = derivar_movilidad(fila)
+    return os.path.normpath(os.path.join(ruta_base, *[fila[nivel] for nivel in NIVELES], "mobs.csv"))
+
+
+def _motivo_rechazo_alta(catalogo, valores: Dict[str, str]) -> str:
+    """Por qué no se puede agregar un mob con `valores` ("" si se puede).
+
+    Aplica las mismas reglas que `mod.crud.agregar_interactivo`: id numérico y
+    único, name y displayName que no usa otro mob (ni como name ni como
+    displayName), type permitido y width/height numéricos.
+    """
+    if not valores.get("id") or not valores.get("name"):
+        return "'id' y 'name' son obligatorios"
+    sobrantes = set(valores) - set(ENCABEZADOS)
+    if sobrantes:
+        return f"Campos desconocidos: {sorted(sobrantes)}"
+    try:
+        int(valores["id"])
+    except ValueError:
+        return f"'id' debe ser un número (se recibió {valores['id']!r})"
+    indice = obtener_indice_unico(catalogo.ruta_base, catalogo)
+    if indice.existe("id", valores["id"]):
+        return f"ID '{valores['id']}' ya existe"
+    for campo in ("name", "displayName"):
+        nombre = valores.get(campo)
+        if nombre and (indice.existe("name", nombre) or indice.existe("displayName", nombre)):
+            return f"El nombre '{nombre}' ya existe"
+    tipo = str(valores.get("type") or "").strip().lower()
+    if tipo not in TIPOS_PERMITIDOS:
+        return f"'type' debe ser uno de: {sorted(TIPOS_PERMITIDOS)}"
+    for dimension in ("width", "height"):
+        valor = valores.get(dimension)
+        if valor in (None, ""):
+            continue
+        try:
+            float(valor)
+        except (ValueError, TypeError):
+            return f"'{dimension}' debe ser numérico (se recibió {valor!r})"
+    return ""
+
+
+def _fila_alta(valores: Dict[str, str]) -> Dict[str, str]:
+    """Fila completa para un alta ya validada, con los mismos valores por defecto que el alta interactiva."""
+    fila = {campo: valores.get(campo, "") for campo in ENCABEZADOS}
+    fila["displayName"] = fila["displayName"] or fila["name"]
+    fila["type"] = fila["type"].strip().lower()
+    for dimension in ("width", "height"):
+        fila[dimension] = fila[dimension] or "0"
+    return fila
+
+
+@operacion
+def aplicar_lote(operaciones: Iterable[Dict[str, Any]], ruta_base: str = BASE_DIR) -> List[Dict[str, Any]]:
+    """Aplica muchas operaciones de una vez, escribiendo cada hoja tocada una sola vez.
+
+    Las operaciones se resuelven contra el catálogo en memoria en orden; las
+    hojas afectadas se reescriben al final. Retorna un resultado por operación:
+    {"indice", "op", "clave", "estado": "ok"/"error", "detalle", "ruta"}.
+    """
+    catalogo = obtener_catalogo(ruta_base)
+    resultados = []
+    tocadas = set()
+
+    for indice, operacion in enumerate(operaciones, 1):
+        op = OPERACIONES.get(str(operacion.get("op") or "").strip().lower())
+        clave = operacion.get("clave")
+        valores = dict(operacion.get("valores") or {})
+        resultado = {"indice": indice, "op": op or operacion.get("op"), "clave": clave,
+                     "estado": "error", "detalle": "", "ruta": None}
+        resultados.append(resultado)
+
+        if op is None:
+            resultado["detalle"] = f"Operación desconocida: {operacion.get('op')!r}"
+            continue
+
+        if op == "agregar":
+            # El reporte identifica el alta por el id enviado, también si se rechaza
+            resultado["clave"] = valores.get("id")
+            resultado["detalle"] = _motivo_rechazo_alta(catalogo, valores)
+            if resultado["detalle"]:
+                continue
+            fila = _fila_alta(valores)
+            # El bloqueo de cada hoja tocada se mantiene hasta confirmar el lote
+            ruta_csv = catalogo.insertar_en_memoria(fila, catalogo.bloquear_hoja(_ruta_hoja(ruta_base, fila)))
+
+        else:
+            encontrado = catalogo.ubicar_bloqueado(clave) if clave not in (None, "") else None
+            if encontrado is None:
+                resultado["detalle"] = f"No se encontró el mob '{clave}'"
+                continue
+            fila, _ = encontrado
+            if op == "actualizar":
+                try:
+                    ruta_csv = catalogo.modificar_en_memoria(fila, valores)
+                except ValueError as e:
+                    resultado["detalle"] = str(e)
+                    continue
+            else:
+                ruta_csv = catalogo.quitar_en_memoria(fila)
+
+        tocadas.add(ruta_csv)
+        resultado["estado"] = "ok"
+        resultado["ruta"] = ruta_csv
+
+    # Una sola escritura por hoja, sin importar cuántas operaciones la tocaron
+    for ruta_csv in sorted(tocadas):
+        catalogo.persistir_hoja(ruta_csv)
+    if tocadas:
+        # Con el árbol, confirmar también guarda los derivados
+        catalogo.confirmar()
+    return resultados
+
+
+@operacion
+def agregar_uno(valores: Dict[str, str], ruta_base: str = BASE_DIR) -> Dict[str, Any]:
+    """Agrega un solo mob con `catalogo.agregar`: se anexa a su hoja por el diario, sin reescribirla.
+
+    Valida igual que `aplicar_lote` y retorna un resultado con la misma forma.
+    """
+    catalogo = obtener_catalogo(ruta_base)
+    valores = dict(valores or {})
+    resultado = {"indice": 1, "op": "agregar", "clave": valores.get("id"),
+                 "estado": "error", "detalle": _motivo_rechazo_alta(catalogo, valores), "ruta": None}
+    if resultado["detalle"]:
+        return resultado
+    fila = _fila_alta(valores)
+    try:
+        _, ruta_csv = catalogo.agregar(fila, _ruta_hoja(ruta_base, fila), ENCABEZADOS)
+    except ValueError as e:
+        resultado["detalle"] = str(e)
+        return resultado
+    resultado["estado"] = "ok"
+    resultado["ruta"] = ruta_csv
+    return resultado
+
+
+def aplicar_archivo_cambios(ruta_cambios: str, ruta_base: str = BASE_DIR) -> List[Dict[str, Any]]:
+    """Lee `ruta_cambios` (.csv o .jsonl) y aplica sus operaciones con `aplicar_lote`."""
+    return aplicar_lote(leer_operaciones(ruta_cambios), ruta_base)
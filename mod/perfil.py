@@ -0,0 +1,234 @@
+"""Instrumentación opcional: tiempos por operación y contadores de E/S.
+
+Se activa con la variable de entorno `MOBS_PERFIL` ("tabla" o "json") o con
+`activar()`. Mientras está apagada, cada punto instrumentado cuesta solo la
+consulta de un booleano. Al salir del proceso se escribe el informe en stderr
+(o en el archivo de `MOBS_PERFIL_SALIDA`); con `MOBS_PERFIL_MEMORIA=1` también
+se mide el pico de memoria con tracemalloc.
+
+    MOBS_PERFIL=tabla python main.py stats
+    MOBS_PERFIL=json MOBS_PERFIL_SALIDA=perfil.json python main.py generate --forzar
+
+Contadores (ver `CONTADORES`): carpetas recorridas, archivos/filas/bytes
+leídos y archivos/filas/bytes escritos. Cada operación (funciones marcadas con
+`@operacion` o bloques `with seccion(...)`) acumula llamadas, tiempo y lo que
+sumaron los contadores mientras corría, incluidas sus operaciones internas y
+lo que hagan otros hilos en ese lapso. Los procesos hijos (ETL con procesos)
+no se cuentan.
+"""
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+# Variables de entorno
+VARIABLE_PERFIL = "MOBS_PERFIL"
+VARIABLE_SALIDA = "MOBS_PERFIL_SALIDA"
+VARIABLE_MEMORIA = "MOBS_PERFIL_MEMORIA"
+
+FORMATOS = ("tabla", "json")
+
+CONTADORES = ("directorios", "archivos_leidos", "filas_leidas", "bytes_leidos",
+              "archivos_escritos", "filas_escritas", "bytes_escritos")
+
+# Estado global del perfil (un solo informe por proceso)
+_activo = False
+_formato = "tabla"
+_salida: Optional[str] = None
+_memoria = False
+_inicio = 0.0
+_pico_memoria = 0
+_totales: Dict[str, int] = dict.fromkeys(CONTADORES, 0)
+_operaciones: Dict[str, Dict[str, Any]] = {}
+_candado = threading.Lock()
+_hilo = threading.local()
+
+
+def activo() -> bool:
+    return _activo
+
+
+def activar(formato: str = "tabla", salida: Optional[str] = None, memoria: bool = False):
+    """Empieza a medir. El informe se escribe al salir (o con `escribir_informe`)."""
+    global _activo, _formato, _salida, _memoria, _inicio
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato de perfil desconocido: {formato!r} (opciones: {', '.join(FORMATOS)})")
+    reiniciar()
+    _formato, _salida, _memoria = formato, salida, memoria
+    if memoria and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _inicio = time.perf_counter()
+    _activo = True
+
+
+def desactivar():
+    """Deja de medir (lo ya medido se conserva hasta `reiniciar` o `activar`)."""
+    global _activo
+    _activo = False
+    if _memoria and tracemalloc.is_tracing():
+        _actualizar_pico()
+        tracemalloc.stop()
+
+
+def reiniciar():
+    global _pico_memoria, _inicio
+    with _candado:
+        _totales.update(dict.fromkeys(CONTADORES, 0))
+        _operaciones.clear()
+        _pico_memoria = 0
+        _inicio = time.perf_counter()
+
+
+def contar(nombre: str, cantidad: int = 1):
+    """Suma `cantidad` al contador `nombre` (no hace nada si el perfil está apagado)."""
+    if _activo:
+        with _candado:
+            _totales[nombre] = _totales.get(nombre, 0) + cantidad
+
+
+def _actualizar_pico():
+    global _pico_memoria
+    if tracemalloc.is_tracing():
+        _pico_memoria = max(_pico_memoria, tracemalloc.get_traced_memory()[1])
+
+
+@contextmanager
+def seccion(nombre: str):
+    """Mide el bloque como la operación `nombre` (tiempo, llamadas y contadores)."""
+    if not _activo:
+        yield
+        return
+    profundidad = getattr(_hilo, "profundidad", 0)
+    # El pico de memoria se mide por operación de primer nivel (reset_peak es global)
+    medir_memoria = _memoria and profundidad == 0 and tracemalloc.is_tracing()
+    if medir_memoria:
+        _actualizar_pico()
+        tracemalloc.reset_peak()
+    with _candado:
+        antes = dict(_totales)
+    _hilo.profundidad = profundidad + 1
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        segundos = time.perf_counter() - inicio
+        _hilo.profundidad = profundidad
+        pico = None
+        if medir_memoria and tracemalloc.is_tracing():
+            pico = tracemalloc.get_traced_memory()[1]
+            _actualizar_pico()
+        with _candado:
+            datos = _operaciones.get(nombre)
+            if datos is None:
+                datos = _operaciones[nombre] = {"llamadas": 0, "segundos": 0.0, "max_segundos": 0.0,
+                                                **dict.fromkeys(CONTADORES, 0)}
+            datos["llamadas"] += 1
+            datos["segundos"] += segundos
+            datos["max_segundos"] = max(datos["max_segundos"], segundos)
+            for contador, valor in _totales.items():
+                datos[contador] = datos.get(contador, 0) + valor - antes.get(contador, 0)
+            if pico is not None:
+                datos["pico_memoria"] = max(datos.get("pico_memoria", 0), pico)
+
+
+def operacion(funcion=None, *, nombre: Optional[str] = None):
+    """Decorador: mide cada llamada a `funcion` como la operación "<módulo>.<función>"."""
+    if funcion is None:
+        return lambda f: operacion(f, nombre=nombre)
+    etiqueta = nombre or f"{funcion.__module__.rsplit('.', 1)[-1]}.{funcion.__name__}"
+
+    @functools.wraps(funcion)
+    def envoltura(*args, **kwargs):
+        if not _activo:
+            return funcion(*args, **kwargs)
+        with seccion(etiqueta):
+            return funcion(*args, **kwargs)
+    return envoltura
+
+
+def informe() -> Dict[str, Any]:
+    """Lo medido hasta ahora: totales, operaciones (de mayor a menor tiempo) y pico de memoria."""
+    if _memoria:
+        _actualizar_pico()
+    with _candado:
+        operaciones = sorted(_operaciones.items(), key=lambda item: item[1]["segundos"], reverse=True)
+        datos = {
+            "segundos": time.perf_counter() - _inicio,
+            "totales": dict(_totales),
+            "operaciones": {nombre: dict(valores) for nombre, valores in operaciones},
+        }
+    if _memoria:
+        datos["pico_memoria"] = _pico_memoria
+    return datos
+
+
+def _bytes(valor: int) -> str:
+    for unidad in ("B", "KiB", "MiB"):
+        if abs(valor) < 1024:
+            return f"{valor:.0f} {unidad}" if unidad == "B" else f"{valor:.1f} {unidad}"
+        valor /= 1024
+    return f"{valor:.1f} GiB"
+
+
+def formatear_tabla(datos: Dict[str, Any]) -> str:
+    """Informe como tabla de texto (una fila por operación)."""
+    columnas = ["operación", "llamadas", "total s", "máx ms", "carpetas", "leídos",
+                "filas leídas", "bytes leídos", "escritos", "filas escritas", "bytes escritos"]
+    con_memoria = "pico_memoria" in datos
+    if con_memoria:
+        columnas.append("pico memoria")
+
+    def fila(nombre, valores, llamadas="", total="", maximo=""):
+        celdas = [nombre, str(llamadas), total, maximo, str(valores["directorios"]),
+                  str(valores["archivos_leidos"]), str(valores["filas_leidas"]), _bytes(valores["bytes_leidos"]),
+                  str(valores["archivos_escritos"]), str(valores["filas_escritas"]), _bytes(valores["bytes_escritos"])]
+        if con_memoria:
+            pico = valores.get("pico_memoria")
+            celdas.append(_bytes(pico) if pico is not None else "")
+        return celdas
+
+    filas = [fila(nombre, valores, valores["llamadas"], f"{valores['segundos']:.3f}",
+                  f"{valores['max_segundos'] * 1000:.1f}")
+             for nombre, valores in datos["operaciones"].items()]
+    filas.append(fila("TOTAL", dict(datos["totales"], pico_memoria=datos.get("pico_memoria")),
+                      total=f"{datos['segundos']:.3f}"))
+    anchos = [max(len(columna), *(len(f[i]) for f in filas)) for i, columna in enumerate(columnas)]
+    lineas = ["  ".join(c.ljust(a) if i == 0 else c.rjust(a) for i, (c, a) in enumerate(zip(f, anchos)))
+              for f in [columnas] + filas]
+    lineas.insert(1, "  ".join("-" * a for a in anchos))
+    return "\n".join(lineas)
+
+
+def escribir_informe(formato: Optional[str] = None, salida: Optional[str] = None):
+    """Escribe el informe en `salida` (archivo) o en stderr, como tabla o JSON."""
+    formato = formato or _formato
+    salida = salida or _salida
+    datos = informe()
+    texto = json.dumps(datos, indent=1, ensure_ascii=False) if formato == "json" else formatear_tabla(datos)
+    if salida:
+        with open(salida, "w", encoding="utf-8") as f:
+            f.write(texto + "\n")
+    else:
+        print(texto, file=sys.stderr)
+
+
+@atexit.register
+def _al_salir():
+    if _activo:
+        escribir_informe()
+
+
+def _desde_entorno():
+    formato = os.environ.get(VARIABLE_PERFIL, "").strip().lower()
+    if formato and formato not in ("0", "no"):
+        activar(formato if formato in FORMATOS else "tabla", os.environ.get(VARIABLE_SALIDA) or None,
+                os.environ.get(VARIABLE_MEMORIA, "").strip() not in ("", "0"))
+
+
+_desde_entorno()
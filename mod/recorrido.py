@@ -0,0 +1,100 @@
+import os
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+from mod.almacenamiento import NOMBRE_HOJA, AlmacenamientoCSV, obtener_almacenamiento
+from mod.bloqueos import bloqueo_hoja
+from mod.perfil import contar, operacion
+from mod.utils import leer_csv
+
+# Cantidad de hilos por defecto para leer hojas en paralelo
+TRABAJADORES = min(8, (os.cpu_count() or 1) * 2)
+
+
+class VisitanteArbol:
+    """Base para los recorridos del árbol (patrón visitante).
+
+    - `entrar(ruta, nombre, profundidad)`: False poda ese subdirectorio.
+    - `visitar_hoja(ruta_csv, filas)`: procesa una hoja; True detiene el recorrido.
+    """
+
+    def entrar(self, ruta: str, nombre: str, profundidad: int) -> bool:
+        return True
+
+    def visitar_hoja(self, ruta_csv: str, filas: List[Dict[str, str]]) -> Optional[bool]:
+        return None
+
+
+def buscar_hojas(ruta_base: str, entrar: Optional[Callable[[str, str, int], bool]] = None,
+                 profundidad: int = 0, almacenamiento: Optional[AlmacenamientoCSV] = None) -> List[str]:
+    """Rutas de todos los mobs.csv bajo `ruta_base`, en orden (la hoja de una carpeta antes que sus hijas).
+
+    Usa `os.scandir`, cuyo `DirEntry` trae el tipo de cada entrada sin un stat
+    extra por archivo. Las carpetas ocultas (".algo") se ignoran. Se buscan los
+    archivos del formato de `almacenamiento` (el actual por defecto), pero
+    siempre se devuelve la ruta lógica `.../mobs.csv`.
+    """
+    almacenamiento = almacenamiento or obtener_almacenamiento()
+    try:
+        with os.scandir(ruta_base) as it:
+            entradas = sorted(it, key=lambda e: e.name)
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+    contar("directorios")
+    hojas = []
+    subdirectorios = []
+    for entrada in entradas:
+        if entrada.name == almacenamiento.nombre_hoja and entrada.is_file():
+            hojas.append(os.path.normpath(os.path.join(ruta_base, NOMBRE_HOJA)))
+        elif entrada.is_dir(follow_symlinks=False) and not entrada.name.startswith("."):
+            subdirectorios.append(entrada)
+    for entrada in subdirectorios:
+        if entrar is None or entrar(entrada.path, entrada.name, profundidad):
+            hojas.extend(buscar_hojas(entrada.path, entrar, profundidad + 1, almacenamiento))
+    return hojas
+
+
+def leer_hoja(ruta_csv: str) -> List[Dict[str, str]]:
+    """Lee la hoja con su bloqueo compartido: nunca ve una escritura de otro proceso a medias."""
+    with bloqueo_hoja(ruta_csv):
+        return leer_csv(ruta_csv)
+
+
+def leer_hojas(rutas: List[str], trabajadores: int = TRABAJADORES,
+               lector: Callable[[str], List[Dict[str, str]]] = leer_hoja) -> Iterator[Tuple[str, List[Dict[str, str]]]]:
+    """Genera (ruta_csv, filas) en el mismo orden que `rutas`, leyendo en paralelo con hilos.
+
+    Solo se adelantan `2 * trabajadores` hojas: si el consumidor es más lento
+    que la lectura, en memoria no se acumulan las filas de todo el árbol.
+    """
+    if trabajadores <= 1 or len(rutas) <= 1:
+        for ruta in rutas:
+            yield ruta, lector(ruta)
+        return
+    pool = ThreadPoolExecutor(max_workers=trabajadores)
+    pendientes: Deque[Tuple[str, Future]] = deque()
+    siguientes = iter(rutas)
+    try:
+        for ruta in islice(siguientes, 2 * trabajadores):
+            pendientes.append((ruta, pool.submit(lector, ruta)))
+        while pendientes:
+            ruta, futuro = pendientes.popleft()
+            filas = futuro.result()
+            for nueva in islice(siguientes, 1):
+                pendientes.append((nueva, pool.submit(lector, nueva)))
+            yield ruta, filas
+            del filas
+    finally:
+        # Si el consumidor cortó antes (p. ej. un límite), no leer el resto
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+@operacion
+def recorrer_arbol(ruta_base: str, visitante: VisitanteArbol, trabajadores: int = TRABAJADORES):
+    """Recorre el árbol con `visitante`: poda con `entrar` y entrega cada hoja leída a `visitar_hoja`."""
+    rutas = buscar_hojas(ruta_base, visitante.entrar)
+    for ruta_csv, filas in leer_hojas(rutas, trabajadores):
+        if visitante.visitar_hoja(ruta_csv, filas):
+            break
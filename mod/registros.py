@@ -0,0 +1,222 @@
+import os
+import sys
+from collections.abc import Mapping, MutableMapping
+from operator import attrgetter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from mod.almacenamiento import formatear_float
+from mod.catalogo import confirmar_cambios
+from mod.etl import ENCABEZADOS
+from mod.recorrido import buscar_hojas, leer_hojas
+
+# Columnas con pocos valores distintos: se internan (todas las filas comparten el mismo str)
+CAMPOS_INTERNADOS = ("type", "category", "hostilidad", "subtipo", "movilidad")
+
+# Columnas guardadas como float
+CAMPOS_FLOAT = ("width", "height")
+
+_CAMPOS = frozenset(ENCABEZADOS)
+
+# Lee todos los slots de un Mob de una vez (en el orden de ENCABEZADOS)
+_LEER_SLOTS = attrgetter(*ENCABEZADOS)
+
+# Columnas que se guardan tal cual (texto sin internar)
+_CAMPOS_TEXTO = tuple(c for c in ENCABEZADOS if c != "id" and c not in CAMPOS_FLOAT and c not in CAMPOS_INTERNADOS)
+
+
+def _a_int(texto: str) -> Optional[int]:
+    """El int de `texto` si vuelve exactamente al mismo texto; si no, None."""
+    try:
+        valor = int(texto)
+    except ValueError:
+        return None
+    return valor if str(valor) == texto else None
+
+
+def _a_float(texto: str) -> Optional[float]:
+    """El float de `texto` si vuelve exactamente al mismo texto; si no, None (se guarda el texto)."""
+    try:
+        valor = float(texto)
+    except ValueError:
+        return None
+    return valor if formatear_float(valor) == texto else None
+
+
+def _convertir(campo: str, valor, compartidos: Optional[Dict[str, float]] = None):
+    """Valor a guardar en el slot `campo` de un `Mob` (ver su docstring)."""
+    valor = "" if valor is None else str(valor)
+    if campo in CAMPOS_FLOAT:
+        numero = compartidos.get(valor) if compartidos is not None else None
+        if numero is None:
+            numero = _a_float(valor)
+            if numero is not None and compartidos is not None:
+                compartidos[valor] = numero
+        return valor if numero is None else numero
+    if campo == "id":
+        numero = _a_int(valor)
+        return valor if numero is None else numero
+    if campo in CAMPOS_INTERNADOS:
+        return sys.intern(valor)
+    return valor
+
+
+def es_compactable(fila: Mapping) -> bool:
+    """True si `fila` tiene exactamente las columnas de `ENCABEZADOS` (un `Mob` no pierde nada)."""
+    return fila.keys() == _CAMPOS
+
+
+class Mob(MutableMapping):
+    """Registro compacto de un mob: un slot por columna de `ENCABEZADOS`, sin dict por fila.
+
+    - `width`/`height` son float (parseados una sola vez) e `id` es int; si el
+      texto original no se puede reconstruir exacto desde el número, el slot
+      guarda el texto. Con `compartidos` (un dict texto -> número) los números
+      iguales son el mismo objeto.
+    - Las columnas de `CAMPOS_INTERNADOS` usan strings internados.
+    - `hoja` es el número de la hoja dentro de su colección (`ColeccionMobs` o
+      `mod.catalogo.CatalogoMobs`).
+    Devuelve los mismos textos que la fila original (`mob["width"]`,
+    `mob.get("name")`, `dict(mob)`), así que sirve donde se leían dicts. Las
+    columnas son fijas: asignar una (`mob["width"] = "2"`, `update`) la
+    convierte igual que al crearlo; asignar una desconocida o borrar lanza
+    KeyError. Las columnas fuera de `ENCABEZADOS` se descartan al crearlo.
+    """
+
+    __slots__ = tuple(ENCABEZADOS) + ("hoja",)
+
+    def __init__(self, fila: Mapping, hoja: int = 0, compartidos: Optional[Dict[str, float]] = None):
+        # Equivale a `_convertir` en cada columna, sin una llamada por columna (se crea una vez por fila)
+        obtener = fila.get
+        for campo in _CAMPOS_TEXTO:
+            valor = obtener(campo)
+            setattr(self, campo, valor if type(valor) is str else "" if valor is None else str(valor))
+        for campo in CAMPOS_INTERNADOS:
+            valor = obtener(campo)
+            setattr(self, campo, sys.intern(valor if type(valor) is str else "" if valor is None else str(valor)))
+        for campo in CAMPOS_FLOAT:
+            setattr(self, campo, _convertir(campo, obtener(campo), compartidos))
+        self.id = _convertir("id", obtener("id"))
+        self.hoja = hoja
+
+    def __getitem__(self, campo: str) -> str:
+        if campo not in _CAMPOS:
+            raise KeyError(campo)
+        valor = getattr(self, campo)
+        if type(valor) is str:
+            return valor
+        return formatear_float(valor) if type(valor) is float else str(valor)
+
+    def get(self, campo: str, defecto=None):
+        # Más directo que `Mapping.get` (que pasa por __getitem__ y una excepción)
+        if campo not in _CAMPOS:
+            return defecto
+        valor = getattr(self, campo)
+        if type(valor) is str:
+            return valor
+        return formatear_float(valor) if type(valor) is float else str(valor)
+
+    def __setitem__(self, campo: str, valor):
+        if campo not in _CAMPOS:
+            raise KeyError(campo)
+        setattr(self, campo, _convertir(campo, valor))
+
+    def __delitem__(self, campo: str):
+        raise KeyError(f"Las columnas de un Mob son fijas: {campo!r}")
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(ENCABEZADOS)
+
+    def __len__(self) -> int:
+        return len(ENCABEZADOS)
+
+    def __repr__(self):
+        return f"Mob({self.como_dict()!r})"
+
+    def como_dict(self) -> Dict[str, str]:
+        """Igual que `dict(mob)` pero sin pasar por `__getitem__` en cada columna."""
+        datos = dict(zip(ENCABEZADOS, _LEER_SLOTS(self)))
+        for campo in ("id",) + CAMPOS_FLOAT:
+            valor = datos[campo]
+            if isinstance(valor, float):
+                datos[campo] = formatear_float(valor)
+            elif isinstance(valor, int):
+                datos[campo] = str(valor)
+        return datos
+
+    def numero(self, campo: str) -> float:
+        """`id`/`width`/`height` como float (vacío -> 0, inválido -> NaN)."""
+        valor = getattr(self, campo)
+        if isinstance(valor, (int, float)):
+            return float(valor)
+        try:
+            return float(valor or 0)
+        except ValueError:
+            return float("nan")
+
+
+class ColeccionMobs:
+    """Mobs compactos y sus hojas: se recorre como la lista de (mob, ruta_csv) de `recolectar_mobs`.
+
+    Cada ruta de hoja se guarda una sola vez en `rutas`; los mobs la referencian
+    por número (`Mob.hoja`) en lugar de repetir el string en cada tupla. Las
+    tuplas se arman al iterar, así que funciones como `ordenar_mobs` o
+    `TablaColumnar.desde_registros` pueden recibir la colección directamente.
+    """
+
+    def __init__(self):
+        self.mobs: List[Mob] = []
+        self.rutas: List[str] = []
+        self._numeros: Dict[str, int] = {}
+        # Texto -> float ya convertido: los anchos/altos repetidos comparten objeto
+        self._compartidos: Dict[str, float] = {}
+
+    @classmethod
+    def desde_registros(cls, registros: Iterable[Tuple[Dict[str, str], str]]) -> "ColeccionMobs":
+        coleccion = cls()
+        for fila, ruta_csv in registros:
+            coleccion.agregar(fila, ruta_csv)
+        return coleccion
+
+    def numero_hoja(self, ruta_csv: str) -> int:
+        numero = self._numeros.get(ruta_csv)
+        if numero is None:
+            numero = self._numeros[ruta_csv] = len(self.rutas)
+            self.rutas.append(ruta_csv)
+        return numero
+
+    def agregar(self, fila: Dict[str, str], ruta_csv: str) -> Mob:
+        mob = Mob(fila, self.numero_hoja(ruta_csv), self._compartidos)
+        self.mobs.append(mob)
+        return mob
+
+    def ruta_de(self, mob: Mob) -> str:
+        return self.rutas[mob.hoja]
+
+    def __len__(self) -> int:
+        return len(self.mobs)
+
+    def __iter__(self) -> Iterator[Tuple[Mob, str]]:
+        rutas = self.rutas
+        return ((mob, rutas[mob.hoja]) for mob in self.mobs)
+
+    def __getitem__(self, posicion):
+        if isinstance(posicion, slice):
+            return [(mob, self.rutas[mob.hoja]) for mob in self.mobs[posicion]]
+        mob = self.mobs[posicion]
+        return mob, self.rutas[mob.hoja]
+
+
+def cargar_mobs(ruta_base: str) -> ColeccionMobs:
+    """Lee del disco todos los mobs bajo `ruta_base` como `ColeccionMobs`.
+
+    No pasa por el catálogo: `leer_hojas` adelanta solo unas pocas hojas y los
+    dicts de cada una se descartan apenas se convierten, así que en memoria
+    quedan los registros compactos y no las filas de todo el árbol.
+    """
+    # Publicar (y liberar) las hojas que el catálogo tenga bloqueadas antes de leerlas
+    confirmar_cambios(ruta_base)
+    coleccion = ColeccionMobs()
+    for ruta_csv, filas in leer_hojas(buscar_hojas(ruta_base)):
+        numero = coleccion.numero_hoja(os.path.normpath(ruta_csv))
+        coleccion.mobs.extend(Mob(fila, numero, coleccion._compartidos) for fila in filas)
+    return coleccion
@@ -0,0 +1,292 @@
+"""Servicio HTTP/JSON local sobre el catálogo de mobs (solo biblioteca estándar).
+
+El árbol se carga una sola vez en memoria y cada consulta se resuelve contra
+el catálogo, sin volver a recorrer el disco. Las escrituras (diario, fsync y
+publicación de hojas) corren en un hilo aparte para no frenar el event loop.
+
+Rutas:
+    GET    /mobs?q=<término>                  búsqueda (semántica de `buscar_mob`)
+    GET    /mobs/<id o name>                  un mob (coincidencia exacta)
+    GET    /estadisticas[?percentiles=1&agrupar_por=<columna>]
+                                              `estadisticas_mobs`
+    GET    /ordenados?key=name&reverse=0&limit=20[&cursor=...]
+                                              listado ordenado por páginas (`ordenar_pagina`);
+                                              limit entre 1 y LIMITE_MAXIMO (se recorta)
+    POST   /mobs                              agrega el mob del cuerpo (JSON, anexado a su hoja)
+    PATCH  /mobs/<id o name>                  actualiza con los campos del cuerpo
+    DELETE /mobs/<name>                       elimina
+    POST   /lote                              lista de operaciones (ver `mod.lote`)
+
+Uso:
+    python -m mod.servidor --puerto 8080
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from mod.catalogo import BASE_DIR, confirmar_cambios, obtener_catalogo
+from mod.crud import buscar_mob
+from mod.etl import ENCABEZADOS
+from mod.lote import agregar_uno, aplicar_lote
+from mod.utils import estadisticas_mobs, mob_con_ruta, ordenar_pagina
+
+# Tamaño máximo del cuerpo de una petición
+MAX_CUERPO = 16 * 1024 * 1024
+# Mobs por página de /ordenados: un limit mayor (o el de un cursor) se recorta a este
+LIMITE_MAXIMO = 1000
+
+
+class ErrorHTTP(Exception):
+    def __init__(self, estado: int, detalle: str):
+        super().__init__(detalle)
+        self.estado = estado
+        self.detalle = detalle
+
+
+def _estado_resultado(resultado: Dict[str, Any]) -> int:
+    """Código HTTP para el resultado de una operación de `aplicar_lote`."""
+    if resultado["estado"] == "ok":
+        return HTTPStatus.OK
+    if resultado["detalle"].startswith("No se encontró"):
+        return HTTPStatus.NOT_FOUND
+    if "ya existe" in resultado["detalle"]:
+        return HTTPStatus.CONFLICT
+    return HTTPStatus.BAD_REQUEST
+
+
+def _es_verdadero(valor: str) -> bool:
+    """Parámetro booleano de la consulta ("1", "true", "s", "si")."""
+    return valor.lower() in ("1", "true", "s", "si")
+
+
+class ServidorMobs:
+    """Servidor asyncio que atiende consultas y cambios sobre el catálogo de `ruta_base`.
+
+    Las consultas corren en el event loop (son lecturas en memoria). Las
+    mutaciones van a un único hilo escritor: mientras una corre, las consultas
+    esperan el bloqueo `_escritura` para no ver el catálogo a medio modificar.
+    Las conexiones son HTTP/1.1 persistentes (keep-alive).
+    """
+
+    def __init__(self, ruta_base: str = BASE_DIR):
+        self.ruta_base = ruta_base
+        self._escritor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mobs-escritor")
+        self._escritura: Optional[asyncio.Lock] = None
+        # Estadísticas por opciones de la consulta -> (versión del catálogo, resultado):
+        # se recalculan solo si hubo cambios
+        self._estadisticas: Dict[Tuple, Tuple[int, Any]] = {}
+        self.catalogo = None
+
+    # -------------------- Ciclo de vida --------------------
+    async def iniciar(self, host: str = "127.0.0.1", puerto: int = 8080) -> asyncio.AbstractServer:
+        """Carga el catálogo (una sola vez) y empieza a escuchar."""
+        self._escritura = asyncio.Lock()
+        loop = asyncio.get_running_loop()
+        self.catalogo = await loop.run_in_executor(self._escritor, obtener_catalogo, self.ruta_base)
+        intervalo = getattr(getattr(self.catalogo, "diario", None), "intervalo", 0)
+        if intervalo > 0:
+            # Con commit por grupos, confirmar lo pendiente aunque no lleguen más cambios
+            asyncio.ensure_future(self._confirmar_periodicamente(intervalo))
+        return await asyncio.start_server(self._atender, host, puerto)
+
+    async def _confirmar_periodicamente(self, intervalo: float):
+        while True:
+            await asyncio.sleep(intervalo)
+            await self._escribir(confirmar_cambios, self.ruta_base)
+
+    def cerrar(self):
+        self._escritor.submit(confirmar_cambios, self.ruta_base).result()
+        self._escritor.shutdown()
+
+    async def _escribir(self, funcion: Callable, *args):
+        """Ejecuta `funcion` en el hilo escritor, sin consultas concurrentes."""
+        async with self._escritura:
+            return await asyncio.get_running_loop().run_in_executor(self._escritor, funcion, *args)
+
+    async def _leer(self, funcion: Callable, *args):
+        async with self._escritura:
+            return funcion(*args)
+
+    # -------------------- Conexiones --------------------
+    async def _atender(self, lector: asyncio.StreamReader, escritor: asyncio.StreamWriter):
+        try:
+            while True:
+                linea = await lector.readline()
+                if not linea.strip():
+                    break
+                metodo, objetivo, version = linea.decode("latin-1").split()
+                encabezados = {}
+                while True:
+                    encabezado = await lector.readline()
+                    if encabezado in (b"\r\n", b"\n", b""):
+                        break
+                    nombre, _, valor = encabezado.decode("latin-1").partition(":")
+                    encabezados[nombre.strip().lower()] = valor.strip()
+                largo = int(encabezados.get("content-length") or 0)
+                if largo > MAX_CUERPO:
+                    estado, datos = HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "Cuerpo demasiado grande"}
+                    cuerpo = None
+                else:
+                    cuerpo = await lector.readexactly(largo) if largo else b""
+                    estado, datos = await self._responder(metodo, objetivo, cuerpo)
+
+                conexion = encabezados.get("connection", "").lower()
+                mantener = cuerpo is not None and (conexion == "keep-alive" if version == "HTTP/1.0" else conexion != "close")
+                contenido = json.dumps(datos, ensure_ascii=False).encode("utf-8")
+                escritor.write(
+                    f"HTTP/1.1 {estado.value} {estado.phrase}\r\n"
+                    f"Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(contenido)}\r\n"
+                    f"Connection: {'keep-alive' if mantener else 'close'}\r\n\r\n".encode("latin-1") + contenido)
+                await escritor.drain()
+                if not mantener:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass  # Cliente que cortó o petición mal formada: se cierra la conexión
+        finally:
+            escritor.close()
+
+    async def _responder(self, metodo: str, objetivo: str, cuerpo: bytes) -> Tuple[HTTPStatus, Any]:
+        partes = urlsplit(objetivo)
+        segmentos = [unquote(s) for s in partes.path.strip("/").split("/") if s]
+        consulta = {clave: valores[-1] for clave, valores in parse_qs(partes.query).items()}
+        try:
+            datos = json.loads(cuerpo) if cuerpo else None
+        except ValueError:
+            return HTTPStatus.BAD_REQUEST, {"error": "El cuerpo no es JSON válido"}
+        try:
+            estado, respuesta = await self._despachar(metodo.upper(), segmentos, consulta, datos)
+        except ErrorHTTP as e:
+            return HTTPStatus(e.estado), {"error": e.detalle}
+        except ValueError as e:
+            return HTTPStatus.BAD_REQUEST, {"error": str(e)}
+        except Exception:
+            # Un error inesperado no debe cortar la conexión sin respuesta
+            traceback.print_exc(file=sys.stderr)
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Error interno del servidor"}
+        return HTTPStatus(estado), respuesta
+
+    # -------------------- Rutas --------------------
+    async def _despachar(self, metodo: str, segmentos: List[str], consulta: Dict[str, str], datos: Any):
+        recurso = segmentos[0] if segmentos else ""
+        clave = "/".join(segmentos[1:]) or None
+        if recurso == "mobs":
+            if metodo == "GET":
+                return HTTPStatus.OK, await self._leer(self._buscar, clave, consulta.get("q", ""))
+            if metodo == "POST" and clave is None:
+                # Un alta suelta se anexa a su hoja (sin reescribirla), no pasa por el lote
+                return self._resultado(await self._escribir(agregar_uno, self._valores(datos), self.ruta_base),
+                                       HTTPStatus.CREATED)
+            if metodo == "PATCH" and clave is not None:
+                return await self._operacion({"op": "actualizar", "clave": clave, "valores": self._valores(datos)})
+            if metodo == "DELETE" and clave is not None:
+                return await self._operacion({"op": "eliminar", "clave": clave})
+        elif recurso == "estadisticas" and clave is None:
+            if metodo == "GET":
+                return HTTPStatus.OK, await self._leer(self._calcular_estadisticas, consulta)
+        elif recurso == "ordenados" and clave is None:
+            if metodo == "GET":
+                return HTTPStatus.OK, await self._leer(self._ordenados, consulta)
+        elif recurso == "lote" and clave is None:
+            if metodo == "POST":
+                if not isinstance(datos, list):
+                    raise ErrorHTTP(HTTPStatus.BAD_REQUEST, "Se esperaba una lista de operaciones")
+                return HTTPStatus.OK, await self._escribir(aplicar_lote, datos, self.ruta_base)
+        else:
+            raise ErrorHTTP(HTTPStatus.NOT_FOUND, f"Ruta desconocida: /{'/'.join(segmentos)}")
+        raise ErrorHTTP(HTTPStatus.METHOD_NOT_ALLOWED, f"Método {metodo} no permitido")
+
+    @staticmethod
+    def _valores(datos: Any) -> Dict[str, str]:
+        if not isinstance(datos, dict):
+            raise ErrorHTTP(HTTPStatus.BAD_REQUEST, "Se esperaba un objeto JSON con los campos del mob")
+        sobrantes = set(datos) - set(ENCABEZADOS)
+        if sobrantes:
+            raise ErrorHTTP(HTTPStatus.BAD_REQUEST, f"Campos desconocidos: {sorted(sobrantes)}")
+        return {campo: str(valor) for campo, valor in datos.items()}
+
+    async def _operacion(self, operacion: Dict[str, Any], estado_ok: int = HTTPStatus.OK):
+        return self._resultado((await self._escribir(aplicar_lote, [operacion], self.ruta_base))[0], estado_ok)
+
+    @staticmethod
+    def _resultado(resultado: Dict[str, Any], estado_ok: int = HTTPStatus.OK):
+        estado = _estado_resultado(resultado)
+        if estado != HTTPStatus.OK:
+            raise ErrorHTTP(estado, resultado["detalle"])
+        return estado_ok, resultado
+
+    def _buscar(self, clave: Optional[str], termino: str):
+        if clave is not None:
+            encontrado = self.catalogo.ubicar(clave)
+            if encontrado is None:
+                raise ErrorHTTP(HTTPStatus.NOT_FOUND, f"No se encontró el mob '{clave}'")
+            return mob_con_ruta(*encontrado, self.ruta_base)
+        if not termino:
+            raise ErrorHTTP(HTTPStatus.BAD_REQUEST, "Falta el parámetro 'q'")
+        return [mob_con_ruta(fila, ruta, self.ruta_base) for fila, ruta in buscar_mob(termino, self.ruta_base)]
+
+    def _calcular_estadisticas(self, consulta: Dict[str, str]):
+        opciones = (_es_verdadero(consulta.get("percentiles", "0")), consulta.get("agrupar_por") or None)
+        version, stats = self._estadisticas.get(opciones, (None, None))
+        if version != self.catalogo.version:
+            stats = estadisticas_mobs(self.ruta_base, percentiles=opciones[0], agrupar_por=opciones[1])
+            self._estadisticas[opciones] = (self.catalogo.version, stats)
+        return stats
+
+    @staticmethod
+    def _limite(consulta: Dict[str, str]) -> int:
+        """`limit` de la consulta (20 si falta): 400 si no es un entero >= 1, recortado a `LIMITE_MAXIMO`."""
+        texto = consulta.get("limit", "20")
+        try:
+            limite = int(texto)
+        except ValueError:
+            limite = 0
+        if limite < 1:
+            raise ErrorHTTP(HTTPStatus.BAD_REQUEST, f"limit debe ser un entero mayor o igual a 1: {texto!r}")
+        return min(limite, LIMITE_MAXIMO)
+
+    def _ordenados(self, consulta: Dict[str, str]):
+        cursor = consulta.get("cursor")
+        if cursor:
+            pagina, siguiente = ordenar_pagina(self.ruta_base, cursor=cursor, limite_maximo=LIMITE_MAXIMO)
+        else:
+            reverse = _es_verdadero(consulta.get("reverse", "0"))
+            pagina, siguiente = ordenar_pagina(self.ruta_base, key=consulta.get("key", "name"), reverse=reverse,
+                                               limit=self._limite(consulta), limite_maximo=LIMITE_MAXIMO)
+        return {"mobs": [mob_con_ruta(fila, ruta, self.ruta_base) for fila, ruta in pagina], "cursor": siguiente}
+
+
+async def servir(ruta_base: str = BASE_DIR, host: str = "127.0.0.1", puerto: int = 8080):
+    """Levanta el servidor y atiende hasta que se interrumpa."""
+    servidor = ServidorMobs(ruta_base)
+    red = await servidor.iniciar(host, puerto)
+    direcciones = ", ".join(str(s.getsockname()) for s in red.sockets)
+    print(f"Sirviendo {os.path.abspath(ruta_base)} en {direcciones}")
+    try:
+        async with red:
+            await red.serve_forever()
+    finally:
+        servidor.cerrar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servicio HTTP/JSON sobre el catálogo de mobs.")
+    parser.add_argument("--ruta-base", default=BASE_DIR)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8080)
+    args = parser.parse_args()
+    try:
+        asyncio.run(servir(args.ruta_base, args.host, args.puerto))
+    except KeyboardInterrupt:
+        print("Servidor detenido.")
+
+
+if __name__ == "__main__":
+    main()
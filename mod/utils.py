@@ -1,39 +1,50 @@
-import csv
+import base64
+import heapq
+import json
 import os
-from typing import List, Tuple, Dict, Any
+from typing import List, Tuple, Dict, Any, Optional
 
+from mod.almacenamiento import obtener_almacenamiento
+from mod.estadisticas import estadisticas_columnares
+from mod.perfil import operacion
 
+
+@operacion
 def leer_csv(path: str) -> List[Dict[str, str]]:
-    """Lee un CSV y devuelve una lista de diccionarios. Devuelve [] si no existe."""
-    if not os.path.exists(path):
-        return []
-    with open(path, "r", encoding="utf-8", newline="") as f:
-        return list(csv.DictReader(f))
+    """Lee una hoja y devuelve una lista de diccionarios. Devuelve [] si no existe.
+
+    El formato en disco depende del almacenamiento en uso (ver `mod.almacenamiento`).
+    """
+    return obtener_almacenamiento().leer(path)
 
 
-def escribir_csv(path: str, filas: List[Dict[str, str]]):
-    """Escribe una lista de diccionarios en `path`.
+@operacion
+def escribir_csv(path: str, filas: List[Dict[str, str]], campos: Optional[List[str]] = None):
+    """Escribe una lista de diccionarios en la hoja `path`.
 
     - Si `filas` es None: no hace nada.
-    - Si `filas` está vacío: borra el archivo si existe.
-    - Si tiene filas: crea directorio y escribe CSV con encabezado.
+    - Si no: crea directorio y escribe la hoja con encabezado (`campos` o las
+      claves de la primera fila) en un temporal que reemplaza al archivo con
+      `os.replace`, así una caída nunca deja la hoja a medias.
+    Una lista vacía deja la hoja sin filas; para borrarla, ver `mod.diario`.
     """
-    dirpath = os.path.dirname(path)
     if filas is None:
         return
-    if not filas:
-        try:
-            if os.path.exists(path):
-                os.remove(path)
-        except OSError:
-            pass
-        return
-    os.makedirs(dirpath, exist_ok=True)
-    campos = list(filas[0].keys())
-    with open(path, "w", encoding="utf-8", newline="") as f:
-        escritor = csv.DictWriter(f, fieldnames=campos)
-        escritor.writeheader()
-        escritor.writerows(filas)
+    obtener_almacenamiento().escribir(path, filas, campos)
+
+
+@operacion
+def anexar_csv(path: str, fila: Dict[str, str], campos: Optional[List[str]] = None):
+    """Agrega una sola fila al final de la hoja `path`.
+
+    - Si el archivo no existe (o está vacío): lo crea con encabezado `campos`
+      (o las claves de `fila`) y escribe la fila.
+    - Si existe: verifica que su encabezado tenga los mismos campos que `campos`
+      y que incluya todas las claves de `fila`; si no, lanza ValueError.
+    - Hace fsync antes de retornar para que la fila quede en disco.
+    En CSV no se reescribe el archivo; en binario se reescribe la hoja.
+    """
+    obtener_almacenamiento().anexar(path, fila, campos)
 
 
 def formatear_mob(mob: Dict[str, Any]) -> str:
@@ -52,95 +63,217 @@ def formatear_mob(mob: Dict[str, Any]) -> str:
             f"Dimensiones: {width:.2f}x{height:.2f}")
 
 
+def mob_con_ruta(mob: Dict[str, str], ruta_csv: str, ruta_base: str) -> Dict[str, str]:
+    """Copia de `mob` con `ruta`: la carpeta de su hoja relativa a `ruta_base` (separada con "/")."""
+    carpeta = os.path.relpath(os.path.dirname(ruta_csv), ruta_base).replace(os.sep, "/")
+    return dict(mob, ruta=carpeta)
+
+
+@operacion
 def recolectar_mobs(ruta_base: str) -> List[Tuple[Dict[str, str], str]]:
-    """Recorre `ruta_base` recursivamente y recolecta todos los mobs.
+    """Devuelve todos los mobs bajo `ruta_base` desde el catálogo en memoria.
 
-    Retorna una lista de tuplas (mob_dict, ruta_del_csv).
+    El árbol se recorre del disco solo la primera vez (ver `mod.catalogo`).
+    Retorna una lista de tuplas (mob, ruta_del_csv); con el árbol cada mob es
+    un `mod.registros.Mob`, que se lee como un dict de solo textos.
     """
-    resultados: List[Tuple[Dict[str, str], str]] = []
+    from mod.catalogo import obtener_catalogo  # import local: catalogo depende de utils
+    return obtener_catalogo(ruta_base).registros()
 
-    def _rec(dirpath: str):
-        try:
-            for elemento in os.listdir(dirpath):
-                path = os.path.join(dirpath, elemento)
-                if os.path.isdir(path):
-                    _rec(path)
-                elif elemento == "mobs.csv":
-                    filas = leer_csv(path)
-                    for fila in filas:
-                        resultados.append((fila, path))
-        except FileNotFoundError:
-            return
 
-    _rec(ruta_base)
-    return resultados
+@operacion
+def estadisticas_mobs(ruta_base: str, percentiles: bool = False, agrupar_por: Optional[str] = None) -> Dict[str, Any]:
+    """Genera estadísticas sobre todos los mobs bajo `ruta_base`.
 
+    Retorna un dict con: total, por_category, por_type, avg_width/height, min/max;
+    en `width`/`height`, count, mean, std, min y max, y en `grupos` lo mismo por
+    cada categoría y tipo (columna -> valor -> {"total", "columnas"}). Sale de
+    los agregados que el catálogo mantiene con cada cambio
+    (`mod.indices.AgregadosMobs`): si el archivo está al día no se carga el
+    catálogo ni se recorren las hojas (ver `agregados_vigentes`).
 
-def estadisticas_mobs(ruta_base: str) -> Dict[str, Any]:
-    """Genera estadísticas básicas sobre todos los mobs bajo `ruta_base`.
+    Con `percentiles`, `width`/`height` traen además median, p90, p99 e
+    histograma (`mod.estadisticas.resumen_columna`). `agrupar_por` agrega a
+    `grupos` esa columna (cualquiera, también hostilidad/subtipo/movilidad;
+    ValueError si no existe). Ambos salen de `estadisticas_columnares`, que
+    recorre todas las filas, salvo agrupar por category o type sin percentiles.
+    """
+    from mod.indices import agregados_vigentes  # import local: indices depende de catalogo
+    stats = agregados_vigentes(ruta_base).estadisticas()
+    if agrupar_por in stats["grupos"] and not percentiles:
+        return stats
+    if percentiles or agrupar_por is not None:
+        columnares = estadisticas_columnares(ruta_base, agrupar_por)
+        if percentiles:
+            stats.update(columnares["columnas"])
+        if agrupar_por is not None:
+            stats["grupos"][agrupar_por] = columnares["grupos"]
+    return stats
+
+
+# Campos que se ordenan como números (el resto, como texto sin mayúsculas)
+CAMPOS_NUMERICOS = {"id": int, "width": float, "height": float}
+
+
+class _Invertido:
+    """Envuelve un valor invirtiendo su orden (para claves descendentes de texto)."""
+    __slots__ = ("valor",)
+
+    def __init__(self, valor):
+        self.valor = valor
 
-    Retorna un dict con: total, por_category, por_type, avg_width/height, min/max.
+    def __lt__(self, otro):
+        return otro.valor < self.valor
+
+    def __eq__(self, otro):
+        return self.valor == otro.valor
+
+
+def parsear_claves(key) -> List[Tuple[str, bool]]:
+    """Normaliza la especificación de orden a una lista de (campo, descendente).
+
+    Acepta "name", "category,-width" (el "-" indica descendente) o una lista de
+    campos / tuplas (campo, descendente).
     """
-    datos = recolectar_mobs(ruta_base)
-    total = len(datos)
-    por_category: Dict[str, int] = {}
-    por_type: Dict[str, int] = {}
-
-    widths = []
-    heights = []
-
-    for mob, _ in datos:
-        cat = mob.get("category", "Desconocida")
-        typ = mob.get("type", "Desconocida")
-        por_category[cat] = por_category.get(cat, 0) + 1
-        por_type[typ] = por_type.get(typ, 0) + 1
-        try:
-            widths.append(float(mob.get("width", "0") or 0))
-        except (ValueError, TypeError):
-            pass
+    if isinstance(key, str):
+        key = [parte.strip() for parte in key.split(",") if parte.strip()]
+    claves = []
+    for parte in key or ["name"]:
+        if isinstance(parte, (tuple, list)):
+            claves.append((str(parte[0]), bool(parte[1])))
+        elif parte.startswith("-"):
+            claves.append((parte[1:], True))
+        else:
+            claves.append((parte, False))
+    return claves
+
+
+def _valor_orden(mob: Dict[str, str], campo: str):
+    conversor = CAMPOS_NUMERICOS.get(campo)
+    if type(mob) is not dict and hasattr(mob, "numero"):
+        # `mod.registros.Mob`: los números ya están convertidos y name es siempre un slot
+        if conversor is not None:
+            valor = mob.numero(campo)
+            return 0 if valor != valor else valor
+        if campo in ("name", "displayName"):
+            return mob.name.lower()
+        return str(mob.get(campo, "")).lower()
+    if conversor is not None:
         try:
-            heights.append(float(mob.get("height", "0") or 0))
+            return conversor(mob.get(campo, 0) or 0)
         except (ValueError, TypeError):
-            pass
-
-    def _avg(arr):
-        return sum(arr) / len(arr) if arr else 0.0
-
-    stats = {
-        "total": total,
-        "por_category": por_category,
-        "por_type": por_type,
-        "avg_width": _avg(widths),
-        "avg_height": _avg(heights),
-        "min_width": min(widths) if widths else 0.0,
-        "max_width": max(widths) if widths else 0.0,
-        "min_height": min(heights) if heights else 0.0,
-        "max_height": max(heights) if heights else 0.0,
-    }
-    return stats
+            return conversor(0)
+    if campo in ("name", "displayName"):
+        return str(mob.get("name", mob.get("displayName", ""))).lower()
+    return str(mob.get(campo, "")).lower()
 
 
-def ordenar_mobs(ruta_base: str, key: str = "name", reverse: bool = False) -> List[Tuple[Dict[str, str], str]]:
-    """Recolecta y ordena mobs por `key` ('name','id','category','type').
+def _funcion_clave(claves: List[Tuple[str, bool]], reverse: bool = False):
+    """Arma la key function para sorted/heapq a partir de las claves parseadas."""
+    def key_fn(item: Tuple[Dict[str, str], str]):
+        mob, _ = item
+        partes = []
+        for campo, descendente in claves:
+            valor = _valor_orden(mob, campo)
+            if descendente != reverse:
+                valor = -valor if isinstance(valor, (int, float)) else _Invertido(valor)
+            partes.append(valor)
+        return tuple(partes)
+    return key_fn
 
+
+@operacion
+def ordenar_mobs(ruta_base: str, key="name", reverse: bool = False,
+                 limit: Optional[int] = None, offset: int = 0) -> List[Tuple[Dict[str, str], str]]:
+    """Recolecta y ordena mobs por `key` ('name','id','category','type','width',...).
+
+    `key` admite varias claves: "category,-width" ordena por categoría y luego
+    por ancho descendente. Con `limit` solo se seleccionan los `offset + limit`
+    primeros con un heap (O(n log k)) en lugar de ordenar todo.
     Retorna la lista ordenada de (mob, path).
     """
     datos = recolectar_mobs(ruta_base)
+    claves = parsear_claves(key)
+    if len(claves) == 1:
+        # Caso común de una sola clave: sin tuplas, invirtiendo con reverse
+        campo, descendente = claves[0]
+        key_fn = lambda item: _valor_orden(item[0], campo)  # noqa: E731
+        invertir = descendente != reverse
+    else:
+        key_fn = _funcion_clave(claves, reverse)
+        invertir = False
+    if limit is None:
+        return sorted(datos, key=key_fn, reverse=invertir)[offset:]
+    # heapq.nsmallest/nlargest son estables: equivalen a sorted(...)[:k]
+    seleccion = heapq.nlargest if invertir else heapq.nsmallest
+    return seleccion(offset + limit, datos, key=key_fn)[offset:]
 
-    def key_fn(item: Tuple[Dict[str, str], str]):
-        mob, _ = item
-        if key == "id":
-            try:
-                return int(mob.get("id", 0))
-            except (ValueError, TypeError):
-                return 0
-        elif key in ("name", "displayName"):
-            return str(mob.get("name", mob.get("displayName", ""))).lower()
-        elif key == "category":
-            return str(mob.get("category", "")).lower()
-        elif key == "type":
-            return str(mob.get("type", "")).lower()
-        else:
-            return str(mob.get(key, "")).lower()
 
-    return sorted(datos, key=key_fn, reverse=reverse)
+# Órdenes completos ya calculados para paginar: clave -> (catalogo, version, lista)
+_ORDENES: Dict[Tuple, Tuple[Any, int, List[Tuple[Dict[str, str], str]]]] = {}
+
+
+def _codificar_cursor(datos: Dict[str, Any]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(datos).encode("utf-8")).decode("ascii")
+
+
+def _es_entero(valor, minimo: int) -> bool:
+    return isinstance(valor, int) and not isinstance(valor, bool) and valor >= minimo
+
+
+def _decodificar_cursor(cursor: str) -> Dict[str, Any]:
+    """Estado guardado en `cursor` (ver `ordenar_pagina`); ValueError si no tiene la forma esperada."""
+    try:
+        estado = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Cursor inválido: {cursor!r}") from e
+    # Debe ser exactamente lo que arma `_codificar_cursor`
+    if (not isinstance(estado, dict) or not isinstance(estado.get("reverse"), bool)
+            or not _es_entero(estado.get("limit"), 1) or not _es_entero(estado.get("offset"), 0)
+            or not isinstance(estado.get("key"), list)
+            or not all(isinstance(parte, list) and len(parte) == 2 and isinstance(parte[0], str)
+                       and isinstance(parte[1], bool) for parte in estado["key"])):
+        raise ValueError(f"Cursor inválido: {cursor!r}")
+    return estado
+
+
+@operacion
+def ordenar_pagina(ruta_base: str, key="name", reverse: bool = False, limit: int = 20,
+                   cursor: Optional[str] = None,
+                   limite_maximo: Optional[int] = None) -> Tuple[List[Tuple[Dict[str, str], str]], Optional[str]]:
+    """Devuelve una página de mobs ordenados y el cursor para pedir la siguiente.
+
+    La primera página se resuelve con selección por heap. Al pedir las
+    siguientes (pasando `cursor`, que ya incluye clave y sentido) se ordena todo
+    una sola vez y se reutiliza mientras el catálogo no cambie.
+    El cursor es None cuando no quedan más mobs. `limit` debe ser un entero
+    mayor o igual a 1 (si no, ValueError): el cursor no admite otro. Con
+    `limite_maximo`, el de `limit` o el del cursor se recorta a ese valor.
+    """
+    from mod.catalogo import obtener_catalogo  # import local: catalogo depende de utils
+    if not _es_entero(limit, 1):
+        raise ValueError(f"limit debe ser un entero mayor o igual a 1: {limit!r}")
+    offset = 0
+    if cursor:
+        estado = _decodificar_cursor(cursor)
+        key, reverse, limit, offset = estado["key"], estado["reverse"], estado["limit"], estado["offset"]
+    if limite_maximo is not None:
+        limit = min(limit, limite_maximo)
+
+    claves = parsear_claves(key)
+    catalogo = obtener_catalogo(ruta_base)
+    if offset == 0:
+        pagina = ordenar_mobs(ruta_base, claves, reverse, limit=limit + 1)
+    else:
+        clave_cache = (os.path.abspath(ruta_base), tuple(claves), reverse)
+        guardado = _ORDENES.get(clave_cache)
+        if guardado is None or guardado[0] is not catalogo or guardado[1] != catalogo.version:
+            guardado = (catalogo, catalogo.version, ordenar_mobs(ruta_base, claves, reverse))
+            _ORDENES[clave_cache] = guardado
+        pagina = guardado[2][offset:offset + limit + 1]
+
+    siguiente = None
+    if len(pagina) > limit:
+        pagina = pagina[:limit]
+        siguiente = _codificar_cursor({"key": claves, "reverse": reverse, "limit": limit, "offset": offset + limit})
+    return pagina, siguiente
@@ -0,0 +1,26 @@
+import contextlib
+import io
+import os
+import shutil
+
+import pytest
+
+from mod.catalogo import invalidar_catalogo
+from mod.etl import generar_jerarquia
+
+# mobs.csv real del repositorio, fuente de los árboles de prueba
+MOBS_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "mobs.csv")
+
+
+@pytest.fixture
+def arbol(tmp_path, monkeypatch):
+    """Árbol generado desde el mobs.csv real en una carpeta temporal; devuelve su ruta base."""
+    monkeypatch.chdir(tmp_path)
+    shutil.copy(MOBS_CSV, tmp_path / "mobs.csv")
+    ruta_base = str(tmp_path / "minecraft")
+    with contextlib.redirect_stdout(io.StringIO()):
+        generar_jerarquia("mobs.csv", forzar=True, ruta_base=ruta_base)
+    # Cada prueba carga su propio catálogo
+    invalidar_catalogo(ruta_base)
+    yield ruta_base
+    invalidar_catalogo(ruta_base)
@@ -0,0 +1,76 @@
+import os
+
+import pytest
+
+from mod.almacenamiento import crear_almacenamiento
+
+CAMPOS = ["id", "name", "width", "height", "metadataKeys"]
+FILAS = [
+    {"id": "7", "name": "axolotl", "width": "0.75", "height": "0.42", "metadataKeys": "['baby', 'variant']"},
+    {"id": "-3", "name": "ñandú, \"raro\"", "width": "1e-05", "height": "2", "metadataKeys": ""},
+    {"id": "145", "name": "zombie", "width": "0.6", "height": "1.95", "metadataKeys": "['baby']"},
+]
+
+
+@pytest.fixture(params=["csv", "binario"])
+def almacenamiento(request):
+    return crear_almacenamiento(request.param)
+
+
+def test_escribir_y_leer_devuelve_las_mismas_filas(almacenamiento, tmp_path):
+    ruta = str(tmp_path / "mobs.csv")
+    almacenamiento.escribir(ruta, FILAS, CAMPOS)
+    assert os.path.exists(almacenamiento.ruta_fisica(ruta))
+    assert almacenamiento.leer(ruta) == FILAS
+
+
+def test_serializar_es_estable(almacenamiento):
+    contenido = almacenamiento.serializar(FILAS, CAMPOS)
+    assert almacenamiento.serializar(almacenamiento.deserializar(contenido), CAMPOS) == contenido
+
+
+def test_anexar_filas_conserva_las_existentes(almacenamiento, tmp_path):
+    ruta = str(tmp_path / "mobs.csv")
+    almacenamiento.escribir(ruta, FILAS[:1], CAMPOS)
+    almacenamiento.anexar_filas(ruta, FILAS[1:], CAMPOS)
+    assert almacenamiento.leer(ruta) == FILAS
+
+
+def test_anexar_con_otro_esquema_falla(almacenamiento, tmp_path):
+    ruta = str(tmp_path / "mobs.csv")
+    almacenamiento.escribir(ruta, FILAS, CAMPOS)
+    with pytest.raises(ValueError):
+        almacenamiento.anexar_filas(ruta, [{"id": "8", "otro": "x"}], ["id", "otro"])
+
+
+def test_hoja_inexistente_o_vacia(almacenamiento, tmp_path):
+    ruta = str(tmp_path / "mobs.csv")
+    assert almacenamiento.leer(ruta) == []
+    almacenamiento.escribir(ruta, [])
+    assert almacenamiento.leer(ruta) == []
+
+
+def test_csv_a_binario_conserva_los_bytes():
+    csv, binario = crear_almacenamiento("csv"), crear_almacenamiento("binario")
+    contenido = csv.serializar(FILAS, CAMPOS)
+    filas = binario.deserializar(binario.serializar(csv.deserializar(contenido), CAMPOS))
+    assert csv.serializar(filas, CAMPOS) == contenido
+
+
+def test_binario_lee_una_sola_fila(tmp_path):
+    binario = crear_almacenamiento("binario")
+    ruta = str(tmp_path / "mobs.csv")
+    binario.escribir(ruta, FILAS, CAMPOS)
+    assert binario.leer_fila(ruta, 1) == FILAS[1]
+    with pytest.raises(IndexError):
+        binario.leer_fila(ruta, len(FILAS))
+
+
+def test_binario_rechaza_otro_formato():
+    with pytest.raises(ValueError):
+        crear_almacenamiento("binario").deserializar(b"id,name\n1,zombie\n")
+
+
+def test_almacenamiento_desconocido():
+    with pytest.raises(ValueError, match="Almacenamiento desconocido"):
+        crear_almacenamiento("parquet")
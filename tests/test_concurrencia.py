@@ -0,0 +1,59 @@
+import multiprocessing
+import os
+
+import pytest
+
+from mod.catalogo import confirmar_cambios, obtener_catalogo
+from mod.indices import verificar_agregados
+from mod.lote import agregar_uno
+from mod.utils import leer_csv
+
+PROCESOS = 4
+INCREMENTOS = 25
+ALTAS = 10
+# Mob cuyo ancho incrementan todos los procesos
+OBJETIVO = "zombie"
+
+
+def _trabajador(numero, ruta_base):
+    catalogo = obtener_catalogo(ruta_base)
+    for i in range(INCREMENTOS):
+        # Leer-modificar-escribir con la hoja bloqueada (y releída si otro la cambió)
+        fila, ruta_csv = catalogo.ubicar_bloqueado(OBJETIVO)
+        catalogo.modificar_en_memoria(fila, {"width": str(round(float(fila["width"]) + 1, 2))})
+        catalogo.persistir_hoja(ruta_csv)
+        catalogo.confirmar()
+        if i < ALTAS:
+            # Con los niveles explícitos, todas las altas van a la hoja del objetivo
+            resultado = agregar_uno({"id": str(10000 + 100 * numero + i), "name": f"concurrente_{numero}_{i}",
+                                     "type": "hostile", "category": "Hostile mobs", "subtipo": "no_muerto"},
+                                    ruta_base)
+            assert resultado["estado"] == "ok", resultado["detalle"]
+    confirmar_cambios(ruta_base)
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="los trabajadores se crean con fork")
+def test_ningun_incremento_ni_alta_perdidos(arbol):
+    ruta_csv = os.path.join(arbol, "hostiles", "no_muerto", "caminador", "mobs.csv")
+    filas_iniciales = leer_csv(ruta_csv)
+    ancho_inicial = next(float(f["width"]) for f in filas_iniciales if f["name"] == OBJETIVO)
+
+    contexto = multiprocessing.get_context("fork")
+    procesos = [contexto.Process(target=_trabajador, args=(n, arbol)) for n in range(PROCESOS)]
+    for proceso in procesos:
+        proceso.start()
+    for proceso in procesos:
+        proceso.join(60)
+    assert [p.exitcode for p in procesos] == [0] * PROCESOS
+
+    # Desde disco, sin el catálogo de ningún trabajador
+    filas = leer_csv(ruta_csv)
+    ancho = next(float(f["width"]) for f in filas if f["name"] == OBJETIVO)
+    assert ancho == pytest.approx(ancho_inicial + PROCESOS * INCREMENTOS)
+    assert len(filas) == len(filas_iniciales) + PROCESOS * ALTAS
+    assert len({f["id"] for f in filas}) == len(filas)
+
+    # Agregados e índices que dejaron los trabajadores coinciden con las hojas
+    verificacion = verificar_agregados(arbol)
+    assert verificacion["ok"], verificacion["diferencias"]
+    assert verificacion["total"] == len(obtener_catalogo(arbol).registros())
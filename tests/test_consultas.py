@@ -0,0 +1,60 @@
+import pytest
+
+from mod.consultas import Consulta, compilar, consultar
+
+FILAS = [
+    {"id": "1", "name": "zombie", "width": "0.6", "type": "hostile", "hostilidad": "hostil"},
+    {"id": "2", "name": "bat", "width": "0.5", "type": "ambient", "hostilidad": "pasivo"},
+    {"id": "10", "name": "giant zombie", "width": "3.6", "type": "hostile", "hostilidad": "hostil"},
+]
+
+
+def _nombres(consulta, filas=FILAS):
+    return [fila["name"] for fila in Consulta(consulta).filtrar(filas)]
+
+
+def test_compara_numeros_como_numeros():
+    # Como texto "10" < "2"
+    assert _nombres("id > 2") == ["giant zombie"]
+    assert _nombres("width >= 0.6") == ["zombie", "giant zombie"]
+
+
+def test_operadores_logicos_y_parentesis():
+    assert _nombres("type = hostile AND NOT width > 1") == ["zombie"]
+    assert _nombres("(name = bat OR width > 3) AND id != 2") == ["giant zombie"]
+
+
+def test_texto_sin_distinguir_mayusculas_y_comillas():
+    assert _nombres("name ~ ZOMB") == ["zombie", "giant zombie"]
+    assert _nombres('name = "giant zombie"') == ["giant zombie"]
+    assert _nombres("name !~ zomb") == ["bat"]
+
+
+def test_poda_por_niveles():
+    consulta = Consulta("hostilidad = hostil AND width > 1")
+    assert consulta.podar({"hostilidad": "pasivo"}) is False
+    assert consulta.podar({"hostilidad": "hostil"}) is None
+    assert Consulta("hostilidad = hostil").podar({"hostilidad": "hostil"}) is True
+
+
+def test_compilar_reutiliza_la_consulta():
+    consulta = Consulta("id = 1")
+    assert compilar(consulta) is consulta
+    assert compilar("id = 1").coincide(FILAS[0])
+
+
+@pytest.mark.parametrize("texto", ["", "   ", "width >", "(id = 1", "id = 1 )", "id = 1 AND"])
+def test_consulta_mal_formada(texto):
+    with pytest.raises(ValueError):
+        Consulta(texto)
+
+
+def test_campo_desconocido_falla_al_compilar():
+    with pytest.raises(ValueError, match="campo desconocido 'widht'"):
+        Consulta("widht > 1")
+
+
+def test_consultar_sobre_el_arbol(arbol):
+    nombres = {fila["name"] for fila, _ in consultar(arbol, "movilidad = volador AND hostilidad = hostiles")}
+    assert nombres == {"blaze", "ghast", "phantom", "vex"}
+    assert "zombie" not in nombres
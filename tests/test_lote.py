@@ -0,0 +1,93 @@
+import io
+
+import pytest
+
+from mod.catalogo import invalidar_catalogo, obtener_catalogo
+from mod.lote import agregar_uno, aplicar_lote, leer_operaciones_de
+
+ALTA = {"id": "9001", "name": "prueba", "type": "hostile", "category": "Hostile mobs",
+        "width": "1.5", "height": "2"}
+
+
+def test_leer_operaciones_jsonl():
+    texto = io.StringIO(
+        '{"op": "update", "clave": "zombie", "valores": {"width": "0.7"}}\n'
+        "\n"
+        '{"op": "agregar", "id": "9001", "name": "prueba"}\n'
+    )
+    assert leer_operaciones_de(texto, "jsonl") == [
+        {"op": "update", "clave": "zombie", "valores": {"width": "0.7"}},
+        {"op": "agregar", "clave": None, "valores": {"id": "9001", "name": "prueba"}},
+    ]
+
+
+def test_leer_operaciones_csv_ignora_celdas_vacias():
+    texto = io.StringIO("op,clave,id,name,width\ndelete,bat,,,\nupdate,145,,,0.7\n")
+    assert leer_operaciones_de(texto, "csv") == [
+        {"op": "delete", "clave": "bat", "valores": {}},
+        {"op": "update", "clave": "145", "valores": {"width": "0.7"}},
+    ]
+
+
+def test_leer_operaciones_jsonl_invalido():
+    with pytest.raises(ValueError):
+        leer_operaciones_de(io.StringIO("{no es json\n"), "jsonl")
+
+
+def test_lote_aplica_y_persiste(arbol):
+    resultados = aplicar_lote([
+        {"op": "agregar", "valores": ALTA},
+        {"op": "update", "clave": "zombie", "valores": {"width": "0.7"}},
+        {"op": "delete", "clave": "bat"},
+    ], arbol)
+    assert [r["estado"] for r in resultados] == ["ok", "ok", "ok"]
+
+    # Releído desde disco
+    invalidar_catalogo(arbol)
+    catalogo = obtener_catalogo(arbol)
+    assert catalogo.ubicar("prueba")[0]["displayName"] == "prueba"
+    assert catalogo.ubicar("zombie")[0]["width"] == "0.7"
+    assert catalogo.ubicar("bat") is None
+
+
+@pytest.mark.parametrize("cambios, motivo", [
+    ({"id": ""}, "obligatorios"),
+    ({"id": "abc"}, "'id' debe ser un número"),
+    ({"id": "145"}, "ID '145' ya existe"),
+    ({"name": "zombie"}, "El nombre 'zombie' ya existe"),
+    # displayName de otro mob, usado como name
+    ({"name": "Zombie"}, "El nombre 'Zombie' ya existe"),
+    ({"displayName": "zombie"}, "El nombre 'zombie' ya existe"),
+    ({"type": "dragon"}, "'type' debe ser uno de"),
+    ({"width": "ancho"}, "'width' debe ser numérico"),
+    ({"color": "verde"}, "Campos desconocidos"),
+])
+def test_alta_invalida_se_rechaza(arbol, cambios, motivo):
+    valores = dict(ALTA, **cambios)
+    resultado, = aplicar_lote([{"op": "agregar", "clave": "ignorada", "valores": valores}], arbol)
+    assert resultado["estado"] == "error"
+    assert motivo in resultado["detalle"]
+    # El reporte identifica el alta por el id enviado
+    assert resultado["clave"] == valores["id"]
+
+    assert agregar_uno(valores, arbol)["detalle"] == resultado["detalle"]
+    assert obtener_catalogo(arbol).ubicar("9001") is None
+
+
+def test_altas_repetidas_en_el_mismo_lote(arbol):
+    resultados = aplicar_lote([
+        {"op": "agregar", "valores": ALTA},
+        {"op": "agregar", "valores": dict(ALTA, id="9002")},
+    ], arbol)
+    assert [r["estado"] for r in resultados] == ["ok", "error"]
+    assert "ya existe" in resultados[1]["detalle"]
+
+
+def test_operacion_desconocida_o_mob_inexistente(arbol):
+    resultados = aplicar_lote([
+        {"op": "renombrar", "clave": "zombie"},
+        {"op": "update", "clave": "no_existe", "valores": {"width": "1"}},
+    ], arbol)
+    assert [r["estado"] for r in resultados] == ["error", "error"]
+    assert "Operación desconocida" in resultados[0]["detalle"]
+    assert "No se encontró" in resultados[1]["detalle"]
@@ -0,0 +1,51 @@
+import pytest
+
+from mod.utils import _codificar_cursor, _decodificar_cursor, ordenar_mobs, ordenar_pagina
+
+ESTADO = {"key": [["width", True], ["name", False]], "reverse": False, "limit": 5, "offset": 10}
+
+
+def test_cursor_ida_y_vuelta():
+    assert _decodificar_cursor(_codificar_cursor(ESTADO)) == ESTADO
+
+
+@pytest.mark.parametrize("cursor", [
+    "no es base64!",
+    _codificar_cursor([1, 2]),
+    _codificar_cursor(dict(ESTADO, limit=0)),
+    _codificar_cursor(dict(ESTADO, limit=True)),
+    _codificar_cursor(dict(ESTADO, offset=-1)),
+    _codificar_cursor(dict(ESTADO, reverse="no")),
+    _codificar_cursor(dict(ESTADO, key="name")),
+    _codificar_cursor(dict(ESTADO, key=[["name"]])),
+    _codificar_cursor({k: v for k, v in ESTADO.items() if k != "offset"}),
+])
+def test_cursor_invalido(cursor):
+    with pytest.raises(ValueError, match="Cursor inválido"):
+        _decodificar_cursor(cursor)
+
+
+@pytest.mark.parametrize("limite", [0, -1, 2.5, "3", True, None])
+def test_limite_invalido(arbol, limite):
+    with pytest.raises(ValueError, match="limit debe ser un entero"):
+        ordenar_pagina(arbol, "name", limit=limite)
+
+
+def test_paginas_recorren_todo_el_orden(arbol):
+    esperado = [mob["name"] for mob, _ in ordenar_mobs(arbol, "width,-name")]
+    vistos, cursor = [], None
+    while True:
+        pagina, cursor = ordenar_pagina(arbol, "width,-name", limit=7, cursor=cursor)
+        assert len(pagina) <= 7
+        vistos.extend(mob["name"] for mob, _ in pagina)
+        if cursor is None:
+            break
+    assert vistos == esperado
+
+
+def test_limite_maximo_recorta_tambien_el_cursor(arbol):
+    pagina, cursor = ordenar_pagina(arbol, limit=50, limite_maximo=10)
+    assert len(pagina) == 10
+    forzado = _codificar_cursor(dict(_decodificar_cursor(cursor), limit=500))
+    pagina, _ = ordenar_pagina(arbol, cursor=forzado, limite_maximo=10)
+    assert len(pagina) == 10